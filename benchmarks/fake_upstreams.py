@@ -0,0 +1,243 @@
+"""Local stand-ins for the Telegram Bot API and the OpenAI API.
+
+Used by ``benchmarks.load_test``; both servers answer with canned JSON
+after a delay drawn from a configurable latency model and count every
+call they get (``GET /_stats``). Nothing leaves the machine.
+
+Latency models: ``const:<ms>``, ``uniform:<min ms>:<max ms>`` and
+``lognormal:<median ms>:<sigma>``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import random
+import re
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict
+
+from aiohttp import web
+from PIL import Image
+
+BOT_ID = 4242
+TRANSCRIPT = "курица, рис, брокколи и немного сливок"
+_REMAINING_RE = re.compile(r"Осталось уточняющих вопросов: (\d+)")
+
+
+def latency_model(spec: str, *, seed: int = 0) -> Callable[[], float]:
+    """Parse a latency spec into a function returning a delay in seconds."""
+
+    rng = random.Random(seed)
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(":") if value]
+    if kind == "const" and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda: median * rng.lognormvariate(0, sigma) / 1000
+    raise ValueError(f"unknown latency model: {spec!r}")
+
+
+def _recipe(index: int, *, steps: bool = True) -> dict:
+    recipe = {
+        "title": f"Курица с рисом №{index + 1}",
+        "cook_time": "30 минут",
+        "ingredients": ["куриное филе 400 г", "рис 200 г", "брокколи 300 г", "сливки 100 мл"],
+    }
+    if steps:
+        recipe.update(
+            steps=[f"Шаг {step}: готовим дальше." for step in range(1, 7)],
+            missing_items=["сливки"],
+            variations=["с грибами", "с сыром"],
+            serving_tips=["подавать горячим"],
+        )
+    return recipe
+
+
+def _answer(prompt: str) -> str:
+    """Pick the canned answer the bot expects for this prompt."""
+
+    remaining = _REMAINING_RE.search(prompt)
+    if remaining is not None:
+        if int(remaining[1]) > 0 and "Предположи самый" not in prompt:
+            return "ASK: На сколько порций готовим и есть ли ограничения?"
+        return json.dumps({"recipes": [_recipe(0)]}, ensure_ascii=False)
+    if prompt.startswith("Ты ведёшь краткую память"):
+        return "Любит курицу и рис, готовит на двоих."
+    one = "содержит один объект" in prompt
+    cards = "без шагов" in prompt
+    recipes = [_recipe(index, steps=not cards) for index in range(1 if one else 3)]
+    return json.dumps({"recipes": recipes}, ensure_ascii=False)
+
+
+def _prompt_of(body: dict) -> tuple[str, bool]:
+    content = body["messages"][-1]["content"]
+    if isinstance(content, list):
+        text = " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+        return text, True
+    return content, False
+
+
+def openai_app(latency: Callable[[], float]) -> web.Application:
+    calls: Counter = Counter()
+
+    async def completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        prompt, vision = _prompt_of(body)
+        answer = _answer(prompt)
+        calls["chat.vision" if vision else "chat.text"] += 1
+        await asyncio.sleep(latency())
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body["model"]}
+        if not body.get("stream"):
+            return web.json_response(
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": answer},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 500,
+                        "completion_tokens": 700,
+                        "total_tokens": 1200,
+                    },
+                }
+            )
+
+        calls["chat.stream"] += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        pieces = [answer[start : start + 40] for start in range(0, len(answer), 40)]
+        for piece in pieces:
+            chunk = {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+            await asyncio.sleep(0.005)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def transcriptions(request: web.Request) -> web.Response:
+        await request.post()
+        calls["audio.transcriptions"] += 1
+        await asyncio.sleep(latency())
+        return web.Response(text=TRANSCRIPT)
+
+    app = web.Application(client_max_size=32 * 1024 * 1024)
+    app.router.add_post("/v1/chat/completions", completions)
+    app.router.add_post("/v1/audio/transcriptions", transcriptions)
+    app.router.add_get("/_stats", _stats_handler(calls))
+    return app
+
+
+def _photo_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480), (200, 120, 60)).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def telegram_app(latency: Callable[[], float]) -> web.Application:
+    calls: Counter = Counter()
+    files: Dict[str, bytes] = {"photos": _photo_bytes(), "voice": b"OggS" + bytes(4_000)}
+    message_ids: Counter = Counter()
+    bot_user = {"id": BOT_ID, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+    def message(chat_id: int, text: str, message_id: int | None = None) -> dict:
+        if message_id is None:
+            message_ids[chat_id] += 1
+            message_id = 1_000_000 + message_ids[chat_id]
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": bot_user,
+            "text": text,
+        }
+
+    async def method(request: web.Request) -> web.Response:
+        name = request.match_info["method"]
+        fields = await request.post()
+        calls[name] += 1
+        await asyncio.sleep(latency())
+        chat_id = int(fields.get("chat_id", 0) or 0)
+        if name == "getMe":
+            result: object = bot_user
+        elif name in {"sendMessage", "sendPhoto", "copyMessage"}:
+            result = message(chat_id, str(fields.get("text", "")))
+        elif name.startswith("edit"):
+            result = message(chat_id, str(fields.get("text", "")), int(fields["message_id"]))
+        elif name == "getFile":
+            file_id = str(fields["file_id"])
+            folder = "voice" if file_id.startswith("voice") else "photos"
+            result = {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_size": len(files[folder]),
+                "file_path": f"{folder}/{file_id}",
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def download(request: web.Request) -> web.Response:
+        calls["file"] += 1
+        await asyncio.sleep(latency())
+        return web.Response(body=files[request.match_info["folder"]])
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", method)
+    app.router.add_get("/file/bot{token}/{folder}/{name}", download)
+    app.router.add_get("/_stats", _stats_handler(calls))
+    return app
+
+
+def _stats_handler(calls: Counter) -> Callable[[web.Request], Awaitable[web.Response]]:
+    async def stats(_: web.Request) -> web.Response:
+        return web.json_response(dict(calls))
+
+    return stats
+
+
+async def serve(
+    telegram_port: int,
+    openai_port: int,
+    telegram_latency: str,
+    openai_latency: str,
+    ready,
+) -> None:
+    runners = []
+    for app, port in (
+        (telegram_app(latency_model(telegram_latency, seed=1)), telegram_port),
+        (openai_app(latency_model(openai_latency, seed=2)), openai_port),
+    ):
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        runners.append(runner)
+    ready.set()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def run(*args) -> None:
+    """Process entry point: :func:`serve` until terminated."""
+
+    try:
+        asyncio.run(serve(*args))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,58 @@
+"""Per-update FSM overhead: MemoryStorage versus SQLiteStorage.
+
+Each simulated update does what a handler of this bot does: read the
+state, read the data, update the data and set the state.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from services.fsm_storage import SQLiteStorage
+
+
+async def _drive(storage: BaseStorage, updates: int, chats: int) -> float:
+    rng = random.Random(0)
+    started = time.perf_counter()
+    for step in range(updates):
+        chat_id = rng.randrange(chats)
+        key = StorageKey(bot_id=1, chat_id=chat_id, user_id=chat_id)
+        await storage.get_state(key)
+        await storage.get_data(key)
+        await storage.update_data(key, {"file_id": f"file-{step}", "questions": step % 3})
+        await storage.set_state(key, "PhotoFlow:waiting_choice" if step % 2 else None)
+    return (time.perf_counter() - started) / updates * 1e6
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--chats", type=int, default=2_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        variants = {
+            "MemoryStorage": MemoryStorage(),
+            "SQLiteStorage (write-behind)": SQLiteStorage(Path(tmp) / "behind.db"),
+            "SQLiteStorage (write-through, no cache)": SQLiteStorage(
+                Path(tmp) / "through.db", cache_size=0, flush_interval=0
+            ),
+        }
+        for name, storage in variants.items():
+            if isinstance(storage, SQLiteStorage):
+                await storage.start()
+            per_update = await _drive(storage, args.updates, args.chats)
+            await storage.close()
+            print(f"{name:<42} {per_update:8.1f} µs/update")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
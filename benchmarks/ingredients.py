@@ -0,0 +1,42 @@
+"""Benchmark for ingredient canonicalization (target: < 50 µs per typical list)."""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from services.recipes import ingredients
+
+SAMPLES = (
+    "куриная грудка 500г, брокколи, сливки 200 мл, пармезан, 2 зубчика чеснока",
+    "Картошка 1 кг; лук репчатый 2 шт, морковка, немного оливкового масла",
+    "фарш, макароны, томаты черри, сыр моцарелла и базилик",
+    "2 яйца, молоко 250 мл, мука 1 стакан, сахар по вкусу",
+)
+TARGET_US = 50.0
+
+
+def _measure(number: int, *, cold: bool) -> float:
+    def run() -> None:
+        if cold:
+            ingredients._canonicalize_item.cache_clear()
+        for sample in SAMPLES:
+            ingredients.canonical_ingredients(sample)
+
+    run()  # build the synonym trie outside of the measurement
+    return timeit.timeit(run, number=number) / (number * len(SAMPLES)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+
+    for label, cold in (("warm", False), ("cold", True)):
+        per_list = _measure(args.number, cold=cold)
+        verdict = "OK" if per_list < TARGET_US else "SLOW"
+        print(f"{label:>5}: {per_list:8.2f} µs/list  [{verdict}, target {TARGET_US:.0f} µs]")
+
+
+if __name__ == "__main__":
+    main()
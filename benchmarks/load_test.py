@@ -0,0 +1,337 @@
+"""Offline end-to-end load test of the bot.
+
+Starts the stand-ins from ``benchmarks.fake_upstreams`` in a separate
+process and points a real ``Bot`` and the real dispatcher from
+``bot.build_dispatcher`` at them. Thousands of synthetic chats then send
+text, photo (with the follow-up button press), voice and ``/chef``
+traffic. Every update goes through ``Dispatcher.feed_update`` as in
+webhook mode; its latency is the time until its handler has finished,
+Telegram calls included.
+
+Reports p50/p95/p99 latency per kind of update, updates/s, the event
+loop lag, the calls the stand-ins received and the peak RSS of the bot
+process. ``--strict-ms`` fails the run if any single callback held the
+loop longer than that. Runs without network access, e.g.::
+
+    python -m benchmarks.load_test --chats 2000 --openai-latency lognormal:800:0.4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import random
+import resource
+import socket
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from benchmarks import fake_upstreams
+from bot import build_dispatcher
+from services.admission import AdmissionController
+from services.chef_sessions import ChefSessionStore
+from services.chef_turns import ChefTurnLog
+from services.fsm_storage import SQLiteStorage
+from services.generations import GenerationRegistry
+from services.history_summarizer import HistorySummarizer
+from services.interactive_chef import InteractiveChef
+from services.loop_monitor import LoopMonitor, strict_loop
+from services.memory import ConversationMemory
+from services.openai_client import OpenAIClient
+from services.recipe_expander import RecipeExpander
+from services.recipe_generator import RecipeGenerator
+from services.send_scheduler import SendScheduler
+from services.storage import RecipeRepository
+from services.submissions import SubmissionLedger
+
+TOKEN = "4242:load-test"
+SCENARIOS = ("text", "photo", "voice", "chef")
+CHEF_ANSWERS = ("ужин на двоих", "без глютена", "да")
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class _Traffic:
+    """Builds updates for synthetic chats and times their handling."""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, think: float) -> None:
+        self._dp = dp
+        self._bot = bot
+        self._think = think
+        self._update_id = 0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.failures = 0
+
+    async def feed(self, kind: str, payload: dict) -> None:
+        self._update_id += 1
+        update = Update.model_validate(
+            {"update_id": self._update_id, **payload},
+            context={"bot": self._bot},
+        )
+        started = time.perf_counter()
+        try:
+            await self._dp.feed_update(self._bot, update)
+        except Exception:  # pragma: no cover - reported as a failure count
+            self.failures += 1
+            logging.getLogger(__name__).exception("Update %s failed", kind)
+        self.latencies[kind].append(time.perf_counter() - started)
+
+    async def chat(self, chat_id: int, scenario: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if scenario == "text":
+            await self.feed("text", self._message(chat_id, text="курица, рис, брокколи"))
+        elif scenario == "voice":
+            voice = {"file_id": f"voice-{chat_id}", "file_unique_id": f"v{chat_id}", "duration": 4}
+            await self.feed("voice", self._message(chat_id, voice=voice))
+        elif scenario == "photo":
+            photo = {
+                "file_id": f"photo-{chat_id}",
+                "file_unique_id": f"p{chat_id}",
+                "width": 640,
+                "height": 480,
+            }
+            await self.feed("photo", self._message(chat_id, photo=[photo]))
+            await asyncio.sleep(self._think)
+            data = "photo:ingredients" if chat_id % 2 else "photo:dish"
+            await self.feed("photo:button", self._callback(chat_id, data))
+        else:
+            await self.feed("chef:start", self._message(chat_id, text="/chef"))
+            for answer in CHEF_ANSWERS:
+                await asyncio.sleep(self._think)
+                await self.feed("chef:answer", self._message(chat_id, text=answer))
+
+    def _message(self, chat_id: int, **content) -> dict:
+        return {
+            "message": {
+                "message_id": self._update_id + 1,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Load"},
+                **content,
+            }
+        }
+
+    def _callback(self, chat_id: int, data: str) -> dict:
+        user = {"id": chat_id, "is_bot": False, "first_name": "Load"}
+        return {
+            "callback_query": {
+                "id": f"cb-{self._update_id + 1}",
+                "from": user,
+                "chat_instance": str(chat_id),
+                "data": data,
+                "message": {
+                    "message_id": 1_000_001,
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "from": {"id": fake_upstreams.BOT_ID, "is_bot": True, "first_name": "Bench"},
+                    "text": "Что изображено на фото?",
+                },
+            }
+        }
+
+
+async def _fetch_stats(url: str) -> Dict[str, int]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{url}/_stats") as response:
+            return await response.json()
+
+
+async def _run(args: argparse.Namespace, telegram_url: str, openai_url: str, tmp: Path) -> None:
+    bot = Bot(
+        token=TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(telegram_url)),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    send_scheduler = SendScheduler(
+        global_rate=args.send_global_rate,
+        chat_rate=args.send_chat_rate,
+    )
+    bot.session.middleware(send_scheduler)
+
+    client = OpenAIClient(
+        api_key="offline",
+        text_model="gpt-4o-mini",
+        vision_model="gpt-4o-mini",
+        transcribe_model="gpt-4o-mini-transcribe",
+        base_url=f"{openai_url}/v1",
+    )
+    generator = RecipeGenerator(client, lazy=args.lazy)
+    memory = ConversationMemory(
+        limit=12,
+        summarizer=HistorySummarizer(client, model="gpt-4o-mini"),
+    )
+    repository = RecipeRepository(tmp / "recipes.db", shards=args.shards)
+    await repository.init()
+    turn_log: Optional[ChefTurnLog] = None
+    if args.fsm == "sqlite":
+        storage = SQLiteStorage(tmp / "fsm.db")
+        await storage.start()
+        turn_log = ChefTurnLog(tmp / "fsm.db")
+        await turn_log.start()
+    else:
+        storage = MemoryStorage()
+
+    admission = AdmissionController(
+        max_active=args.max_active,
+        max_queue=args.max_queue,
+        queue_timeout=args.queue_timeout,
+    )
+    registry = GenerationRegistry()
+    dp = build_dispatcher(
+        storage,
+        admission_controller=admission,
+        generation_registry=registry,
+        recipe_generator=generator,
+        conversation_memory=memory,
+        interactive_chef=InteractiveChef(
+            client, max_questions=3, sessions=ChefSessionStore(turn_log=turn_log)
+        ),
+        recipe_repository=repository,
+        openai_client=client,
+        render_cache=None,
+        recipe_expander=RecipeExpander(generator, repository),
+        submission_ledger=SubmissionLedger(),
+    )
+
+    rng = random.Random(args.seed)
+    weights = [args.text, args.photo, args.voice, args.chef]
+    traffic = _Traffic(dp, bot, args.think_ms / 1000)
+    chats = [
+        traffic.chat(
+            100_000 + index,
+            rng.choices(SCENARIOS, weights)[0],
+            rng.uniform(0, args.ramp),
+        )
+        for index in range(args.chats)
+    ]
+    loop_monitor = LoopMonitor()
+    loop_monitor.start()
+    started = time.perf_counter()
+    if args.strict_ms:
+        with strict_loop(args.strict_ms):
+            await asyncio.gather(*chats)
+    else:
+        await asyncio.gather(*chats)
+    elapsed = time.perf_counter() - started
+    await loop_monitor.stop()
+
+    telegram_calls = await _fetch_stats(telegram_url)
+    openai_calls = await _fetch_stats(openai_url)
+    await send_scheduler.close()
+    await bot.session.close()
+    await storage.close()
+    if turn_log is not None:
+        await turn_log.close()
+    await repository.close()
+
+    total = sum(len(values) for values in traffic.latencies.values())
+    print(f"{args.chats} chats, {total} updates in {elapsed:.1f}s: {total / elapsed:.1f} updates/s")
+    print(f"{'update':<14}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = sorted(traffic.latencies.items())
+    rows.append(("all", [value for values in traffic.latencies.values() for value in values]))
+    for kind, values in rows:
+        if len(values) < 2:
+            continue
+        cuts = statistics.quantiles(values, n=100)
+        print(
+            f"{kind:<14}{len(values):>7}"
+            f"{cuts[49] * 1000:>10.0f}{cuts[94] * 1000:>10.0f}{cuts[98] * 1000:>10.0f}"
+        )
+    stats = admission.stats()
+    print(
+        f"failures: {traffic.failures}, admission shed: {stats.shed}, "
+        f"expired: {stats.expired}, peak queue: {stats.peak_queue}"
+    )
+    lag = loop_monitor.stats()
+    print(
+        f"event loop lag: p50 {lag.p50_ms} ms, p95 {lag.p95_ms} ms, p99 {lag.p99_ms} ms, "
+        f"max {lag.max_ms} ms, stalls: {lag.stalls}"
+    )
+    print("telegram calls:", ", ".join(f"{k}={v}" for k, v in sorted(telegram_calls.items())))
+    print("openai calls:  ", ", ".join(f"{k}={v}" for k, v in sorted(openai_calls.items())))
+    # ru_maxrss is in kilobytes on Linux
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--chats", type=int, default=2_000)
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds over which chats start")
+    parser.add_argument(
+        "--think-ms", type=float, default=300.0, help="pause between a chat's updates"
+    )
+    parser.add_argument("--text", type=float, default=0.5, help="share of text chats")
+    parser.add_argument("--photo", type=float, default=0.2)
+    parser.add_argument("--voice", type=float, default=0.15)
+    parser.add_argument("--chef", type=float, default=0.15)
+    parser.add_argument("--openai-latency", default="lognormal:800:0.4")
+    parser.add_argument("--telegram-latency", default="lognormal:30:0.3")
+    parser.add_argument("--max-active", type=int, default=64)
+    parser.add_argument("--max-queue", type=int, default=5_000)
+    parser.add_argument("--queue-timeout", type=float, default=120.0)
+    parser.add_argument(
+        "--send-global-rate",
+        type=float,
+        default=1_000.0,
+        help="messages/s; Telegram's real limit is 30",
+    )
+    parser.add_argument("--send-chat-rate", type=float, default=1.0)
+    parser.add_argument("--fsm", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--lazy", action="store_true", help="summaries-first recipes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--strict-ms", type=float, default=0.0, help="fail on callbacks longer than this"
+    )
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    telegram_port, openai_port = _free_port(), _free_port()
+    ready = multiprocessing.Event()
+    upstreams = multiprocessing.Process(
+        target=fake_upstreams.run,
+        args=(telegram_port, openai_port, args.telegram_latency, args.openai_latency, ready),
+        daemon=True,
+    )
+    upstreams.start()
+    try:
+        if not ready.wait(timeout=30):
+            raise SystemExit("fake upstreams did not start")
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(
+                _run(
+                    args,
+                    f"http://127.0.0.1:{telegram_port}",
+                    f"http://127.0.0.1:{openai_port}",
+                    Path(tmp),
+                )
+            )
+    finally:
+        upstreams.terminate()
+        upstreams.join()
+
+
+if __name__ == "__main__":
+    main()
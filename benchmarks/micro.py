@@ -0,0 +1,363 @@
+"""Micro-benchmarks of hot functions with stored baselines.
+
+Every case times one call of a function on a realistic fixture: a long,
+fenced model answer, a 12 MP photo, a full chat history and a populated
+recipe database. Times are the best of ``--repeat`` rounds, in µs per call.
+
+    python -m benchmarks.micro                      # print the timings
+    python -m benchmarks.micro --save               # store them as the baseline
+    python -m benchmarks.micro --compare --threshold 25
+
+``--compare`` exits with status 1 when a case is more than ``--threshold``
+percent slower than its baseline in ``benchmarks/baselines/micro.json``.
+Baselines only mean something on the machine that recorded them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import io
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from PIL import Image
+
+from services.memory import ConversationMemory
+from services.recipes.schemas import RecipeData, _extract_json_block, parse_recipes_payload
+from services.storage import RecipeRepository
+from utils.image_tools import telephoto_to_base64
+from utils.messages import render_recipe
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "micro.json"
+DB_CHATS = 500
+DB_RECIPES_PER_CHAT = 10
+
+Factory = Callable[["Fixtures"], Awaitable[Callable[[], Any]]]
+
+
+@dataclass(slots=True)
+class Case:
+    name: str
+    factory: Factory
+    number: int
+
+
+CASES: List[Case] = []
+
+
+def case(name: str, *, number: int) -> Callable[[Factory], Factory]:
+    def register(factory: Factory) -> Factory:
+        CASES.append(Case(name, factory, number))
+        return factory
+
+    return register
+
+
+class Fixtures:
+    """Fixtures shared by the cases; the populated database is built once."""
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._repository: Optional[RecipeRepository] = None
+
+    async def repository(self) -> RecipeRepository:
+        if self._repository is None:
+            repository = RecipeRepository(self._directory / "micro.db")
+            await repository.init()
+            recipes = [_recipe(index) for index in range(50)]
+            for chat_id in range(DB_CHATS):
+                for index in range(DB_RECIPES_PER_CHAT):
+                    await repository.add_recipe(
+                        chat_id, recipes[(chat_id + index) % 50], source="benchmark"
+                    )
+            self._repository = repository
+        return self._repository
+
+    async def close(self) -> None:
+        if self._repository is not None:
+            await self._repository.close()
+
+
+def _recipe(index: int, steps: int = 7) -> RecipeData:
+    return RecipeData(
+        title=f"Куриное филе в сливочном соусе с брокколи №{index}",
+        cook_time="40 минут",
+        ingredients=[f"ингредиент {item}: {item * 50} г" for item in range(12)],
+        steps=[
+            f"Шаг {step}: нарежьте, обжарьте на среднем огне 5–7 минут, "
+            "помешивая, затем добавьте сливки и томите под крышкой."
+            for step in range(1, steps + 1)
+        ],
+        missing_items=["пармезан", "мускатный орех"],
+        variations=["с грибами вместо брокколи", "с пастой", "острый вариант с чили"],
+        serving_tips=["подавать с зеленью", "сбрызнуть лимонным соком"],
+    )
+
+
+def _model_answer(*, prose: bool = True) -> str:
+    """A long answer the way models tend to write it: prose, fences and JSON."""
+
+    payload = {
+        "recipes": [
+            {
+                "title": recipe.title,
+                "cook_time": recipe.cook_time,
+                "ingredients": recipe.ingredients,
+                "steps": recipe.steps,
+                "missing_items": recipe.missing_items,
+                "variations": recipe.variations,
+                "serving_tips": recipe.serving_tips,
+            }
+            for recipe in (_recipe(index, steps=15) for index in range(3))
+        ]
+    }
+    body = json.dumps(payload, ensure_ascii=False, indent=2)
+    if not prose:
+        return f"```json\n{body}\n```"
+    return f"Вот три рецепта из ваших продуктов:\n```json\n{body}\n```\nПриятного аппетита!"
+
+
+@case("parse_recipes_payload.large", number=500)
+async def _parse_payload(_: Fixtures) -> Callable[[], Any]:
+    answer = _model_answer()
+    return lambda: parse_recipes_payload(answer)
+
+
+@case("extract_json_block.large", number=2_000)
+async def _extract_block(_: Fixtures) -> Callable[[], Any]:
+    answer = _model_answer()
+    return lambda: _extract_json_block(answer)
+
+
+@case("extract_json_block.fenced", number=2_000)
+async def _extract_fenced(_: Fixtures) -> Callable[[], Any]:
+    answer = _model_answer(prose=False)
+    return lambda: _extract_json_block(answer)
+
+
+@case("render_recipe", number=5_000)
+async def _render(_: Fixtures) -> Callable[[], Any]:
+    recipe = _recipe(1)
+    return lambda: render_recipe(recipe)
+
+
+@case("telephoto_to_base64.12mp", number=3)
+async def _telephoto(_: Fixtures) -> Callable[[], Any]:
+    buffer = io.BytesIO()
+    Image.effect_noise((4000, 3000), 24).convert("RGB").save(buffer, format="JPEG", quality=85)
+    photo = buffer.getvalue()
+
+    async def download_file(_: str, destination: io.BytesIO) -> None:
+        destination.write(photo)
+
+    async def get_file(file_id: str) -> SimpleNamespace:
+        return SimpleNamespace(file_path=f"photos/{file_id}.jpg")
+
+    bot = SimpleNamespace(get_file=get_file, download_file=download_file)
+
+    async def run() -> None:
+        await telephoto_to_base64(bot, "photo")
+
+    return run
+
+
+def _memory() -> ConversationMemory:
+    memory = ConversationMemory(limit=12)
+    for turn in range(12):
+        memory.add(1, "user", f"курица, рис, брокколи и сливки, вариант {turn}")
+        memory.add(1, "assistant", f"Рецепты: {', '.join(_recipe(turn).ingredients[:4])}")
+    return memory
+
+
+@case("format_history.cached", number=100_000)
+async def _history_cached(_: Fixtures) -> Callable[[], Any]:
+    memory = _memory()
+    return lambda: memory.format_history(1)
+
+
+@case("format_history.after_add", number=20_000)
+async def _history_after_add(_: Fixtures) -> Callable[[], Any]:
+    memory = _memory()
+
+    def run() -> None:
+        memory.add(1, "user", "ещё один запрос с курицей")
+        memory.format_history(1)
+
+    return run
+
+
+async def _recipe_ids(repository: RecipeRepository, chat_id: int) -> List[int]:
+    return [record.id for record in await repository.list_recipes(chat_id, limit=100)]
+
+
+@case("repository.add_recipe", number=300)
+async def _add_recipe(fixtures: Fixtures) -> Callable[[], Any]:
+    repository = await fixtures.repository()
+    rng = random.Random(0)
+    recipes = [_recipe(index) for index in range(1_000)]
+
+    async def run() -> None:
+        await repository.add_recipe(rng.randrange(DB_CHATS), rng.choice(recipes), source="micro")
+
+    return run
+
+
+@case("repository.get_recipe", number=2_000)
+async def _get_recipe(fixtures: Fixtures) -> Callable[[], Any]:
+    repository = await fixtures.repository()
+    ids = await _recipe_ids(repository, 7)
+
+    async def run() -> None:
+        await repository.get_recipe(ids[3], chat_id=7)
+
+    return run
+
+
+@case("repository.get_recipe_entry", number=2_000)
+async def _get_recipe_entry(fixtures: Fixtures) -> Callable[[], Any]:
+    repository = await fixtures.repository()
+    ids = await _recipe_ids(repository, 7)
+
+    async def run() -> None:
+        await repository.get_recipe_entry(ids[3], chat_id=7)
+
+    return run
+
+
+@case("repository.list_recipes", number=2_000)
+async def _list_recipes(fixtures: Fixtures) -> Callable[[], Any]:
+    repository = await fixtures.repository()
+
+    async def run() -> None:
+        await repository.list_recipes(7, limit=21)
+
+    return run
+
+
+@case("repository.toggle_favorite", number=300)
+async def _toggle_favorite(fixtures: Fixtures) -> Callable[[], Any]:
+    repository = await fixtures.repository()
+    ids = await _recipe_ids(repository, 8)
+
+    async def run() -> None:
+        await repository.toggle_favorite(ids[0], chat_id=8)
+
+    return run
+
+
+@case("repository.update_recipe", number=300)
+async def _update_recipe(fixtures: Fixtures) -> Callable[[], Any]:
+    repository = await fixtures.repository()
+    ids = await _recipe_ids(repository, 9)
+    versions = [_recipe(index) for index in (1_001, 1_002)]
+    calls = 0
+
+    async def run() -> None:
+        nonlocal calls
+        calls += 1
+        await repository.update_recipe(ids[0], chat_id=9, recipe=versions[calls % 2])
+
+    return run
+
+
+async def _time(func: Callable[[], Any], number: int, repeat: int) -> float:
+    """Best per-call time in µs over ``repeat`` rounds of ``number`` calls."""
+
+    is_async = inspect.iscoroutinefunction(func)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if is_async:
+            for _ in range(number):
+                await func()
+        else:
+            for _ in range(number):
+                func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best * 1e6
+
+
+async def _measure(cases: List[Case], repeat: int, directory: Path) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    fixtures = Fixtures(directory)
+    try:
+        for item in cases:
+            func = await item.factory(fixtures)
+            results[item.name] = await _time(func, item.number, repeat)
+            print(f"{item.name:<32}{results[item.name]:>12.2f} µs")
+    finally:
+        await fixtures.close()
+    return results
+
+
+def _compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> bool:
+    ok = True
+    print(f"\n{'case':<32}{'baseline':>12}{'now':>12}{'change':>9}")
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<32}{'—':>12}{value:>12.2f}{'new':>9}")
+            continue
+        change = (value / reference - 1) * 100
+        regressed = change > threshold
+        ok = ok and not regressed
+        mark = "  REGRESSION" if regressed else ""
+        print(f"{name:<32}{reference:>12.2f}{value:>12.2f}{change:>+8.1f}%{mark}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="run only cases containing this text")
+    parser.add_argument("--save", action="store_true", help="write the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="fail on regressions")
+    parser.add_argument("--threshold", type=float, default=25.0, help="allowed slowdown, %%")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    cases = [item for item in CASES if args.filter in item.name]
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(_measure(cases, args.repeat, Path(tmp)))
+
+    if args.save:
+        stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "machine": f"{platform.machine()} {platform.processor()}".strip(),
+                    "python": platform.python_version(),
+                    "results": {
+                        **stored.get("results", {}),
+                        **{name: round(value, 3) for name, value in results.items()},
+                    },
+                },
+                ensure_ascii=False,
+                indent=2,
+            )
+            + "\n"
+        )
+        print(f"\nbaseline written to {args.baseline}")
+
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        if not _compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Concurrent-writer throughput of RecipeRepository for several shard counts."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from services.recipes.schemas import RecipeData
+from services.storage import RecipeRepository
+
+
+def _recipe(index: int) -> RecipeData:
+    return RecipeData(
+        title=f"Блюдо {index}",
+        cook_time="30 минут",
+        ingredients=["куриное филе 300 г", "брокколи", "сливки 200 мл"],
+        steps=[f"Шаг {step} для блюда {index}" for step in range(6)],
+        missing_items=["пармезан"],
+        variations=["с грибами"],
+        serving_tips=["подавать горячим"],
+    )
+
+
+async def _run(shards: int, writers: int, per_writer: int, directory: Path) -> float:
+    repository = RecipeRepository(directory / f"bench-{shards}.db", shards=shards)
+    await repository.init()
+    recipes = [_recipe(index) for index in range(50)]
+
+    async def writer(seed: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(per_writer):
+            await repository.add_recipe(
+                rng.randrange(1_000_000),
+                rng.choice(recipes),
+                source="benchmark",
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(seed) for seed in range(writers)))
+    elapsed = time.perf_counter() - started
+    await repository.close()
+    return writers * per_writer / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--writers", type=int, default=64)
+    parser.add_argument("--per-writer", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for shards in args.shards:
+            rate = await _run(shards, args.writers, args.per_writer, Path(tmp))
+            baseline = baseline or rate
+            print(f"shards={shards:<3} {rate:9.0f} inserts/s  x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
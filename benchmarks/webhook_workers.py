@@ -0,0 +1,155 @@
+"""Webhook update throughput for 1..N worker processes sharing one port.
+
+Every worker runs the production webhook stack (aiohttp, aiogram's request
+handler with secret-token check, write-through SQLiteStorage on a shared
+file) and a handler that burns ``--cpu-ms`` of CPU per update in place of
+prompt building and response parsing. Updates are answered only after
+they are handled, so the client measures end-to-end throughput.
+Scaling is bounded by the number of CPU cores of the machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+from aiogram import Bot, Dispatcher, Router
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+from services.fsm_storage import SQLiteStorage
+from web.app import start_server
+
+SECRET = "bench-secret"
+PATH = "/telegram/webhook"
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+async def _serve(port: int, database: Path, cpu_ms: float, ready) -> None:
+    router = Router()
+
+    @router.message()
+    async def handle(message: Message, state: FSMContext) -> None:
+        data = await state.get_data()
+        deadline = time.perf_counter() + cpu_ms / 1000
+        while time.perf_counter() < deadline:
+            pass
+        await state.update_data(seen=data.get("seen", 0) + 1)
+
+    storage = SQLiteStorage(database, cache_size=0, flush_interval=0, ttl=None)
+    await storage.start()
+    dp = Dispatcher(storage=storage)
+    dp.include_router(router)
+    bot = Bot(token="42:benchmark")
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=SECRET,
+        handle_in_background=False,
+    ).register(app, path=PATH)
+    runner = await start_server(app, "127.0.0.1", port, reuse_port=True)
+    ready.set()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await storage.close()
+
+
+def _worker(port: int, database: Path, cpu_ms: float, ready) -> None:
+    try:
+        asyncio.run(_serve(port, database, cpu_ms, ready))
+    except KeyboardInterrupt:
+        pass
+
+
+def _update(update_id: int, chat_id: int) -> dict:
+    chat = {"id": chat_id, "type": "private", "first_name": "Bench"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": chat,
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+            "text": "курица, рис, брокколи",
+        },
+    }
+
+
+async def _load(port: int, updates: int, concurrency: int, chats: int) -> float:
+    url = f"http://127.0.0.1:{port}{PATH}"
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    queue: asyncio.Queue = asyncio.Queue()
+    for update_id in range(updates):
+        queue.put_nowait(update_id)
+
+    # a fresh connection per request lets the kernel spread them over workers
+    connector = aiohttp.TCPConnector(force_close=True, limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def client() -> None:
+            while not queue.empty():
+                update_id = queue.get_nowait()
+                payload = _update(update_id, update_id % chats)
+                async with session.post(url, json=payload, headers=headers) as response:
+                    response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return updates / (time.perf_counter() - started)
+
+
+def _run(workers: int, args: argparse.Namespace, directory: Path) -> float:
+    port = _free_port()
+    database = directory / f"fsm-{workers}.db"
+    events = [multiprocessing.Event() for _ in range(workers)]
+    processes = [
+        multiprocessing.Process(target=_worker, args=(port, database, args.cpu_ms, ready))
+        for ready in events
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for ready in events:
+            ready.wait(timeout=30)
+        return asyncio.run(_load(port, args.updates, args.concurrency, args.chats))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--updates", type=int, default=3_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--cpu-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU cores, {args.cpu_ms} ms CPU per update")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            throughput = _run(workers, args, Path(tmp))
+            print(f"{workers:>2} workers: {throughput:8.0f} updates/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,60 @@
 import asyncio
 import logging
-from pathlib import Path
-from typing import Optional
+import signal
+from typing import Any, Optional
 
-from aiohttp import web
 from aiogram import BaseMiddleware, Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.dispatcher.flags import get_flag
 from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.types import BotCommand
+from aiogram.types import BotCommand, CallbackQuery
 
-from config import get_settings
+from config import Settings, get_settings
 from handlers import (
     dish_identify,
     favorites,
     image_ingredients,
     interactive_flow,
+    recipe_cards,
+    recipe_carousel,
     start,
     text_recipe,
     voice_recipe,
     webapp_data,
 )
+from services.admission import AdmissionController, AdmissionShed, AdmissionTimeout
+from services.chef_sessions import ChefSessionStore
+from services.chef_turns import ChefTurnLog
+from services.fsm_storage import SQLiteStorage
+from services.generations import GenerationRegistry, GenerationSuperseded, GenerationTicket
+from services.history_summarizer import HistorySummarizer
 from services.interactive_chef import InteractiveChef
+from services.loop_monitor import LoopMonitor
 from services.memory import ConversationMemory
 from services.openai_client import OpenAIClient
+from services.persistent_memory import PersistentConversationMemory
+from services.recipe_expander import RecipeExpander
 from services.recipe_generator import RecipeGenerator
+from services.render_cache import RenderCache
+from services.retention import RetentionPolicy, RetentionWorker
+from services.send_scheduler import SendScheduler
 from services.storage import RecipeRepository
+from services.submissions import SubmissionLedger, submission_key
+from services.tracing import TracedRequests, Tracer
+from utils.miniapp import MiniAppPayloadError, parse_payload
+from web.app import (
+    create_app,
+    mount_api,
+    mount_debug,
+    mount_metrics,
+    mount_webhook,
+    start_server,
+)
+from web.init_data import InitDataVerifier
+from web.stream import RecipeStreamApi
+from web.workers import run_workers
 
 logging.basicConfig(
     level=logging.INFO,
@@ -46,6 +75,181 @@ class DependencyMiddleware(BaseMiddleware):
         return await handler(event, data)
 
 
+class TracingMiddleware(BaseMiddleware):
+    """Outer update middleware: every update is handled inside its own trace."""
+
+    def __init__(self, tracer: Tracer) -> None:
+        super().__init__()
+        self._tracer = tracer
+
+    async def __call__(self, handler, event, data):
+        chat = data.get("event_chat")
+        with self._tracer.trace(event.event_type, chat_id=chat.id if chat else None):
+            return await handler(event, data)
+
+
+class HistoryPreloadMiddleware(BaseMiddleware):
+    """Wait for the stored history of the chat before a ``generation`` handler runs.
+
+    With the SQLite memory backend the first message of a chat after a
+    restart would otherwise be answered before its history is loaded.
+    """
+
+    async def __call__(self, handler, event, data):
+        memory: Optional[ConversationMemory] = data.get("conversation_memory")
+        chat = data.get("event_chat")
+        if memory is not None and chat is not None and get_flag(data, "generation"):
+            await memory.preload(chat.id)
+        return await handler(event, data)
+
+
+class SupersedeMiddleware(BaseMiddleware):
+    """Give handlers flagged ``supersede`` a per-chat generation ticket.
+
+    Registered before AdmissionMiddleware, so that a newer request can
+    cancel the previous one instead of queueing behind it.
+    """
+
+    def __init__(self, registry: GenerationRegistry) -> None:
+        super().__init__()
+        self._registry = registry
+
+    async def __call__(self, handler, event, data):
+        if not get_flag(data, "supersede"):
+            return await handler(event, data)
+
+        ticket = self._registry.open(event.chat.id, event.text)
+        if ticket is None:
+            return None  # the same request is already being answered
+        data["generation"] = ticket
+        try:
+            return await handler(event, data)
+        except GenerationSuperseded:
+            return None
+        finally:
+            self._registry.close(ticket)
+
+
+class SubmissionMiddleware(BaseMiddleware):
+    """Drop duplicate Mini App forms of handlers flagged ``submission``.
+
+    Registered before AdmissionMiddleware, so that a double tap or a
+    re-delivered update neither waits for a slot nor gets a queue notice.
+    The handler receives ``submission_key`` and completes it with the
+    recipe ids; a claim that produced no recipes is released afterwards.
+    """
+
+    async def __call__(self, handler, event, data):
+        ledger: Optional[SubmissionLedger] = data.get("submission_ledger")
+        if not get_flag(data, "submission") or ledger is None:
+            return await handler(event, data)
+        try:
+            payload = parse_payload(event.web_app_data.data)
+        except MiniAppPayloadError:
+            return await handler(event, data)  # the handler explains what is wrong
+
+        key = submission_key(event.chat.id, payload)
+        earlier = ledger.claim(key)
+        if earlier is not None:
+            LOGGER.info(
+                "Duplicate Mini App submission in chat %s (recipes %s)",
+                event.chat.id,
+                earlier.recipe_ids,
+            )
+            if earlier.recipe_ids:
+                await event.answer(
+                    "✅ Эту форму я уже обработал: рецепты выше и в «Мои рецепты»."
+                )
+            else:
+                await event.answer("⏳ Эту форму я уже обрабатываю, рецепты скоро будут.")
+            return None
+        data["submission_key"] = key
+        try:
+            return await handler(event, data)
+        finally:
+            ledger.release(key)
+
+
+class AdmissionMiddleware(BaseMiddleware):
+    """Run handlers flagged ``generation`` through the AdmissionController."""
+
+    def __init__(self, controller: AdmissionController) -> None:
+        super().__init__()
+        self._controller = controller
+
+    async def __call__(self, handler, event, data):
+        if not get_flag(data, "generation"):
+            return await handler(event, data)
+
+        message = event.message if isinstance(event, CallbackQuery) else event
+
+        async def notify_queued(position: int) -> None:
+            await message.answer(
+                f"⏳ Сейчас много запросов — ты №{position} в очереди. Ответ придёт сам."
+            )
+
+        async def notify_chat_busy() -> None:
+            await message.answer("⏳ Сначала закончу предыдущий запрос, потом возьмусь за этот.")
+
+        # the previous request of the chat was just cancelled, so the wait is short and silent
+        ticket: Optional[GenerationTicket] = data.get("generation")
+        on_chat_busy = None if ticket is not None and ticket.replaced else notify_chat_busy
+        try:
+            async with self._controller.slot(message.chat.id, notify_queued, on_chat_busy):
+                return await handler(event, data)
+        except AdmissionShed:
+            text = "🚦 Сейчас слишком много запросов. Попробуй через минуту."
+        except AdmissionTimeout:
+            text = "⌛ Очередь не дошла до твоего запроса. Отправь его ещё раз чуть позже."
+        if isinstance(event, CallbackQuery):
+            await event.answer(text, show_alert=True)
+        else:
+            await event.answer(text)
+
+
+def build_dispatcher(
+    storage: BaseStorage,
+    *,
+    admission_controller: AdmissionController,
+    generation_registry: GenerationRegistry,
+    tracer: Optional[Tracer] = None,
+    **dependencies: Any,
+) -> Dispatcher:
+    """Include every router with its middlewares; ``dependencies`` go to the handlers."""
+
+    dp = Dispatcher(storage=storage)
+    if tracer is not None:
+        dp.update.outer_middleware(TracingMiddleware(tracer))
+    admission_middleware = AdmissionMiddleware(admission_controller)
+    supersede_middleware = SupersedeMiddleware(generation_registry)
+    submission_middleware = SubmissionMiddleware()
+    dependency_middleware = DependencyMiddleware(**dependencies)
+    history_middleware = HistoryPreloadMiddleware()
+
+    for router in (
+        start.router,
+        text_recipe.router,
+        voice_recipe.router,
+        image_ingredients.router,
+        dish_identify.router,
+        interactive_flow.router,
+        webapp_data.router,
+        favorites.router,
+        recipe_carousel.router,
+        recipe_cards.router,
+    ):
+        router.message.middleware(dependency_middleware)
+        router.callback_query.middleware(dependency_middleware)
+        router.message.middleware(history_middleware)
+        router.callback_query.middleware(history_middleware)
+        router.message.middleware(supersede_middleware)
+        router.message.middleware(submission_middleware)
+        router.message.middleware(admission_middleware)
+        router.callback_query.middleware(admission_middleware)
+        dp.include_router(router)
+    return dp
+
+
 async def set_commands(bot: Bot) -> None:
     commands = [
         BotCommand(command="start", description="Запустить бота"),
@@ -56,94 +260,261 @@ async def set_commands(bot: Bot) -> None:
     await bot.set_my_commands(commands)
 
 
-async def start_miniapp_server(
-    directory: Path,
-    host: str,
-    port: int,
-) -> Optional[web.AppRunner]:
-    if not directory.exists():
-        LOGGER.warning("Miniapp directory %s не найден, сервер не запущен", directory)
-        return None
+async def prepare_storage(settings: Settings) -> None:
+    """Create and migrate the shared databases once, before workers start."""
 
-    app = web.Application()
-
-    async def index(_: web.Request):
-        return web.FileResponse(directory / "index.html")
+    recipe_repository = RecipeRepository(
+        settings.database_path,
+        shards=settings.database_shards,
+    )
+    await recipe_repository.init()
+    await recipe_repository.close()
+    if settings.fsm_backend == "sqlite":
+        storage = SQLiteStorage(settings.fsm_database_path, ttl=None)
+        await storage.start()
+        await storage.close()
+        turn_log = ChefTurnLog(settings.fsm_database_path, ttl=None)
+        await turn_log.start()
+        await turn_log.close()
+    if settings.memory_backend == "sqlite":
+        memory = PersistentConversationMemory(settings.memory_database_path)
+        await memory.start()
+        await memory.close()
 
-    app.router.add_get("/", index)
-    app.router.add_static("/static/", path=directory, name="miniapp-static")
 
-    runner = web.AppRunner(app)
-    await runner.setup()
-    site = web.TCPSite(runner, host=host, port=port)
-    await site.start()
-    LOGGER.info("Miniapp доступен по адресу http://%s:%s", host, port)
-    return runner
+async def wait_for_shutdown() -> None:
+    stopped = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+    except NotImplementedError:  # pragma: no cover - Windows
+        pass
+    await stopped.wait()
 
 
-async def main() -> None:
+async def main(worker_index: int = 0) -> None:
     settings = get_settings()
+    shared = settings.web_workers > 1
+    if shared and settings.memory_backend != "sqlite":
+        LOGGER.warning(
+            "MEMORY_BACKEND=memory: у каждого из %s воркеров своя память диалогов",
+            settings.web_workers,
+        )
     bot = Bot(
         token=settings.telegram_token,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
+    tracer = Tracer(slow_threshold=settings.trace_slow_seconds)
+    tracing = settings.trace_slow_seconds > 0
+    if tracing:
+        # outermost, so a send's span includes its wait in the SendScheduler
+        bot.session.middleware(TracedRequests())
+    # per process: with several workers each one gets a share of the global rate
+    send_scheduler = SendScheduler(
+        global_rate=settings.send_global_rate / settings.web_workers,
+        chat_rate=settings.send_chat_rate,
+    )
+    bot.session.middleware(send_scheduler)
+    loop_monitor = LoopMonitor(threshold=settings.loop_lag_threshold)
 
     openai_client = OpenAIClient(
         api_key=settings.openai_api_key,
         text_model=settings.openai_text_model,
         vision_model=settings.openai_vision_model,
         transcribe_model=settings.openai_transcribe_model,
+        base_url=settings.openai_base_url,
+    )
+    recipe_generator = RecipeGenerator(openai_client, lazy=settings.recipes_lazy)
+    history_summarizer = HistorySummarizer(
+        openai_client,
+        model=settings.openai_summary_model,
+    )
+    memory_limits = dict(
+        max_chats=settings.memory_max_chats,
+        idle_ttl=settings.memory_idle_ttl,
+        max_bytes=settings.memory_max_bytes,
+        summarizer=history_summarizer,
+    )
+    if settings.memory_backend == "sqlite":
+        conversation_memory = PersistentConversationMemory(
+            settings.memory_database_path,
+            limit=12,
+            **memory_limits,
+        )
+        await conversation_memory.start()
+    else:
+        conversation_memory = ConversationMemory(limit=12, **memory_limits)
+    # /chef turns persist next to the FSM state that points at them
+    chef_turn_log: Optional[ChefTurnLog] = None
+    if settings.fsm_backend == "sqlite":
+        chef_turn_log = ChefTurnLog(settings.fsm_database_path, ttl=settings.fsm_state_ttl)
+        await chef_turn_log.start()
+    interactive_chef = InteractiveChef(
+        openai_client,
+        max_questions=3,
+        sessions=ChefSessionStore(turn_log=chef_turn_log),
+    )
+    recipe_repository = RecipeRepository(
+        settings.database_path,
+        shards=settings.database_shards,
     )
-    recipe_generator = RecipeGenerator(openai_client)
-    conversation_memory = ConversationMemory(limit=12)
-    interactive_chef = InteractiveChef(openai_client, max_questions=3)
-    recipe_repository = RecipeRepository(settings.database_path)
     await recipe_repository.init()
 
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+    retention_task: Optional[asyncio.Task] = None
+    # one worker is enough for the shared database
+    if settings.retention_days > 0 and worker_index == 0:
+        retention_worker = RetentionWorker(
+            recipe_repository,
+            RetentionPolicy(
+                max_age_days=settings.retention_days,
+                archive_path=settings.retention_archive_path,
+            ),
+        )
+        retention_task = asyncio.create_task(
+            retention_worker.run_forever(settings.retention_interval)
+        )
+
+    if settings.fsm_backend == "sqlite":
+        if shared:
+            # every update of a chat may land on another worker: no cache, write-through
+            storage = SQLiteStorage(
+                settings.fsm_database_path,
+                ttl=settings.fsm_state_ttl,
+                cache_size=0,
+                flush_interval=0,
+            )
+        else:
+            storage = SQLiteStorage(settings.fsm_database_path, ttl=settings.fsm_state_ttl)
+        await storage.start()
+    else:
+        storage = MemoryStorage()
 
-    dependency_middleware = DependencyMiddleware(
+    admission_controller = AdmissionController(
+        max_active=settings.admission_max_active,
+        max_queue=settings.admission_queue_size,
+        queue_timeout=settings.admission_queue_timeout,
+    )
+    generation_registry = GenerationRegistry(debounce=settings.generation_debounce)
+    render_cache = RenderCache() if settings.recipes_carousel else None
+    submission_ledger = SubmissionLedger()
+    dp = build_dispatcher(
+        storage,
+        admission_controller=admission_controller,
+        generation_registry=generation_registry,
+        tracer=tracer if tracing else None,
         recipe_generator=recipe_generator,
         conversation_memory=conversation_memory,
         interactive_chef=interactive_chef,
         recipe_repository=recipe_repository,
         openai_client=openai_client,
+        render_cache=render_cache,
+        recipe_expander=RecipeExpander(recipe_generator, recipe_repository),
+        submission_ledger=submission_ledger,
     )
 
-    for router in (
-        start.router,
-        text_recipe.router,
-        voice_recipe.router,
-        image_ingredients.router,
-        dish_identify.router,
-        interactive_flow.router,
-        webapp_data.router,
-        favorites.router,
-    ):
-        router.message.middleware(dependency_middleware)
-        router.callback_query.middleware(dependency_middleware)
-        dp.include_router(router)
-
-    await set_commands(bot)
-    web_runner = await start_miniapp_server(
-        settings.miniapp_path,
+    if worker_index == 0:
+        await set_commands(bot)
+    app = create_app(settings.miniapp_path, dev=settings.webapp_dev)
+    init_data_verifier = InitDataVerifier(settings.telegram_token)
+    mount_api(
+        app,
+        recipe_repository,
+        verifier=init_data_verifier,
+        render_cache=render_cache,
+    )
+    if not shared:
+        # streams live in one process; with several workers the form goes to the chat
+        RecipeStreamApi(
+            init_data_verifier,
+            bot=bot,
+            recipe_generator=recipe_generator,
+            recipe_repository=recipe_repository,
+            conversation_memory=conversation_memory,
+            admission=admission_controller,
+            render_cache=render_cache,
+            submission_ledger=submission_ledger,
+        ).register(app)
+    if settings.admin_token:
+        mount_metrics(
+            app,
+            admin_token=settings.admin_token,
+            admission=admission_controller.stats,
+            generations=generation_registry.stats,
+            telegram_sends=send_scheduler.stats,
+            memory=conversation_memory.stats,
+            chef_speculation=lambda: interactive_chef.speculation_stats,
+            miniapp_submissions=submission_ledger.stats,
+            tracing=tracer.stats,
+            event_loop=loop_monitor.stats,
+        )
+        mount_debug(
+            app,
+            admin_token=settings.admin_token,
+            tracer=tracer,
+            loop_monitor=loop_monitor,
+        )
+    webhook_mode = settings.bot_mode == "webhook"
+    if webhook_mode:
+        mount_webhook(
+            app,
+            dp,
+            bot,
+            path=settings.webhook_path,
+            secret_token=settings.webhook_secret,
+        )
+    web_runner = await start_server(
+        app,
         settings.webapp_host,
         settings.webapp_port,
+        reuse_port=shared,
     )
+    if settings.loop_lag_threshold > 0:
+        loop_monitor.start()
 
     try:
-        LOGGER.info("Bot started. Waiting for updates...")
-        await dp.start_polling(bot)
+        if webhook_mode:
+            if worker_index == 0:
+                await bot.set_webhook(
+                    settings.webhook_url + settings.webhook_path,
+                    secret_token=settings.webhook_secret,
+                    allowed_updates=dp.resolve_used_update_types(),
+                    max_connections=max(40, 10 * settings.web_workers),
+                )
+            LOGGER.info("Bot started (worker %s). Waiting for webhook updates...", worker_index)
+            await wait_for_shutdown()
+        else:
+            LOGGER.info("Bot started. Waiting for updates...")
+            await dp.start_polling(bot)
     finally:
-        if web_runner:
-            LOGGER.info("Останавливаем miniapp сервер...")
-            await web_runner.cleanup()
+        if retention_task:
+            retention_task.cancel()
+        await loop_monitor.stop()
+        LOGGER.info("Останавливаем веб-сервер...")
+        await web_runner.cleanup()
+        await send_scheduler.close()
+        await storage.close()
+        if chef_turn_log is not None:
+            await chef_turn_log.close()
+        await recipe_repository.close()
+        if isinstance(conversation_memory, PersistentConversationMemory):
+            await conversation_memory.close()
 
 
-if __name__ == "__main__":
+def run_worker(worker_index: int) -> None:
     try:
-        asyncio.run(main())
+        asyncio.run(main(worker_index))
     except (KeyboardInterrupt, SystemExit):
+        LOGGER.info("Worker %s stopped.", worker_index)
+
+
+if __name__ == "__main__":
+    settings = get_settings()
+    if settings.web_workers > 1:
+        asyncio.run(prepare_storage(settings))
+        run_workers(run_worker, settings.web_workers)
         LOGGER.info("Bot stopped.")
+    else:
+        try:
+            asyncio.run(main())
+        except (KeyboardInterrupt, SystemExit):
+            LOGGER.info("Bot stopped.")
 
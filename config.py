@@ -2,6 +2,7 @@ import os
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
+from typing import Optional
 
 from dotenv import load_dotenv
 
@@ -17,11 +18,42 @@ class Settings:
     openai_text_model: str
     openai_vision_model: str
     openai_transcribe_model: str
+    openai_summary_model: str
+    openai_base_url: str
     webapp_host: str
     webapp_port: int
     webapp_url: str
+    webapp_dev: bool
     miniapp_path: Path
     database_path: Path
+    database_shards: int
+    retention_days: int
+    fsm_backend: str
+    fsm_database_path: Path
+    fsm_state_ttl: Optional[float]
+    memory_backend: str
+    memory_database_path: Path
+    memory_max_chats: int
+    memory_idle_ttl: Optional[float]
+    memory_max_bytes: Optional[int]
+    retention_archive_path: Optional[Path]
+    retention_interval: float
+    bot_mode: str
+    webhook_url: str
+    webhook_path: str
+    webhook_secret: str
+    web_workers: int
+    admission_max_active: int
+    admission_queue_size: int
+    admission_queue_timeout: float
+    generation_debounce: float
+    send_global_rate: float
+    send_chat_rate: float
+    recipes_carousel: bool
+    recipes_lazy: bool
+    admin_token: str
+    trace_slow_seconds: float
+    loop_lag_threshold: float
 
 
 def _load_from_env() -> Settings:
@@ -34,11 +66,47 @@ def _load_from_env() -> Settings:
     openai_transcribe_model = os.getenv(
         "OPENAI_TRANSCRIBE_MODEL", "gpt-4o-mini-transcribe"
     )
+    openai_summary_model = os.getenv("OPENAI_SUMMARY_MODEL", "gpt-4o-mini")
+    openai_base_url = os.getenv("OPENAI_BASE_URL", "")
     webapp_host = os.getenv("WEBAPP_HOST", "127.0.0.1")
     webapp_port = int(os.getenv("WEBAPP_PORT", "8080"))
     webapp_url = os.getenv("WEBAPP_URL", "")
+    webapp_dev = os.getenv("WEBAPP_DEV", "0").lower() in {"1", "true", "yes"}
     miniapp_path = Path(os.getenv("WEBAPP_STATIC_DIR", BASE_DIR / "miniapp")).resolve()
     database_path = Path(os.getenv("DATABASE_PATH", BASE_DIR / "recipes.db")).resolve()
+    database_shards = int(os.getenv("DATABASE_SHARDS", "1"))
+    fsm_backend = os.getenv("FSM_BACKEND", "memory").lower()
+    fsm_database_path = Path(os.getenv("FSM_DATABASE_PATH", BASE_DIR / "fsm.db")).resolve()
+    fsm_ttl_hours = float(os.getenv("FSM_STATE_TTL_HOURS", "24"))
+    fsm_state_ttl = fsm_ttl_hours * 60 * 60 if fsm_ttl_hours > 0 else None
+    memory_backend = os.getenv("MEMORY_BACKEND", "memory").lower()
+    memory_database_path = Path(
+        os.getenv("MEMORY_DATABASE_PATH", BASE_DIR / "memory.db")
+    ).resolve()
+    memory_max_chats = int(os.getenv("MEMORY_MAX_CHATS", "10000"))
+    memory_idle_minutes = float(os.getenv("MEMORY_IDLE_TTL_MINUTES", "360"))
+    memory_idle_ttl = memory_idle_minutes * 60 if memory_idle_minutes > 0 else None
+    memory_max_bytes = int(os.getenv("MEMORY_MAX_BYTES", "0")) or None
+    retention_days = int(os.getenv("RECIPES_RETENTION_DAYS", "0"))
+    archive_path = os.getenv("RECIPES_ARCHIVE_PATH", "")
+    retention_archive_path = Path(archive_path).resolve() if archive_path else None
+    retention_interval = float(os.getenv("RETENTION_INTERVAL_MINUTES", "60")) * 60
+    bot_mode = os.getenv("BOT_MODE", "polling").lower()
+    webhook_url = os.getenv("WEBHOOK_URL", "").rstrip("/")
+    webhook_path = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+    webhook_secret = os.getenv("WEBHOOK_SECRET", "")
+    web_workers = int(os.getenv("WEB_WORKERS", "1"))
+    admission_max_active = int(os.getenv("ADMISSION_MAX_ACTIVE", "16"))
+    admission_queue_size = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+    admission_queue_timeout = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "60"))
+    generation_debounce = float(os.getenv("GENERATION_DEBOUNCE_SECONDS", "3"))
+    send_global_rate = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+    send_chat_rate = float(os.getenv("SEND_CHAT_RATE", "1"))
+    recipes_carousel = os.getenv("RECIPES_CAROUSEL", "0").lower() in {"1", "true", "yes"}
+    recipes_lazy = os.getenv("RECIPES_LAZY", "0").lower() in {"1", "true", "yes"}
+    admin_token = os.getenv("ADMIN_TOKEN", "")
+    trace_slow_seconds = float(os.getenv("TRACE_SLOW_SECONDS", "10"))
+    loop_lag_threshold = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "200")) / 1000
 
     missing = [
         name
@@ -49,23 +117,68 @@ def _load_from_env() -> Settings:
         if not value
     ]
 
+    if bot_mode == "webhook":
+        missing.extend(
+            name
+            for name, value in (("WEBHOOK_URL", webhook_url), ("WEBHOOK_SECRET", webhook_secret))
+            if not value
+        )
+
     if missing:
         raise RuntimeError(
             "Отсутствуют обязательные переменные окружения: "
             + ", ".join(missing)
         )
 
+    # admission limits, supersede tracking and send pacing stay per process,
+    # so with several workers their effective limits are multiplied
+    if web_workers > 1 and (bot_mode != "webhook" or fsm_backend != "sqlite"):
+        raise RuntimeError(
+            "WEB_WORKERS > 1 работает только с BOT_MODE=webhook и FSM_BACKEND=sqlite"
+        )
+
     return Settings(
         telegram_token=telegram_token,
         openai_api_key=openai_api_key,
         openai_text_model=openai_text_model,
         openai_vision_model=openai_vision_model,
         openai_transcribe_model=openai_transcribe_model,
+        openai_summary_model=openai_summary_model,
+        openai_base_url=openai_base_url,
         webapp_host=webapp_host,
         webapp_port=webapp_port,
         webapp_url=webapp_url,
+        webapp_dev=webapp_dev,
         miniapp_path=miniapp_path,
         database_path=database_path,
+        database_shards=database_shards,
+        retention_days=retention_days,
+        fsm_backend=fsm_backend,
+        fsm_database_path=fsm_database_path,
+        fsm_state_ttl=fsm_state_ttl,
+        memory_backend=memory_backend,
+        memory_database_path=memory_database_path,
+        memory_max_chats=memory_max_chats,
+        memory_idle_ttl=memory_idle_ttl,
+        memory_max_bytes=memory_max_bytes,
+        retention_archive_path=retention_archive_path,
+        retention_interval=retention_interval,
+        bot_mode=bot_mode,
+        webhook_url=webhook_url,
+        webhook_path=webhook_path,
+        webhook_secret=webhook_secret,
+        web_workers=web_workers,
+        admission_max_active=admission_max_active,
+        admission_queue_size=admission_queue_size,
+        admission_queue_timeout=admission_queue_timeout,
+        generation_debounce=generation_debounce,
+        send_global_rate=send_global_rate,
+        send_chat_rate=send_chat_rate,
+        recipes_carousel=recipes_carousel,
+        recipes_lazy=recipes_lazy,
+        admin_token=admin_token,
+        trace_slow_seconds=trace_slow_seconds,
+        loop_lag_threshold=loop_lag_threshold,
     )
 
 
@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
@@ -6,6 +7,7 @@ from aiogram.types import CallbackQuery
 
 from services.recipe_generator import RecipeGenerationError, RecipeGenerator
 from services.memory import ConversationMemory
+from services.render_cache import RenderCache
 from services.storage import RecipeRepository
 from utils.image_tools import telephoto_to_base64
 from utils.recipes import publish_recipes
@@ -14,13 +16,14 @@ router = Router(name="dish-identify")
 LOGGER = logging.getLogger(__name__)
 
 
-@router.callback_query(F.data == "photo:dish")
+@router.callback_query(F.data == "photo:dish", flags={"generation": True})
 async def process_dish_photo(
     callback: CallbackQuery,
     state: FSMContext,
     recipe_generator: RecipeGenerator,
     conversation_memory: ConversationMemory,
     recipe_repository: RecipeRepository,
+    render_cache: Optional[RenderCache] = None,
 ) -> None:
     await callback.answer()
 
@@ -60,5 +63,6 @@ async def process_dish_photo(
         source="Фото готового блюда",
         recipe_repository=recipe_repository,
         conversation_memory=conversation_memory,
+        render_cache=render_cache,
     )
 
@@ -1,8 +1,16 @@
+from typing import Optional
+
 from aiogram import F, Router
 from aiogram.types import CallbackQuery
 
+from services.render_cache import RenderCache
 from services.storage import RecipeRepository
-from utils.messages import build_favorite_keyboard
+from utils.messages import (
+    build_carousel_keyboard,
+    build_favorite_keyboard,
+    has_expand_button,
+    parse_carousel_state,
+)
 
 router = Router(name="favorites")
 
@@ -11,20 +19,31 @@ router = Router(name="favorites")
 async def toggle_favorite(
     callback: CallbackQuery,
     recipe_repository: RecipeRepository,
+    render_cache: Optional[RenderCache] = None,
 ) -> None:
+    # "fav:<id>" on a single recipe, "fav:<id>:<ids>:<index>" inside a carousel
     try:
-        _, recipe_id_str = callback.data.split(":", maxsplit=1)
+        _, recipe_id_str, *carousel = callback.data.split(":", maxsplit=2)
         recipe_id = int(recipe_id_str)
+        carousel_state = parse_carousel_state(carousel[0]) if carousel else None
     except (ValueError, AttributeError):
         await callback.answer("Некорректный идентификатор рецепта", show_alert=True)
         return
 
-    new_state = await recipe_repository.toggle_favorite(recipe_id)
+    new_state = await recipe_repository.toggle_favorite(
+        recipe_id,
+        chat_id=callback.message.chat.id,
+    )
     if new_state is None:
         await callback.answer("Рецепт не найден", show_alert=True)
         return
 
-    markup = build_favorite_keyboard(recipe_id, new_state)
+    if render_cache is not None:
+        render_cache.set_favorite(callback.message.chat.id, recipe_id, new_state)
+    expandable = has_expand_button(callback.message.reply_markup)
+    if carousel_state is not None:
+        markup = build_carousel_keyboard(*carousel_state, new_state, expandable=expandable)
+    else:
+        markup = build_favorite_keyboard(recipe_id, new_state, expandable=expandable)
     await callback.message.edit_reply_markup(reply_markup=markup)
     await callback.answer("Добавлено в избранное" if new_state else "Удалено из избранного")
-
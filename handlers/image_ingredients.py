@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
@@ -7,6 +8,7 @@ from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMar
 
 from services.recipe_generator import RecipeGenerationError, RecipeGenerator
 from services.memory import ConversationMemory
+from services.render_cache import RenderCache
 from services.storage import RecipeRepository
 from utils.image_tools import telephoto_to_base64
 from utils.recipes import publish_recipes
@@ -44,13 +46,14 @@ async def ask_photo_context(message: Message, state: FSMContext) -> None:
     )
 
 
-@router.callback_query(F.data == "photo:ingredients")
+@router.callback_query(F.data == "photo:ingredients", flags={"generation": True})
 async def process_ingredient_photo(
     callback: CallbackQuery,
     state: FSMContext,
     recipe_generator: RecipeGenerator,
     conversation_memory: ConversationMemory,
     recipe_repository: RecipeRepository,
+    render_cache: Optional[RenderCache] = None,
 ) -> None:
     """Handle ingredient scenario after the user presses the button."""
 
@@ -93,5 +96,6 @@ async def process_ingredient_photo(
         source="Фото ингредиентов",
         recipe_repository=recipe_repository,
         conversation_memory=conversation_memory,
+        render_cache=render_cache,
     )
 
@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, List
+from typing import Optional
 
 from aiogram import Router
 from aiogram.filters import Command
@@ -7,8 +7,10 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message
 
+from services.chef_sessions import ChefSession
 from services.interactive_chef import InteractiveChef, InteractiveResponse
 from services.memory import ConversationMemory
+from services.render_cache import RenderCache
 from services.storage import RecipeRepository
 from utils.recipes import publish_recipes
 
@@ -25,6 +27,13 @@ INITIAL_PROMPT = (
     "чтобы понять детали, а затем подготовлю рецепт. Поехали!"
 )
 
+SESSION_EXPIRED = "⌛ Сессия уточняющих вопросов истекла. Запусти /chef заново."
+
+
+async def _finish(state: FSMContext, interactive_chef: InteractiveChef, session_id: str) -> None:
+    await interactive_chef.end_session(session_id)
+    await state.clear()
+
 
 async def _proceed_dialog(
     message: Message,
@@ -32,30 +41,39 @@ async def _proceed_dialog(
     interactive_chef: InteractiveChef,
     recipe_repository: RecipeRepository,
     conversation_memory: ConversationMemory,
+    *,
+    session_id: str,
+    session: ChefSession,
+    asked: int,
+    render_cache: Optional[RenderCache] = None,
 ) -> None:
-    data = await state.get_data()
-    history: List[Dict[str, str]] = data.get("history", [])
-    asked = data.get("questions", 0)
     remaining = interactive_chef.max_questions - asked
 
     try:
-        response: InteractiveResponse = await interactive_chef.next_step(history, remaining)
+        response: InteractiveResponse = await interactive_chef.next_step(
+            session,
+            remaining,
+            session_id=session_id,
+        )
     except Exception:  # pragma: no cover - network failure
         LOGGER.exception("Interactive flow failed")
         await message.answer("⚠️ Ошибка диалога с ассистентом. Попробуем позже.")
-        await state.clear()
+        await _finish(state, interactive_chef, session_id)
         return
 
     if response.kind == "ask" and remaining > 0:
-        history.append({"role": "assistant", "content": response.content})
-        await state.update_data(history=history, questions=asked + 1)
+        await interactive_chef.sessions.append(session_id, session, "assistant", response.content)
+        if remaining == 1:
+            # the next answer ends the dialog: start on the recipe right away
+            interactive_chef.speculate(session_id, session)
+        await state.update_data(questions=asked + 1, turns=len(session.turns))
         await message.answer(response.content)
         return
 
     recipes = response.recipes or []
     if not recipes:
         await message.answer("⚠️ Не удалось сформировать рецепт. Попробуй запустить /chef заново.")
-        await state.clear()
+        await _finish(state, interactive_chef, session_id)
         return
 
     chat_id = message.chat.id
@@ -66,42 +84,81 @@ async def _proceed_dialog(
         source="Интерактивный режим",
         recipe_repository=recipe_repository,
         conversation_memory=conversation_memory,
+        render_cache=render_cache,
     )
-    await state.clear()
+    await _finish(state, interactive_chef, session_id)
 
 
-@router.message(Command("chef"))
+@router.message(Command("chef"), flags={"generation": True})
 async def start_interactive_dialog(
     message: Message,
     state: FSMContext,
     interactive_chef: InteractiveChef,
     recipe_repository: RecipeRepository,
     conversation_memory: ConversationMemory,
+    render_cache: Optional[RenderCache] = None,
 ) -> None:
+    data = await state.get_data()
+    await interactive_chef.end_session(data.get("session"))
     await state.clear()
+
+    session_id = interactive_chef.sessions.create()
+    session = interactive_chef.sessions.get(session_id)
+    await interactive_chef.sessions.append(session_id, session, "assistant", INITIAL_PROMPT)
     await state.set_state(InteractiveStates.collecting)
-    await state.update_data(history=[{"role": "assistant", "content": INITIAL_PROMPT}], questions=0)
+    # the turns themselves live in the session's turn log; here only how many there are
+    await state.set_data({"session": session_id, "questions": 0, "turns": len(session.turns)})
     await message.answer(INITIAL_PROMPT)
-    await _proceed_dialog(message, state, interactive_chef, recipe_repository, conversation_memory)
+    await _proceed_dialog(
+        message,
+        state,
+        interactive_chef,
+        recipe_repository,
+        conversation_memory,
+        session_id=session_id,
+        session=session,
+        asked=0,
+        render_cache=render_cache,
+    )
 
 
-@router.message(InteractiveStates.collecting)
+@router.message(InteractiveStates.collecting, flags={"generation": True})
 async def continue_interactive_dialog(
     message: Message,
     state: FSMContext,
     interactive_chef: InteractiveChef,
     recipe_repository: RecipeRepository,
     conversation_memory: ConversationMemory,
+    render_cache: Optional[RenderCache] = None,
 ) -> None:
     if not message.text:
         await message.answer("Пожалуйста, ответь текстом, чтобы я понял детали блюда.")
         return
 
     data = await state.get_data()
-    history: List[Dict[str, str]] = data.get("history", [])
-    history.append({"role": "user", "content": message.text})
-    await state.update_data(history=history)
+    session_id = data.get("session")
+    session = interactive_chef.sessions.get(session_id)
+    # after a restart the process has no session; another worker may also have
+    # continued the dialog since this one last saw it
+    if session is None or data.get("turns", 0) > len(session.turns):
+        interactive_chef.end_speculation(session_id or "")
+        session = await interactive_chef.sessions.load(session_id) or session
+    if session is None:
+        await state.clear()
+        await message.answer(SESSION_EXPIRED)
+        return
 
+    await interactive_chef.sessions.append(session_id, session, "user", message.text)
     conversation_memory.add(message.chat.id, "user", f"[chef] {message.text}")
-    await _proceed_dialog(message, state, interactive_chef, recipe_repository, conversation_memory)
+    await _proceed_dialog(
+        message,
+        state,
+        interactive_chef,
+        recipe_repository,
+        conversation_memory,
+        session_id=session_id,
+        session=session,
+        asked=data.get("questions", 0),
+        render_cache=render_cache,
+    )
 
@@ -0,0 +1,58 @@
+import logging
+from typing import Optional
+
+from aiogram import F, Router
+from aiogram.types import CallbackQuery
+
+from services.recipe_expander import RecipeExpander
+from services.recipe_generator import RecipeGenerationError
+from services.render_cache import RenderCache
+from utils.messages import (
+    build_carousel_keyboard,
+    build_favorite_keyboard,
+    parse_carousel_state,
+    render_recipe,
+)
+
+router = Router(name="recipe-cards")
+LOGGER = logging.getLogger(__name__)
+
+
+@router.callback_query(F.data.startswith("exp:"), flags={"generation": True})
+async def expand_recipe_card(
+    callback: CallbackQuery,
+    recipe_expander: RecipeExpander,
+    render_cache: Optional[RenderCache] = None,
+) -> None:
+    # "exp:<id>" on a single card, "exp:<id>:<ids>:<index>" inside a carousel
+    try:
+        _, recipe_id_str, *carousel = callback.data.split(":", maxsplit=2)
+        recipe_id = int(recipe_id_str)
+        carousel_state = parse_carousel_state(carousel[0]) if carousel else None
+    except (ValueError, AttributeError):
+        await callback.answer("Некорректная кнопка", show_alert=True)
+        return
+
+    await callback.answer("Готовлю полный рецепт…")
+    chat_id = callback.message.chat.id
+    await callback.bot.send_chat_action(chat_id=chat_id, action="typing")
+
+    try:
+        entry = await recipe_expander.expand(recipe_id, chat_id=chat_id)
+    except RecipeGenerationError:
+        LOGGER.exception("Recipe expansion failed")
+        await callback.message.answer("⚠️ Не удалось расписать рецепт. Попробуй нажать ещё раз.")
+        return
+    if entry is None:
+        await callback.message.answer("Рецепт не найден.")
+        return
+
+    recipe, is_favorite = entry
+    text = render_recipe(recipe)
+    if render_cache is not None:
+        render_cache.put(chat_id, recipe_id, text, is_favorite)
+    if carousel_state is not None:
+        markup = build_carousel_keyboard(*carousel_state, is_favorite)
+    else:
+        markup = build_favorite_keyboard(recipe_id, is_favorite)
+    await callback.message.edit_text(text, reply_markup=markup)
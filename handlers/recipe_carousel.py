@@ -0,0 +1,73 @@
+from typing import Optional
+
+from aiogram import F, Router
+from aiogram.types import CallbackQuery
+
+from services.recipe_generator import is_card
+from services.render_cache import RenderCache, RenderedRecipe
+from services.storage import RecipeRepository
+from utils.messages import build_carousel_keyboard, parse_carousel_state, render_recipe
+
+router = Router(name="recipe-carousel")
+
+
+async def load_rendered(
+    recipe_id: int,
+    chat_id: int,
+    recipe_repository: RecipeRepository,
+    render_cache: Optional[RenderCache],
+) -> Optional[RenderedRecipe]:
+    """Rendered recipe from the cache, or from the database on a miss."""
+
+    if render_cache is not None:
+        cached = render_cache.get(chat_id, recipe_id)
+        if cached is not None:
+            return cached
+    entry = await recipe_repository.get_recipe_entry(recipe_id, chat_id=chat_id)
+    if entry is None:
+        return None
+    recipe, is_favorite = entry
+    if render_cache is None:
+        return RenderedRecipe(render_recipe(recipe), is_favorite, is_card(recipe))
+    return render_cache.put(
+        chat_id, recipe_id, render_recipe(recipe), is_favorite, is_card(recipe)
+    )
+
+
+@router.callback_query(F.data == "car:-")
+async def carousel_counter(callback: CallbackQuery) -> None:
+    await callback.answer()
+
+
+@router.callback_query(F.data.startswith("car:"))
+async def switch_carousel_page(
+    callback: CallbackQuery,
+    recipe_repository: RecipeRepository,
+    render_cache: Optional[RenderCache] = None,
+) -> None:
+    try:
+        recipe_ids, index = parse_carousel_state(callback.data.split(":", maxsplit=1)[1])
+    except (ValueError, AttributeError):
+        await callback.answer("Некорректная кнопка", show_alert=True)
+        return
+
+    rendered = await load_rendered(
+        recipe_ids[index],
+        callback.message.chat.id,
+        recipe_repository,
+        render_cache,
+    )
+    if rendered is None:
+        await callback.answer("Рецепт не найден", show_alert=True)
+        return
+
+    await callback.message.edit_text(
+        rendered.text,
+        reply_markup=build_carousel_keyboard(
+            recipe_ids,
+            index,
+            rendered.is_favorite,
+            expandable=rendered.expandable,
+        ),
+    )
+    await callback.answer()
@@ -89,7 +89,10 @@ async def cmd_miniapp(message: Message) -> None:
         ]
     )
     await message.answer(
-        "Mini App открывается внутри Telegram. Нажми кнопку, чтобы заполнить форму с продуктами.",
+        (
+            "Mini App открывается внутри Telegram. Нажми кнопку, чтобы заполнить форму "
+            "с продуктами или полистать свои рецепты и избранное."
+        ),
         reply_markup=markup,
     )
 
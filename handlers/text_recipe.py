@@ -1,12 +1,15 @@
 import logging
+from typing import Optional
 
 from aiogram import F, Router
 from aiogram.filters import StateFilter
 from aiogram.fsm.state import default_state
 from aiogram.types import Message
 
+from services.generations import GenerationTicket
 from services.recipe_generator import RecipeGenerationError, RecipeGenerator
 from services.memory import ConversationMemory
+from services.render_cache import RenderCache
 from services.storage import RecipeRepository
 from utils.recipes import publish_recipes
 
@@ -23,8 +26,14 @@ async def process_text_request(
     conversation_memory: ConversationMemory,
     recipe_repository: RecipeRepository,
     source_label: str = "Текстовый запрос",
+    generation: Optional[GenerationTicket] = None,
+    render_cache: Optional[RenderCache] = None,
 ) -> None:
-    """Shared pipeline for any textual user request."""
+    """Shared pipeline for any textual user request.
+
+    With a ``generation`` ticket the model call is cancelled as soon as a
+    newer request from the same chat supersedes this one.
+    """
 
     sanitized = (user_text or "").strip()
     if not sanitized:
@@ -36,7 +45,8 @@ async def process_text_request(
     history = conversation_memory.format_history(chat_id)
 
     try:
-        recipes = await recipe_generator.from_text(sanitized, history or None)
+        call = recipe_generator.from_text(sanitized, history or None)
+        recipes = await (generation.run(call) if generation else call)
     except RecipeGenerationError:
         LOGGER.exception("Text recipe generation failed")
         await message.answer(
@@ -56,15 +66,18 @@ async def process_text_request(
         source=source_label,
         recipe_repository=recipe_repository,
         conversation_memory=conversation_memory,
+        render_cache=render_cache,
     )
 
 
-@router.message(F.text)
+@router.message(F.text, ~F.text.startswith("/"), flags={"generation": True, "supersede": True})
 async def handle_text_recipe(
     message: Message,
     recipe_generator: RecipeGenerator,
     conversation_memory: ConversationMemory,
     recipe_repository: RecipeRepository,
+    generation: Optional[GenerationTicket] = None,
+    render_cache: Optional[RenderCache] = None,
 ) -> None:
     if not message.text or message.text.startswith("/"):
         return
@@ -76,5 +89,7 @@ async def handle_text_recipe(
         conversation_memory=conversation_memory,
         recipe_repository=recipe_repository,
         source_label="Текстовый запрос",
+        generation=generation,
+        render_cache=render_cache,
     )
 
@@ -1,13 +1,16 @@
 import logging
+from typing import Optional
 
 from aiogram import F, Router
 from aiogram.filters import StateFilter
 from aiogram.fsm.state import default_state
 from aiogram.types import Message
 
+from services.generations import GenerationTicket
 from services.memory import ConversationMemory
 from services.openai_client import OpenAIClient, OpenAIClientError
 from services.recipe_generator import RecipeGenerator
+from services.render_cache import RenderCache
 from services.storage import RecipeRepository
 from utils.audio import download_voice
 
@@ -18,13 +21,15 @@ router.message.filter(StateFilter(default_state))
 LOGGER = logging.getLogger(__name__)
 
 
-@router.message(F.voice)
+@router.message(F.voice, flags={"generation": True, "supersede": True})
 async def handle_voice_recipe(
     message: Message,
     openai_client: OpenAIClient,
     recipe_generator: RecipeGenerator,
     conversation_memory: ConversationMemory,
     recipe_repository: RecipeRepository,
+    generation: Optional[GenerationTicket] = None,
+    render_cache: Optional[RenderCache] = None,
 ) -> None:
     if not message.voice:
         return
@@ -61,5 +66,7 @@ async def handle_voice_recipe(
         conversation_memory=conversation_memory,
         recipe_repository=recipe_repository,
         source_label="Голосовой запрос",
+        generation=generation,
+        render_cache=render_cache,
     )
 
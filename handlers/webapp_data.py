@@ -1,60 +1,42 @@
-import json
 import logging
+from typing import Optional
 
 from aiogram import F, Router
 from aiogram.types import Message
 
 from services.memory import ConversationMemory
 from services.recipe_generator import RecipeGenerationError, RecipeGenerator
+from services.render_cache import RenderCache
 from services.storage import RecipeRepository
+from services.submissions import SubmissionKey, SubmissionLedger
+from utils.miniapp import MiniAppPayloadError, compose_prompt, parse_payload
 from utils.recipes import publish_recipes
 
 router = Router(name="webapp-data")
 LOGGER = logging.getLogger(__name__)
 
 
-def _compose_prompt(payload: dict) -> str:
-    ingredients = payload.get("ingredients", "").strip()
-    diet = payload.get("diet", "").strip()
-    goal = payload.get("goal", "").strip()
-    extras = payload.get("extras", [])
-
-    details = []
-    if diet:
-        details.append(f"Предпочтения: {diet}")
-    if goal:
-        details.append(f"Цель/контекст: {goal}")
-    if extras:
-        details.append("Дополнительно: " + ", ".join(extras))
-
-    if details:
-        return f"{ingredients}\n" + "\n".join(details)
-    return ingredients
-
-
-@router.message(F.web_app_data)
+@router.message(F.web_app_data, flags={"generation": True, "submission": True})
 async def handle_web_app_payload(
     message: Message,
     recipe_generator: RecipeGenerator,
     conversation_memory: ConversationMemory,
     recipe_repository: RecipeRepository,
+    render_cache: Optional[RenderCache] = None,
+    submission_ledger: Optional[SubmissionLedger] = None,
+    submission_key: Optional[SubmissionKey] = None,
 ) -> None:
     raw = message.web_app_data.data
 
     try:
-        payload = json.loads(raw)
-    except (TypeError, json.JSONDecodeError):
-        LOGGER.warning("Invalid web app payload: %s", raw)
-        await message.answer("⚠️ Не удалось прочитать данные из мини-приложения.")
+        payload = parse_payload(raw)
+    except MiniAppPayloadError as exc:
+        LOGGER.warning("Invalid web app payload (%s): %.200s", exc, raw)
+        await message.answer(f"⚠️ {exc}. Попробуй отправить форму ещё раз.")
         return
 
-    ingredients = payload.get("ingredients", "").strip()
-    if not ingredients:
-        await message.answer("⚠️ Мини-приложение не прислало список продуктов. Попробуй снова.")
-        return
-
-    user_prompt = _compose_prompt(payload)
     chat_id = message.chat.id
+    user_prompt = compose_prompt(payload)
     history = conversation_memory.format_history(chat_id)
 
     await message.bot.send_chat_action(chat_id=chat_id, action="typing")
@@ -71,12 +53,15 @@ async def handle_web_app_payload(
         return
 
     conversation_memory.add(chat_id, "user", f"[MiniApp] {user_prompt}")
-    await publish_recipes(
+    recipe_ids = await publish_recipes(
         message.answer,
         chat_id,
         recipes,
         source="Mini App",
         recipe_repository=recipe_repository,
         conversation_memory=conversation_memory,
+        render_cache=render_cache,
     )
-
+    # SubmissionMiddleware claimed the form and releases it unless completed here
+    if submission_ledger is not None and submission_key is not None and recipe_ids:
+        submission_ledger.complete(submission_key, recipe_ids)
@@ -43,6 +43,14 @@ form.addEventListener("submit", (event) => {
     submitted_at: new Date().toISOString(),
   };
 
+  if (tg?.initData) {
+    streamRecipes(payload);
+    return;
+  }
+  sendToChat(payload);
+});
+
+function sendToChat(payload) {
   setStatus("Отправляю…");
   submitBtn.disabled = true;
 
@@ -59,5 +67,255 @@ form.addEventListener("submit", (event) => {
   setStatus("Готов");
   submitBtn.disabled = false;
   form.reset();
+}
+
+
+const tabs = document.querySelectorAll(".tab");
+const browser = document.getElementById("browser");
+const recipeList = document.getElementById("recipe-list");
+const listEmpty = document.getElementById("list-empty");
+const moreBtn = document.getElementById("more-btn");
+const recipeView = document.getElementById("recipe");
+const favoriteBtn = document.getElementById("favorite-btn");
+
+const SECTIONS = [
+  ["ingredients", "Ингредиенты", "ul"],
+  ["steps", "Шаги", "ol"],
+  ["missing_items", "Докупить", "ul"],
+  ["variations", "Вариации", "ul"],
+  ["serving_tips", "Подача", "ul"],
+];
+
+let currentView = "form";
+let nextCursor = null;
+let openedRecipe = null;
+
+async function api(path, options = {}) {
+  const response = await fetch(`/api${path}`, {
+    ...options,
+    headers: {
+      Authorization: `tma ${tg?.initData ?? ""}`,
+      "Content-Type": "application/json",
+    },
+  });
+  const payload = await response.json().catch(() => ({}));
+  if (!response.ok) {
+    const error = new Error(payload.error || `HTTP ${response.status}`);
+    error.status = response.status;
+    throw error;
+  }
+  return payload;
+}
+
+function showView(view) {
+  currentView = view;
+  tabs.forEach((tab) => tab.classList.toggle("tab--active", tab.dataset.view === view));
+  form.hidden = view !== "form";
+  browser.hidden = view === "form" || view === "recipe";
+  recipeView.hidden = view !== "recipe";
+}
+
+async function loadPage(reset) {
+  if (reset) {
+    recipeList.replaceChildren();
+    nextCursor = null;
+  }
+  const query = nextCursor ? `?cursor=${nextCursor}` : "";
+  setStatus("Загружаю…");
+  try {
+    const page = await api(`/${currentView}${query}`);
+    for (const item of page.items) {
+      const row = document.createElement("li");
+      row.textContent = item.is_favorite ? `⭐ ${item.title}` : item.title;
+      row.addEventListener("click", () => openRecipe(item.id));
+      recipeList.append(row);
+    }
+    nextCursor = page.next_cursor;
+    moreBtn.hidden = nextCursor === null;
+    listEmpty.hidden = recipeList.children.length > 0;
+    setStatus("Готов");
+  } catch (error) {
+    setStatus(error.message, true);
+  }
+}
+
+function renderFavorite() {
+  favoriteBtn.textContent = openedRecipe.is_favorite
+    ? "Убрать из избранного"
+    : "⭐ В избранное";
+}
+
+async function openRecipe(recipeId) {
+  setStatus("Загружаю…");
+  try {
+    openedRecipe = await api(`/recipes/${recipeId}`);
+  } catch (error) {
+    setStatus(error.message, true);
+    return;
+  }
+  document.getElementById("recipe-title").textContent = openedRecipe.title;
+  document.getElementById("recipe-time").textContent = openedRecipe.cook_time;
+  const body = document.getElementById("recipe-body");
+  body.replaceChildren();
+  for (const [field, title, tag] of SECTIONS) {
+    const items = openedRecipe[field] || [];
+    if (!items.length) continue;
+    const heading = document.createElement("h3");
+    heading.textContent = title;
+    const list = document.createElement(tag);
+    for (const text of items) {
+      const item = document.createElement("li");
+      item.textContent = text;
+      list.append(item);
+    }
+    body.append(heading, list);
+  }
+  renderFavorite();
+  recipeView.dataset.from = currentView;
+  showView("recipe");
+  setStatus("Готов");
+}
+
+tabs.forEach((tab) =>
+  tab.addEventListener("click", () => {
+    showView(tab.dataset.view);
+    if (tab.dataset.view !== "form") {
+      loadPage(true);
+    }
+  })
+);
+
+moreBtn.addEventListener("click", () => loadPage(false));
+
+// the API needs signed initData, which a keyboard-button launch does not carry
+document.querySelector(".tabs").hidden = !tg?.initData;
+
+document.getElementById("back-btn").addEventListener("click", () => {
+  const from = recipeView.dataset.from || "recipes";
+  showView(from);
+  if (from !== "form") {
+    loadPage(true);
+  }
+});
+
+favoriteBtn.addEventListener("click", async () => {
+  favoriteBtn.disabled = true;
+  try {
+    const result = await api(`/recipes/${openedRecipe.id}/favorite`, { method: "POST" });
+    openedRecipe.is_favorite = result.is_favorite;
+    renderFavorite();
+  } catch (error) {
+    setStatus(error.message, true);
+  }
+  favoriteBtn.disabled = false;
 });
 
+const results = document.getElementById("results");
+document.getElementById("mirror-field").hidden = !tg?.initData;
+
+function parseEvent(block) {
+  const event = { id: null, name: "message", data: "" };
+  for (const line of block.split("\n")) {
+    if (line.startsWith("id: ")) event.id = Number(line.slice(4));
+    else if (line.startsWith("event: ")) event.name = line.slice(7);
+    else if (line.startsWith("data: ")) event.data += line.slice(6);
+  }
+  return event;
+}
+
+// EventSource cannot send the Authorization header, so the stream is read with fetch
+async function readEvents(streamId, lastEventId, onEvent) {
+  const headers = { Authorization: `tma ${tg.initData}` };
+  if (lastEventId) headers["Last-Event-ID"] = String(lastEventId);
+  const response = await fetch(`/api/generations/${streamId}/events`, { headers });
+  if (!response.ok) throw new Error(`HTTP ${response.status}`);
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += value;
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      if (!block.startsWith(":")) onEvent(parseEvent(block));
+    }
+  }
+}
+
+function addResult(recipe) {
+  const row = document.createElement("li");
+  row.textContent = `${recipe.title} · ${recipe.cook_time}`;
+  row.addEventListener("click", () => openRecipe(recipe.id));
+  results.append(row);
+}
+
+async function showEarlierRecipes(recipeIds) {
+  setStatus("Эта форма уже обработана");
+  for (const recipeId of recipeIds) {
+    try {
+      addResult(await api(`/recipes/${recipeId}`));
+    } catch (error) {
+      // deleted by retention since: show the rest
+    }
+  }
+  submitBtn.disabled = false;
+}
+
+async function streamRecipes(payload) {
+  setStatus("Готовлю…");
+  submitBtn.disabled = true;
+  results.replaceChildren();
+  let started;
+  try {
+    started = await api("/generations", {
+      method: "POST",
+      body: JSON.stringify({ ...payload, mirror_to_chat: document.getElementById("mirror").checked }),
+    });
+  } catch (error) {
+    if (error.status === 404 || error.status === 405) {
+      // the server runs several workers and takes the form through the chat only
+      sendToChat(payload);
+      return;
+    }
+    setStatus(error.message, true);
+    submitBtn.disabled = false;
+    return;
+  }
+  if (started.recipe_ids) {
+    // a duplicate of a form that was already answered
+    await showEarlierRecipes(started.recipe_ids);
+    return;
+  }
+
+  const streamId = started.id;
+  let lastEventId = 0;
+  let finished = false;
+  const onEvent = (event) => {
+    lastEventId = event.id ?? lastEventId;
+    const data = JSON.parse(event.data);
+    if (event.name === "queued") {
+      setStatus(`В очереди: №${data.position}`);
+    } else if (event.name === "recipe") {
+      setStatus("Готовлю…");
+      addResult(data);
+    } else if (event.name === "done") {
+      finished = true;
+      setStatus("Готов");
+    } else if (event.name === "error") {
+      finished = true;
+      setStatus(data.message, true);
+    }
+  };
+
+  for (let attempt = 0; !finished && attempt < 5; attempt += 1) {
+    try {
+      await readEvents(streamId, lastEventId, onEvent);
+    } catch (error) {
+      await new Promise((resolve) => setTimeout(resolve, 1000 * (attempt + 1)));
+    }
+  }
+  if (!finished) setStatus("Связь прервалась, рецепты сохранены в «Мои рецепты»", true);
+  submitBtn.disabled = false;
+}
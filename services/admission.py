@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Deque, Optional, Set
+
+QueuedCallback = Callable[[int], Awaitable[object]]
+ChatBusyCallback = Callable[[], Awaitable[object]]
+
+
+class AdmissionRejected(RuntimeError):
+    """The request was not admitted and must not be processed."""
+
+
+class AdmissionShed(AdmissionRejected):
+    """The queue was full when the request arrived."""
+
+
+class AdmissionTimeout(AdmissionRejected):
+    """The request waited in the queue past its deadline."""
+
+
+@dataclass(slots=True)
+class AdmissionStats:
+    active: int
+    queued: int
+    admitted: int
+    waited: int
+    shed: int
+    expired: int
+    peak_queue: int
+    avg_wait_seconds: float
+
+
+class _Waiter:
+    __slots__ = ("chat_id", "future", "enqueued")
+
+    def __init__(self, chat_id: int) -> None:
+        self.chat_id = chat_id
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+
+
+class AdmissionController:
+    """Caps concurrent generations globally and to one per chat.
+
+    Requests that cannot start right away wait in a FIFO queue of at most
+    ``max_queue`` entries for up to ``queue_timeout`` seconds. A waiter
+    whose chat already has a generation in flight is skipped until it
+    finishes, so one chat cannot hold several global slots.
+
+    A request that waits for the global cap gets ``on_queued(position)``;
+    one that waits only behind its own chat gets ``on_chat_busy()``.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_active: int = 16,
+        max_queue: int = 100,
+        queue_timeout: float = 60.0,
+    ) -> None:
+        self._max_active = max_active
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self._active: Set[int] = set()
+        self._queue: Deque[_Waiter] = deque()
+        self._admitted = 0
+        self._waited = 0
+        self._shed = 0
+        self._expired = 0
+        self._peak_queue = 0
+        self._wait_total = 0.0
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        chat_id: int,
+        on_queued: Optional[QueuedCallback] = None,
+        on_chat_busy: Optional[ChatBusyCallback] = None,
+    ) -> AsyncIterator[None]:
+        await self.acquire(chat_id, on_queued, on_chat_busy)
+        try:
+            yield
+        finally:
+            self.release(chat_id)
+
+    async def acquire(
+        self,
+        chat_id: int,
+        on_queued: Optional[QueuedCallback] = None,
+        on_chat_busy: Optional[ChatBusyCallback] = None,
+    ) -> None:
+        """Wait for a slot; raise AdmissionShed or AdmissionTimeout if none is given."""
+
+        if self._can_start(chat_id):
+            self._start(chat_id)
+            return
+        if len(self._queue) >= self._max_queue:
+            self._shed += 1
+            raise AdmissionShed(f"queue is full ({self._max_queue})")
+
+        chat_busy = not self._chat_idle(chat_id)
+        waiter = _Waiter(chat_id)
+        self._queue.append(waiter)
+        self._peak_queue = max(self._peak_queue, len(self._queue))
+        try:
+            if chat_busy:
+                if on_chat_busy is not None:
+                    await on_chat_busy()
+            elif on_queued is not None:
+                await on_queued(len(self._queue))
+            remaining = self._queue_timeout - (time.monotonic() - waiter.enqueued)
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=max(0.0, remaining))
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._queue.remove(waiter)
+                self._expired += 1
+                self._dispatch()
+                raise AdmissionTimeout(f"no slot within {self._queue_timeout}s") from None
+        except BaseException:
+            if waiter.future.done():
+                # the slot was handed over while we were failing or being cancelled
+                self.release(chat_id)
+            else:
+                self._queue.remove(waiter)
+                self._dispatch()
+            raise
+        self._waited += 1
+        self._wait_total += time.monotonic() - waiter.enqueued
+
+    def release(self, chat_id: int) -> None:
+        self._active.discard(chat_id)
+        self._dispatch()
+
+    def stats(self) -> AdmissionStats:
+        return AdmissionStats(
+            active=len(self._active),
+            queued=len(self._queue),
+            admitted=self._admitted,
+            waited=self._waited,
+            shed=self._shed,
+            expired=self._expired,
+            peak_queue=self._peak_queue,
+            avg_wait_seconds=self._wait_total / self._waited if self._waited else 0.0,
+        )
+
+    def _can_start(self, chat_id: int) -> bool:
+        return len(self._active) < self._max_active and self._chat_idle(chat_id)
+
+    def _chat_idle(self, chat_id: int) -> bool:
+        if chat_id in self._active:
+            return False
+        # keep per-chat order: an earlier request of this chat goes first
+        return all(waiter.chat_id != chat_id for waiter in self._queue)
+
+    def _start(self, chat_id: int) -> None:
+        self._active.add(chat_id)
+        self._admitted += 1
+
+    def _dispatch(self) -> None:
+        blocked: Set[int] = set()
+        for waiter in list(self._queue):
+            if len(self._active) >= self._max_active:
+                return
+            if waiter.chat_id in self._active or waiter.chat_id in blocked:
+                blocked.add(waiter.chat_id)
+                continue
+            self._queue.remove(waiter)
+            self._start(waiter.chat_id)
+            waiter.future.set_result(None)
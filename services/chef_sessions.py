@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import secrets
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .chef_turns import ChefTurnLog
+
+GREETING = "assistant: Привет! Что хочешь приготовить?"
+
+
+class ChefSession:
+    """Append-only turn log of one /chef dialog with a cached prompt prefix."""
+
+    __slots__ = ("turns", "_prompt", "touched")
+
+    def __init__(self) -> None:
+        self.turns: List[Tuple[str, str]] = []
+        self._prompt = ""
+        self.touched = time.monotonic()
+
+    def append(self, role: str, content: str) -> None:
+        line = f"{role}: {content}"
+        self.turns.append((role, content))
+        self._prompt = f"{self._prompt}\n{line}" if self._prompt else line
+        self.touched = time.monotonic()
+
+    @property
+    def prompt(self) -> str:
+        """History in the "role: message" form used by INTERACTIVE_PROMPT."""
+
+        return self._prompt or GREETING
+
+
+class ChefSessionStore:
+    """In-process cache of /chef sessions with their cached prompts.
+
+    With a ``turn_log`` every turn is also appended to it, so a dialog that
+    continues after a restart or in another worker process is rebuilt
+    with ``load``. Sessions idle for ``ttl`` seconds or beyond
+    ``max_sessions`` (least recently used first) are dropped from the cache.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_sessions: int = 5_000,
+        ttl: float = 60 * 60,
+        turn_log: Optional["ChefTurnLog"] = None,
+    ) -> None:
+        self._max_sessions = max_sessions
+        self._ttl = ttl
+        self._turn_log = turn_log
+        self._sessions: "OrderedDict[str, ChefSession]" = OrderedDict()
+
+    def create(self) -> str:
+        session_id = secrets.token_hex(8)
+        self._put(session_id, ChefSession())
+        return session_id
+
+    async def append(self, session_id: str, session: ChefSession, role: str, content: str) -> None:
+        session.append(role, content)
+        if self._turn_log is not None:
+            await self._turn_log.append(session_id, len(session.turns) - 1, role, content)
+
+    async def load(self, session_id: Optional[str]) -> Optional[ChefSession]:
+        """Rebuild a session from the turn log; None without a log or turns."""
+
+        if not session_id or self._turn_log is None:
+            return None
+        turns = await self._turn_log.load(session_id)
+        if not turns:
+            return None
+        session = ChefSession()
+        for role, content in turns:
+            session.append(role, content)
+        self._put(session_id, session)
+        return session
+
+    def __contains__(self, session_id: object) -> bool:
+        self._expire()
+        return session_id in self._sessions
+
+    def get(self, session_id: Optional[str]) -> Optional[ChefSession]:
+        self._expire()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None:
+            session.touched = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    async def discard(self, session_id: Optional[str]) -> None:
+        if session_id:
+            self._sessions.pop(session_id, None)
+            if self._turn_log is not None:
+                await self._turn_log.delete(session_id)
+
+    def _put(self, session_id: str, session: ChefSession) -> None:
+        self._expire()
+        self._sessions[session_id] = session
+        while len(self._sessions) > self._max_sessions:
+            self._sessions.popitem(last=False)
+
+    def _expire(self) -> None:
+        deadline = time.monotonic() - self._ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.touched >= deadline:
+                break
+            self._sessions.popitem(last=False)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import aiosqlite
+
+LOGGER = logging.getLogger(__name__)
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS chef_turns (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_chef_turns_created ON chef_turns(created_at);
+"""
+
+
+class ChefTurnLog:
+    """Append-only SQLite log of /chef turns, one row per turn.
+
+    A turn costs one small insert, however long the dialog already is, and
+    the log is what a session is rebuilt from after a restart or in another
+    worker process. Sessions with no turn for ``ttl`` seconds are removed
+    by a sweeper.
+    """
+
+    def __init__(
+        self,
+        database_path: Path,
+        *,
+        ttl: Optional[float] = 24 * 60 * 60,
+        sweep_interval: float = 10 * 60,
+    ) -> None:
+        self._path = database_path
+        self._ttl = ttl
+        self._sweep_interval = sweep_interval
+        self._db: Optional[aiosqlite.Connection] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = await aiosqlite.connect(self._path)
+        await self._db.execute("PRAGMA journal_mode = WAL")
+        await self._db.executescript(CREATE_TABLE_SQL)
+        await self._db.commit()
+        if self._ttl is not None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def append(self, session_id: str, seq: int, role: str, content: str) -> None:
+        """Store turn number ``seq`` (from 0) of the session."""
+
+        await self._db.execute(
+            """
+            INSERT OR REPLACE INTO chef_turns (session_id, seq, role, content, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (session_id, seq, role, content, time.time()),
+        )
+        await self._db.commit()
+
+    async def load(self, session_id: str) -> List[Tuple[str, str]]:
+        async with self._db.execute(
+            "SELECT role, content FROM chef_turns WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        ) as cursor:
+            return [(role, content) for role, content in await cursor.fetchall()]
+
+    async def delete(self, session_id: str) -> None:
+        await self._db.execute("DELETE FROM chef_turns WHERE session_id = ?", (session_id,))
+        await self._db.commit()
+
+    async def sweep(self) -> int:
+        """Drop the turns of sessions that saw no new turn for ``ttl`` seconds."""
+
+        if self._db is None or self._ttl is None:
+            return 0
+        cursor = await self._db.execute(
+            """
+            DELETE FROM chef_turns WHERE session_id IN (
+                SELECT session_id FROM chef_turns
+                GROUP BY session_id HAVING MAX(created_at) < ?
+            )
+            """,
+            (time.time() - self._ttl,),
+        )
+        await self._db.commit()
+        if cursor.rowcount:
+            LOGGER.info("Chef turn sweeper removed %s turns of abandoned dialogs", cursor.rowcount)
+        return cursor.rowcount
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            try:
+                await self.sweep()
+            except Exception:  # pragma: no cover - retried on the next tick
+                LOGGER.exception("Chef turn sweep failed")
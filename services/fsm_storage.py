@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import aiosqlite
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+LOGGER = logging.getLogger(__name__)
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS fsm_states (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_fsm_updated ON fsm_states(updated_at);
+"""
+
+# (state, data); the record of a key that has neither is deleted on flush
+Record = Tuple[Optional[str], Dict[str, Any]]
+
+
+def _serialize_key(key: StorageKey) -> str:
+    return ":".join(
+        str(part) if part is not None else ""
+        for part in (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            key.business_connection_id,
+            key.destiny,
+        )
+    )
+
+
+class SQLiteStorage(BaseStorage):
+    """aiogram FSM storage persisted in SQLite.
+
+    Reads are served from an LRU cache of ``cache_size`` keys. Writes land in
+    the cache and a dirty set that a background task flushes in one
+    transaction every ``flush_interval`` seconds (``0`` writes through).
+    States untouched for ``ttl`` seconds are removed by a sweeper, so
+    abandoned flows do not pile up.
+
+    With several bot processes sharing one file, use ``cache_size=0`` and
+    ``flush_interval=0`` so that every process sees the latest state.
+    """
+
+    def __init__(
+        self,
+        database_path: Path,
+        *,
+        cache_size: int = 10_000,
+        flush_interval: float = 0.2,
+        ttl: Optional[float] = 24 * 60 * 60,
+        sweep_interval: float = 10 * 60,
+    ) -> None:
+        self._path = database_path
+        self._cache_size = cache_size
+        self._flush_interval = flush_interval
+        self._ttl = ttl
+        self._sweep_interval = sweep_interval
+        self._cache: "OrderedDict[StorageKey, Record]" = OrderedDict()
+        self._dirty: Dict[StorageKey, Tuple[Record, float]] = {}
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = await aiosqlite.connect(self._path)
+        await self._db.execute("PRAGMA journal_mode = WAL")
+        await self._db.executescript(CREATE_TABLE_SQL)
+        await self._db.commit()
+        if self._flush_interval > 0:
+            self._tasks.append(
+                asyncio.create_task(self._periodic(self._flush_interval, self.flush))
+            )
+        if self._ttl is not None:
+            self._tasks.append(
+                asyncio.create_task(self._periodic(self._sweep_interval, self.sweep))
+            )
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        await self.flush()
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        _, data = await self._read(key)
+        await self._write(key, (state.state if isinstance(state, State) else state, data))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._read(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        state, _ = await self._read(key)
+        await self._write(key, (state, data.copy()))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._read(key)
+        return data.copy()
+
+    async def flush(self) -> None:
+        """Persist every dirty key in a single transaction."""
+
+        if self._db is None or not self._dirty:
+            return
+        async with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            upserts = []
+            deletes = []
+            for key, ((state, data), updated_at) in list(dirty.items()):
+                if state is None and not data:
+                    deletes.append((_serialize_key(key),))
+                    continue
+                try:
+                    encoded = json.dumps(data, ensure_ascii=False)
+                except (TypeError, ValueError):
+                    # retrying cannot fix the value, and it must not hold back the other keys
+                    LOGGER.exception("Dropping FSM data of %s: it is not JSON serializable", key)
+                    del dirty[key]
+                    self._cache.pop(key, None)
+                    continue
+                upserts.append((_serialize_key(key), state, encoded, updated_at))
+            try:
+                await self._db.executemany(
+                    "INSERT OR REPLACE INTO fsm_states (key, state, data, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    upserts,
+                )
+                await self._db.executemany("DELETE FROM fsm_states WHERE key = ?", deletes)
+                await self._db.commit()
+            except (aiosqlite.Error, asyncio.CancelledError):
+                # a flush cancelled by close() must leave the batch to the final flush;
+                # writing it twice is harmless
+                await self._db.rollback()
+                # newer writes made during the failed flush win
+                self._dirty = {**dirty, **self._dirty}
+                raise
+
+    async def sweep(self) -> int:
+        """Drop states that were not written for ``ttl`` seconds."""
+
+        if self._db is None or self._ttl is None:
+            return 0
+        deadline = time.time() - self._ttl
+        async with self._lock:
+            cursor = await self._db.execute(
+                "DELETE FROM fsm_states WHERE updated_at < ?", (deadline,)
+            )
+            await self._db.commit()
+        # the cache does not track write times, so drop it rather than serve swept keys
+        self._cache.clear()
+        if cursor.rowcount:
+            LOGGER.info("FSM sweeper removed %s abandoned states", cursor.rowcount)
+        return cursor.rowcount
+
+    async def _read(self, key: StorageKey) -> Record:
+        dirty = self._dirty.get(key)
+        if dirty is not None:
+            return dirty[0]
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        async with self._lock:
+            cursor = await self._db.execute(
+                "SELECT state, data, updated_at FROM fsm_states WHERE key = ?",
+                (_serialize_key(key),),
+            )
+            row = await cursor.fetchone()
+        # a write that raced with the query is newer than the row
+        if key in self._dirty:
+            return self._dirty[key][0]
+        if key in self._cache:
+            return self._cache[key]
+
+        record: Record = (None, {})
+        if row and (self._ttl is None or row[2] >= time.time() - self._ttl):
+            record = (row[0], json.loads(row[1]))
+        self._remember(key, record)
+        return record
+
+    async def _write(self, key: StorageKey, record: Record) -> None:
+        self._remember(key, record)
+        self._dirty[key] = (record, time.time())
+        if self._flush_interval <= 0:
+            await self.flush()
+
+    def _remember(self, key: StorageKey, record: Record) -> None:
+        if self._cache_size <= 0:
+            return
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    async def _periodic(interval: float, action) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await action()
+            except Exception:  # pragma: no cover - retried on the next tick
+                LOGGER.exception("FSM storage background task failed")
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Dict, Optional, TypeVar
+
+from services.recipes.ingredients import ingredient_key
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class GenerationSuperseded(RuntimeError):
+    """A newer request from the same chat replaced this generation."""
+
+
+@dataclass(slots=True)
+class GenerationStats:
+    live: int
+    superseded: int
+    coalesced: int
+
+
+class GenerationTicket:
+    """One request's claim on its chat; see :class:`GenerationRegistry`."""
+
+    __slots__ = ("chat_id", "key", "opened", "superseded", "replaced", "_task")
+
+    def __init__(self, chat_id: int, key: Optional[str], *, replaced: bool = False) -> None:
+        self.chat_id = chat_id
+        self.key = key
+        self.opened = time.monotonic()
+        self.superseded = False
+        # this request superseded the chat's previous one, which is only winding down
+        self.replaced = replaced
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """Await the model call, cancelling it if the ticket gets superseded."""
+
+        if self.superseded:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise GenerationSuperseded(f"chat {self.chat_id}")
+        self._task = asyncio.ensure_future(awaitable)
+        try:
+            return await self._task
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            # our own cancellation (shutdown) wins over being superseded
+            if self.superseded and not (current and current.cancelling()):
+                raise GenerationSuperseded(f"chat {self.chat_id}") from None
+            raise
+        finally:
+            self._task = None
+
+    def supersede(self) -> None:
+        self.superseded = True
+        if self._task is not None:
+            self._task.cancel()
+
+
+class GenerationRegistry:
+    """Keeps at most one live generation per chat.
+
+    ``open`` is called as soon as a request arrives. A request whose
+    ingredients match the live one of its chat and arrives within
+    ``debounce`` seconds is coalesced into it (``open`` returns ``None``).
+    Any other newer request supersedes the live one: its model call is
+    cancelled, or never started if it is still waiting for a slot.
+    """
+
+    def __init__(self, *, debounce: float = 3.0) -> None:
+        self._debounce = debounce
+        self._live: Dict[int, GenerationTicket] = {}
+        self._superseded = 0
+        self._coalesced = 0
+
+    def open(self, chat_id: int, text: Optional[str] = None) -> Optional[GenerationTicket]:
+        key = self._key(text) if text else None
+        live = self._live.get(chat_id)
+        replaced = False
+        if live is not None:
+            fresh = time.monotonic() - live.opened <= self._debounce
+            if key is not None and key == live.key and fresh:
+                self._coalesced += 1
+                LOGGER.info("Coalesced a repeated request in chat %s", chat_id)
+                return None
+            live.supersede()
+            replaced = True
+            self._superseded += 1
+            LOGGER.info("Superseded a running generation in chat %s", chat_id)
+        ticket = GenerationTicket(chat_id, key, replaced=replaced)
+        self._live[chat_id] = ticket
+        return ticket
+
+    def close(self, ticket: GenerationTicket) -> None:
+        if self._live.get(ticket.chat_id) is ticket:
+            del self._live[ticket.chat_id]
+
+    def stats(self) -> GenerationStats:
+        return GenerationStats(
+            live=len(self._live),
+            superseded=self._superseded,
+            coalesced=self._coalesced,
+        )
+
+    @staticmethod
+    def _key(text: str) -> str:
+        # free-form text without known ingredients still compares by its words
+        return ingredient_key(text) or " ".join(text.lower().split())
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from .openai_client import OpenAIClient
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .memory import ConversationMemory, MemoryRecord
+
+LOGGER = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """
+Ты ведёшь краткую память кулинарного ассистента о пользователе.
+
+Текущая сводка:
+{summary}
+
+Реплики, которые выпали из окна диалога (формат "роль: сообщение"):
+{turns}
+
+Обнови сводку. Сохрани устойчивые предпочтения, ограничения и аллергии
+(например, «без глютена»), любимые продукты и блюда; разовые детали отбрось.
+Не больше трёх коротких предложений, без вступлений.
+""".strip()
+
+
+class HistorySummarizer:
+    """Folds turns that left the memory window into a rolling summary.
+
+    Runs off the hot path: ``schedule`` only starts a background task, at
+    most one per chat, which calls a cheap model and stores the result via
+    ``ConversationMemory.set_summary``.
+    """
+
+    def __init__(
+        self,
+        client: OpenAIClient,
+        *,
+        model: Optional[str] = None,
+        max_chars: int = 500,
+    ) -> None:
+        self._client = client
+        self._model = model
+        self._max_chars = max_chars
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def schedule(self, memory: "ConversationMemory", chat_id: int) -> None:
+        if chat_id in self._tasks:
+            return
+        self._tasks[chat_id] = asyncio.get_running_loop().create_task(
+            self._summarize(memory, chat_id)
+        )
+
+    async def _summarize(self, memory: "ConversationMemory", chat_id: int) -> None:
+        records: List[MemoryRecord] = []
+        try:
+            # turns that overflow while the model is busy are picked up next round
+            while records := memory.take_overflow(chat_id):
+                prompt = SUMMARY_PROMPT.format(
+                    summary=memory.get_summary(chat_id) or "(пусто)",
+                    turns="\n".join(f"{record.role}: {record.content}" for record in records),
+                )
+                summary = await self._client.generate_text(prompt, model=self._model)
+                memory.set_summary(chat_id, summary[: self._max_chars])
+        except Exception:
+            LOGGER.exception("History summary for chat %s failed", chat_id)
+            # the turns are retried with the next overflow instead of being lost
+            memory.return_overflow(chat_id, records)
+        finally:
+            self._tasks.pop(chat_id, None)
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import re
+import time
 from dataclasses import dataclass
-from typing import List, Literal, Optional, Sequence
+from typing import Dict, List, Literal, Optional, Sequence, Union
 
 from services.recipes.schemas import RecipeData, parse_recipes_payload
 
+from .chef_sessions import GREETING, ChefSession, ChefSessionStore
 from .openai_client import OpenAIClient
 
+LOGGER = logging.getLogger(__name__)
+
 JSON_SCHEMA = """
 Когда рецепт готов, верни JSON без пояснений:
 {
@@ -47,6 +54,64 @@ INTERACTIVE_PROMPT = """
 {json_schema}
 """.strip()
 
+SPECULATIVE_NOTE = """
+Пользователь ещё не ответил на последний вопрос. Предположи самый
+вероятный ответ и сразу верни рецепт в формате JSON.
+""".strip()
+
+REFINE_PROMPT = """
+Ты заранее подготовил рецепт, предположив ответ пользователя на последний
+вопрос. Теперь ответ известен.
+
+Вопрос: {question}
+Ответ пользователя: {answer}
+
+Черновик рецепта:
+{draft}
+
+Если черновик соответствует ответу, верни его без изменений, иначе исправь
+только то, что ему противоречит. Ответь только JSON по схеме ниже.
+
+{json_schema}
+""".strip()
+
+# Answers that add nothing the speculative recipe could have missed.
+LOW_INFORMATION_ANSWERS = frozenset(
+    {
+        "неважно",
+        "не важно",
+        "не знаю",
+        "любой",
+        "любая",
+        "любое",
+        "любые",
+        "все равно",
+        "без разницы",
+        "как хочешь",
+        "на твой вкус",
+        "на твое усмотрение",
+    }
+)
+
+# Short answers that still commit to one side: the guess may have taken the other.
+YES_NO_ANSWERS = frozenset(
+    {
+        "да",
+        "нет",
+        "ага",
+        "угу",
+        "ок",
+        "окей",
+        "давай",
+        "конечно",
+        "норм",
+        "не надо",
+        "нет ограничений",
+        "без ограничений",
+    }
+)
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
 
 @dataclass(slots=True)
 class InteractiveResponse:
@@ -55,36 +120,191 @@ class InteractiveResponse:
     recipes: Optional[List[RecipeData]] = None
 
 
+@dataclass(slots=True)
+class SpeculationStats:
+    started: int = 0
+    hits: int = 0
+    # hits that needed a refinement call for a yes/no answer
+    refined: int = 0
+    misses: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        decided = self.hits + self.misses
+        return self.hits / decided if decided else 0.0
+
+
+@dataclass(slots=True)
+class _Speculation:
+    task: asyncio.Task
+    started: float
+    finished: Optional[float] = None
+
+
+def _normalize(answer: str) -> str:
+    return " ".join(_PUNCTUATION_RE.sub(" ", answer.lower().replace("ё", "е")).split())
+
+
+def is_low_information(answer: str) -> bool:
+    """The answer leaves the choice to the chef: any guess is right."""
+
+    return _normalize(answer) in LOW_INFORMATION_ANSWERS
+
+
+def is_yes_no(answer: str) -> bool:
+    return _normalize(answer) in YES_NO_ANSWERS
+
+
 class InteractiveChef:
     """Manages multistep recipe clarification powered by GPT."""
 
-    def __init__(self, client: OpenAIClient, *, max_questions: int = 3) -> None:
+    def __init__(
+        self,
+        client: OpenAIClient,
+        *,
+        max_questions: int = 3,
+        sessions: Optional[ChefSessionStore] = None,
+    ) -> None:
         self._client = client
         self._max_questions = max_questions
+        self._sessions = sessions or ChefSessionStore()
+        self._speculations: Dict[str, _Speculation] = {}
+        self._speculation_stats = SpeculationStats()
 
     @property
     def max_questions(self) -> int:
         return self._max_questions
 
+    @property
+    def sessions(self) -> ChefSessionStore:
+        return self._sessions
+
+    @property
+    def speculation_stats(self) -> SpeculationStats:
+        return self._speculation_stats
+
+    async def end_session(self, session_id: Optional[str]) -> None:
+        speculation = self._speculations.pop(session_id, None) if session_id else None
+        if speculation is not None:
+            speculation.task.cancel()
+        await self._sessions.discard(session_id)
+
+    def speculate(self, session_id: str, session: ChefSession) -> None:
+        """Start generating the final recipe while the last question is asked."""
+
+        self.end_speculation(session_id)
+        # sessions abandoned mid-dialog expire from the store; drop their guesses too
+        for stale in [key for key in self._speculations if key not in self._sessions]:
+            self.end_speculation(stale)
+        prompt = self._build_prompt(session.prompt, 0) + "\n\n" + SPECULATIVE_NOTE
+        speculation = _Speculation(
+            task=asyncio.get_running_loop().create_task(self._client.generate_text(prompt)),
+            started=time.monotonic(),
+        )
+
+        def _done(task: asyncio.Task) -> None:
+            speculation.finished = time.monotonic()
+            if not task.cancelled():
+                task.exception()  # a failed guess is not worth a warning
+
+        speculation.task.add_done_callback(_done)
+        self._speculations[session_id] = speculation
+        self._speculation_stats.started += 1
+
+    def end_speculation(self, session_id: str) -> None:
+        speculation = self._speculations.pop(session_id, None)
+        if speculation is not None:
+            speculation.task.cancel()
+
     async def next_step(
         self,
-        history: Sequence[dict[str, str]],
+        history: Union[ChefSession, Sequence[dict[str, str]]],
         remaining_questions: int,
+        *,
+        session_id: Optional[str] = None,
     ) -> InteractiveResponse:
-        serialized = self._serialize_history(history)
-        prompt = INTERACTIVE_PROMPT.format(
+        if isinstance(history, ChefSession):
+            if session_id is not None:
+                speculative = await self._take_speculation(session_id, history)
+                if speculative is not None:
+                    return speculative
+            serialized = history.prompt
+        else:
+            serialized = self._serialize_history(history)
+        raw = await self._client.generate_text(self._build_prompt(serialized, remaining_questions))
+        return self._parse_response(raw)
+
+    async def _take_speculation(
+        self,
+        session_id: str,
+        session: ChefSession,
+    ) -> Optional[InteractiveResponse]:
+        speculation = self._speculations.pop(session_id, None)
+        if speculation is None:
+            return None
+
+        answered_at = time.monotonic()
+        stats = self._speculation_stats
+        role, answer = session.turns[-1] if session.turns else ("", "")
+        yes_no = is_yes_no(answer)
+        if role != "user" or not (yes_no or is_low_information(answer)):
+            speculation.task.cancel()
+            stats.misses += 1
+            return None
+
+        try:
+            draft = await speculation.task
+            response = self._parse_response(draft)
+            if response.kind == "recipe" and yes_no:
+                # the guess may have taken the other side: a short call checks it
+                # against the real answer instead of the whole dialog
+                question = session.turns[-2][1] if len(session.turns) > 1 else ""
+                prompt = self._build_refine_prompt(question, answer, draft)
+                response = self._parse_response(await self._client.generate_text(prompt))
+        except Exception:
+            LOGGER.info("Speculative recipe unusable, falling back", exc_info=True)
+            response = None
+        if response is None or response.kind != "recipe":
+            stats.misses += 1
+            return None
+
+        # without speculation the user would have waited for the whole call
+        duration = (speculation.finished or time.monotonic()) - speculation.started
+        saved = max(0.0, duration - (time.monotonic() - answered_at))
+        stats.hits += 1
+        if yes_no:
+            stats.refined += 1
+        stats.saved_seconds += saved
+        LOGGER.info(
+            "Speculative recipe hit%s: saved %.2fs (hit rate %.0f%%)",
+            " after refinement" if yes_no else "",
+            saved,
+            stats.hit_rate * 100,
+        )
+        return response
+
+    def _build_prompt(self, serialized: str, remaining_questions: int) -> str:
+        return INTERACTIVE_PROMPT.format(
             history=serialized,
             remaining=max(0, remaining_questions),
             max_questions=self._max_questions,
             json_schema=JSON_SCHEMA,
         )
-        raw = await self._client.generate_text(prompt)
-        return self._parse_response(raw)
+
+    @staticmethod
+    def _build_refine_prompt(question: str, answer: str, draft: str) -> str:
+        return REFINE_PROMPT.format(
+            question=question,
+            answer=answer,
+            draft=draft,
+            json_schema=JSON_SCHEMA,
+        )
 
     @staticmethod
     def _serialize_history(history: Sequence[dict[str, str]]) -> str:
         if not history:
-            return "assistant: Привет! Что хочешь приготовить?"
+            return GREETING
         return "\n".join(f"{item['role']}: {item['content']}" for item in history)
 
     @staticmethod
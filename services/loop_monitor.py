@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Iterator, List, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+# lag samples kept for the percentiles: a minute at the default interval
+WINDOW = 600
+
+
+class SlowCallbackError(RuntimeError):
+    """A callback held the event loop longer than :func:`strict_loop` allows."""
+
+
+@dataclass(slots=True)
+class Stall:
+    started_at: float
+    blocked_ms: float
+    stack: str
+
+
+@dataclass(slots=True)
+class LoopLagStats:
+    samples: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    stalls: int
+    captured: int
+
+
+class LoopMonitor:
+    """Measures how late the event loop wakes up and catches what blocks it.
+
+    A task sleeps ``interval`` seconds over and over; how much later than
+    asked it wakes up is the loop lag. A watchdog thread notices when that
+    task has not run for ``threshold`` seconds while the loop is still
+    stuck and records the stack of the loop thread at that moment: the
+    code that holds the loop. The last ``capacity`` stalls are kept.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float = 0.2,
+        interval: float = 0.1,
+        capacity: int = 50,
+    ) -> None:
+        self._threshold = threshold
+        self._interval = interval
+        self._lags: Deque[float] = deque(maxlen=WINDOW)
+        self._stalls: Deque[Stall] = deque(maxlen=capacity)
+        self._stall_count = 0
+        self._captured = 0
+        self._beat = time.monotonic()
+        # the beat the watchdog already took a stack for, and that stall
+        self._captured_beat = 0.0
+        self._pending: Optional[Stall] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._loop_thread_id = 0
+
+    def start(self) -> None:
+        """Start measuring the running loop."""
+
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+
+    def stalls(self) -> List[Stall]:
+        """Recorded stalls, newest first."""
+
+        return list(reversed(self._stalls))
+
+    def stats(self) -> LoopLagStats:
+        lags = sorted(self._lags)
+
+        def percentile(share: float) -> float:
+            if not lags:
+                return 0.0
+            return round(lags[min(len(lags) - 1, int(share * len(lags)))] * 1000, 1)
+
+        return LoopLagStats(
+            samples=len(lags),
+            p50_ms=percentile(0.50),
+            p95_ms=percentile(0.95),
+            p99_ms=percentile(0.99),
+            max_ms=percentile(1.0),
+            stalls=self._stall_count,
+            captured=self._captured,
+        )
+
+    async def _measure(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._beat = time.monotonic()
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, loop.time() - expected)
+            self._lags.append(lag)
+            stall, self._pending = self._pending, None
+            if stall is not None:
+                # the watchdog saw the stall while it lasted; now its length is known
+                stall.blocked_ms = round(lag * 1000, 1)
+            if lag >= self._threshold:
+                self._stall_count += 1
+                if stall is None:
+                    LOGGER.warning("Event loop lagged %.0f ms", lag * 1000)
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self._threshold / 2):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self._interval
+            if blocked < self._threshold or beat == self._captured_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stall = Stall(
+                started_at=time.time() - blocked,
+                blocked_ms=round(blocked * 1000, 1),
+                stack="".join(traceback.format_stack(frame)),
+            )
+            del frame
+            self._captured_beat = beat
+            self._pending = stall
+            self._stalls.append(stall)
+            self._captured += 1
+            LOGGER.warning(
+                "Event loop blocked for over %.0f ms in:\n%s", stall.blocked_ms, stall.stack
+            )
+
+
+@contextmanager
+def strict_loop(max_ms: float) -> Iterator[List[str]]:
+    """Fail if any callback of the running loop takes longer than ``max_ms``.
+
+    For tests and benchmarks: turns on asyncio debug mode, which times every
+    callback, and raises :class:`SlowCallbackError` on exit listing the slow
+    ones. The yielded list fills up as they happen.
+    """
+
+    loop = asyncio.get_running_loop()
+    slow: List[str] = []
+
+    class _Collector(logging.Handler):
+        def emit(self, record: logging.LogRecord) -> None:
+            if isinstance(record.msg, str) and record.msg.startswith("Executing "):
+                slow.append(record.getMessage())
+
+    collector = _Collector(logging.WARNING)
+    asyncio_logger = logging.getLogger("asyncio")
+    debug, duration = loop.get_debug(), loop.slow_callback_duration
+    loop.set_debug(True)
+    loop.slow_callback_duration = max_ms / 1000
+    asyncio_logger.addHandler(collector)
+    try:
+        yield slow
+    finally:
+        asyncio_logger.removeHandler(collector)
+        loop.set_debug(debug)
+        loop.slow_callback_duration = duration
+    if slow:
+        raise SlowCallbackError(
+            f"{len(slow)} callbacks took longer than {max_ms:g} ms:\n" + "\n".join(slow[:20])
+        )
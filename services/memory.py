@@ -1,8 +1,21 @@
 from __future__ import annotations
 
-from collections import deque
+import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass
-from typing import Deque, Dict, Iterable, List
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .history_summarizer import HistorySummarizer
+
+# Role names are stored as small ints; the table grows if a new role shows up.
+_ROLE_NAMES: List[str] = ["user", "assistant", "system"]
+_ROLE_CODES: Dict[str, int] = {name: code for code, name in enumerate(_ROLE_NAMES)}
+
+# Rough per-record bookkeeping cost (tuple + deque slot) added to content bytes.
+RECORD_OVERHEAD = 64
+
+CompactRecord = Tuple[int, str]
 
 
 @dataclass(slots=True)
@@ -11,25 +24,240 @@ class MemoryRecord:
     content: str
 
 
+@dataclass(slots=True)
+class MemoryStats:
+    chats: int
+    records: int
+    bytes: int
+    evicted_lru: int
+    evicted_idle: int
+    evicted_bytes: int
+    dropped_unsummarized: int
+
+
+class _ChatHistory:
+    __slots__ = ("records", "size", "touched", "formatted", "summary", "overflow")
+
+    def __init__(self, limit: int) -> None:
+        self.records: Deque[CompactRecord] = deque(maxlen=limit)
+        self.size = 0
+        self.touched = time.monotonic()
+        # cached format_history() output, None when it has to be rebuilt
+        self.formatted: Optional[str] = ""
+        self.summary = ""
+        # records pushed out of the window and not summarized yet
+        self.overflow: List[CompactRecord] = []
+
+
+def _role_code(role: str) -> int:
+    code = _ROLE_CODES.get(role)
+    if code is None:
+        code = len(_ROLE_NAMES)
+        _ROLE_NAMES.append(role)
+        _ROLE_CODES[role] = code
+    return code
+
+
+def _record_size(content: str) -> int:
+    return len(content.encode("utf-8")) + RECORD_OVERHEAD
+
+
+def _format_record(record: CompactRecord) -> str:
+    return f"{_ROLE_NAMES[record[0]]}: {record[1]}"
+
+
 class ConversationMemory:
-    """Simple in-memory storage for recent user/bot messages."""
+    """Bounded in-memory storage for recent user/bot messages.
+
+    At most ``max_chats`` chats are tracked (least recently used is evicted
+    first), chats idle for ``idle_ttl`` seconds are dropped and, when
+    ``max_bytes`` is set, the oldest chats are evicted to stay under it.
+
+    The formatted history is cached per chat and updated in place on every
+    write, so ``format_history`` does not re-format the window. With a
+    ``summarizer`` the turns that fall out of the window are folded into a
+    short rolling summary in the background and prepended to the formatted
+    history.
+    """
 
-    def __init__(self, limit: int = 10) -> None:
+    def __init__(
+        self,
+        limit: int = 10,
+        *,
+        max_chats: int = 10_000,
+        idle_ttl: Optional[float] = 6 * 60 * 60,
+        max_bytes: Optional[int] = None,
+        max_content_chars: int = 1_000,
+        summarizer: Optional["HistorySummarizer"] = None,
+        summarize_every: int = 4,
+    ) -> None:
         self._limit = limit
-        self._storage: Dict[int, Deque[MemoryRecord]] = {}
+        self._max_chats = max_chats
+        self._idle_ttl = idle_ttl
+        self._max_bytes = max_bytes
+        self._max_content_chars = max_content_chars
+        self._summarizer = summarizer
+        self._summarize_every = summarize_every
+        self._storage: "OrderedDict[int, _ChatHistory]" = OrderedDict()
+        self._bytes = 0
+        self._evicted_lru = 0
+        self._evicted_idle = 0
+        self._evicted_bytes = 0
+        self._dropped_unsummarized = 0
 
     def add(self, chat_id: int, role: str, content: str) -> None:
-        entry = MemoryRecord(role=role, content=content.strip())
-        history = self._storage.setdefault(chat_id, deque(maxlen=self._limit))
-        history.append(entry)
+        text = content.strip()
+        if len(text) > self._max_content_chars:
+            text = text[: self._max_content_chars - 1] + "…"
+
+        history = self._touch(chat_id)
+        if history is None:
+            history = _ChatHistory(self._limit)
+            self._storage[chat_id] = history
+
+        record = (_role_code(role), text)
+        if len(history.records) == history.records.maxlen:
+            evicted = history.records[0]
+            self._shrink(history, _record_size(evicted[1]))
+            if history.formatted is not None:
+                # the evicted record is the first line after the summary: cut it out
+                # by its length instead of formatting the whole window again
+                head = len(f"summary: {history.summary}\n") if history.summary else 0
+                rest = history.formatted[head + len(_format_record(evicted)) + 1 :]
+                if rest:
+                    history.formatted = history.formatted[:head] + rest
+                else:
+                    history.formatted = history.formatted[: max(head - 1, 0)]
+            if self._summarizer is not None:
+                history.overflow.append(evicted)
+                self._trim_overflow(history)
+        history.records.append(record)
+        self._grow(history, _record_size(text))
+        if history.formatted is not None:
+            line = _format_record(record)
+            history.formatted = f"{history.formatted}\n{line}" if history.formatted else line
+
+        if len(history.overflow) >= self._summarize_every:
+            self._summarizer.schedule(self, chat_id)
+        self._enforce_limits()
+
+    async def preload(self, chat_id: int) -> None:
+        """Wait until the history of ``chat_id`` can be read; it always can here."""
 
     def get_history(self, chat_id: int) -> List[MemoryRecord]:
-        return list(self._storage.get(chat_id, []))
+        history = self._touch(chat_id)
+        if history is None:
+            return []
+        return [
+            MemoryRecord(role=_ROLE_NAMES[code], content=text)
+            for code, text in history.records
+        ]
 
     def format_history(self, chat_id: int) -> str:
-        history: Iterable[MemoryRecord] = self._storage.get(chat_id, [])
-        return "\n".join(f"{record.role}: {record.content}" for record in history)
+        history = self._touch(chat_id)
+        if history is None:
+            return ""
+        if history.formatted is None:
+            lines = [f"summary: {history.summary}"] if history.summary else []
+            lines.extend(_format_record(record) for record in history.records)
+            history.formatted = "\n".join(lines)
+        return history.formatted
+
+    def get_summary(self, chat_id: int) -> str:
+        history = self._storage.get(chat_id)
+        return history.summary if history is not None else ""
+
+    def set_summary(self, chat_id: int, summary: str) -> None:
+        history = self._storage.get(chat_id)
+        if history is None:
+            return
+        self._shrink(history, len(history.summary.encode("utf-8")))
+        history.summary = summary.strip()
+        self._grow(history, len(history.summary.encode("utf-8")))
+        history.formatted = None
+
+    def take_overflow(self, chat_id: int) -> List[MemoryRecord]:
+        """Hand the turns that left the window over to the summarizer."""
+
+        history = self._storage.get(chat_id)
+        if history is None or not history.overflow:
+            return []
+        overflow, history.overflow = history.overflow, []
+        return [MemoryRecord(role=_ROLE_NAMES[code], content=text) for code, text in overflow]
+
+    def return_overflow(self, chat_id: int, records: List[MemoryRecord]) -> None:
+        """Put back turns the summarizer took but could not fold in."""
+
+        history = self._storage.get(chat_id)
+        if history is None:
+            return
+        returned = [(_role_code(record.role), record.content) for record in records]
+        history.overflow[:0] = returned
+        self._trim_overflow(history)
 
     def clear(self, chat_id: int) -> None:
-        self._storage.pop(chat_id, None)
+        history = self._storage.pop(chat_id, None)
+        if history is not None:
+            self._bytes -= history.size
+
+    def stats(self) -> MemoryStats:
+        self._expire_idle()
+        return MemoryStats(
+            chats=len(self._storage),
+            records=sum(len(history.records) for history in self._storage.values()),
+            bytes=self._bytes,
+            evicted_lru=self._evicted_lru,
+            evicted_idle=self._evicted_idle,
+            evicted_bytes=self._evicted_bytes,
+            dropped_unsummarized=self._dropped_unsummarized,
+        )
+
+    def _touch(self, chat_id: int) -> Optional[_ChatHistory]:
+        self._expire_idle()
+        history = self._storage.get(chat_id)
+        if history is not None:
+            history.touched = time.monotonic()
+            self._storage.move_to_end(chat_id)
+        return history
+
+    def _trim_overflow(self, history: _ChatHistory) -> None:
+        # while the summarizer is failing or behind, keep only the newest turns:
+        # older ones are lost without reaching the summary, so they are counted
+        excess = len(history.overflow) - self._limit
+        if excess > 0:
+            del history.overflow[:excess]
+            self._dropped_unsummarized += excess
+
+    def _grow(self, history: _ChatHistory, size: int) -> None:
+        history.size += size
+        self._bytes += size
+
+    def _shrink(self, history: _ChatHistory, size: int) -> None:
+        history.size -= size
+        self._bytes -= size
+
+    def _evict_oldest(self) -> None:
+        _, history = self._storage.popitem(last=False)
+        self._bytes -= history.size
+
+    def _expire_idle(self) -> None:
+        if self._idle_ttl is None:
+            return
+        deadline = time.monotonic() - self._idle_ttl
+        # the LRU order is also touch order, so expired chats sit at the front
+        while self._storage:
+            history = next(iter(self._storage.values()))
+            if history.touched >= deadline:
+                break
+            self._evict_oldest()
+            self._evicted_idle += 1
 
+    def _enforce_limits(self) -> None:
+        while len(self._storage) > self._max_chats:
+            self._evict_oldest()
+            self._evicted_lru += 1
+        if self._max_bytes is not None:
+            # never evict the chat that was just written to
+            while self._bytes > self._max_bytes and len(self._storage) > 1:
+                self._evict_oldest()
+                self._evicted_bytes += 1
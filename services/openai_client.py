@@ -2,8 +2,12 @@ from __future__ import annotations
 
 import io
 import logging
+from typing import AsyncIterator
+
 from openai import AsyncOpenAI
 
+from services.tracing import span
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -22,22 +26,28 @@ class OpenAIClient:
         vision_model: str,
         transcribe_model: str,
         temperature: float = 0.6,
+        base_url: str | None = None,
     ) -> None:
-        self._client = AsyncOpenAI(api_key=api_key)
+        # base_url points the client at a compatible proxy or a local stand-in
+        self._client = AsyncOpenAI(api_key=api_key, base_url=base_url or None)
         self._text_model = text_model
         self._vision_model = vision_model
         self._transcribe_model = transcribe_model
         self._temperature = temperature
 
-    async def generate_text(self, prompt: str) -> str:
-        """Call GPT-4o text model with a simple user prompt."""
+    async def generate_text(self, prompt: str, *, model: str | None = None) -> str:
+        """Call GPT-4o text model (or ``model``) with a simple user prompt."""
 
+        # CancelledError is not an Exception: it reaches the caller untouched and
+        # httpx closes the upstream connection, so superseded calls stop billing.
+        model = model or self._text_model
         try:
-            response = await self._client.chat.completions.create(
-                model=self._text_model,
-                temperature=self._temperature,
-                messages=[{"role": "user", "content": prompt}],
-            )
+            with span("openai.chat", model=model):
+                response = await self._client.chat.completions.create(
+                    model=model,
+                    temperature=self._temperature,
+                    messages=[{"role": "user", "content": prompt}],
+                )
         except Exception as exc:  # pragma: no cover - network failure
             raise OpenAIClientError("Не удалось получить ответ от OpenAI") from exc
 
@@ -45,6 +55,26 @@ class OpenAIClient:
         LOGGER.debug("Text completion tokens: %s", response.usage)
         return content.strip()
 
+    async def stream_text(self, prompt: str, *, model: str | None = None) -> AsyncIterator[str]:
+        """Like :meth:`generate_text`, yielding the answer in chunks as it is written."""
+
+        model = model or self._text_model
+        try:
+            # the span ends when the caller has consumed the whole answer
+            with span("openai.chat_stream", model=model):
+                stream = await self._client.chat.completions.create(
+                    model=model,
+                    temperature=self._temperature,
+                    messages=[{"role": "user", "content": prompt}],
+                    stream=True,
+                )
+                async with stream:
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+        except Exception as exc:  # pragma: no cover - network failure
+            raise OpenAIClientError("Не удалось получить ответ от OpenAI") from exc
+
     async def generate_vision(
         self,
         prompt: str,
@@ -58,11 +88,12 @@ class OpenAIClient:
         ]
 
         try:
-            response = await self._client.chat.completions.create(
-                model=self._vision_model,
-                temperature=self._temperature,
-                messages=[{"role": "user", "content": payload}],
-            )
+            with span("openai.vision", model=self._vision_model):
+                response = await self._client.chat.completions.create(
+                    model=self._vision_model,
+                    temperature=self._temperature,
+                    messages=[{"role": "user", "content": payload}],
+                )
         except Exception as exc:  # pragma: no cover - network failure
             raise OpenAIClientError("OpenAI Vision запрос завершился ошибкой") from exc
 
@@ -77,11 +108,12 @@ class OpenAIClient:
         buffer.name = filename
 
         try:
-            response = await self._client.audio.transcriptions.create(
-                model=self._transcribe_model,
-                file=buffer,
-                response_format="text",
-            )
+            with span("openai.transcribe", model=self._transcribe_model, bytes=len(audio_bytes)):
+                response = await self._client.audio.transcriptions.create(
+                    model=self._transcribe_model,
+                    file=buffer,
+                    response_format="text",
+                )
         except Exception as exc:  # pragma: no cover - network failure
             raise OpenAIClientError("Не удалось распознать голосовое сообщение") from exc
 
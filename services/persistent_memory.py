@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from .memory import ConversationMemory, MemoryRecord
+
+LOGGER = logging.getLogger(__name__)
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS memory_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_memory_chat ON memory_records(chat_id, id);
+
+CREATE TABLE IF NOT EXISTS memory_summaries (
+    chat_id INTEGER PRIMARY KEY,
+    summary TEXT NOT NULL
+);
+"""
+
+# pending operation: (chat_id, role, content, created_at); role None means "clear chat"
+PendingOp = Tuple[int, Optional[str], str, float]
+
+
+class PersistentConversationMemory(ConversationMemory):
+    """ConversationMemory with a SQLite backing store shared between processes.
+
+    Reads and writes only touch the in-memory layer. Writes are queued and
+    group-committed by a background task every ``flush_interval`` seconds.
+    History of a chat that is not in memory yet is loaded in the
+    background on first access; :meth:`preload` waits for that load, so
+    the first reply after a restart already sees it. Loaded chats are
+    refreshed from disk in the background after ``refresh_after`` seconds
+    so that other bot processes' turns show up.
+    """
+
+    def __init__(
+        self,
+        database_path: Path,
+        limit: int = 10,
+        *,
+        flush_interval: float = 0.5,
+        flush_batch: int = 256,
+        refresh_after: Optional[float] = 30.0,
+        **kwargs,
+    ) -> None:
+        super().__init__(limit, **kwargs)
+        self._path = database_path
+        self._flush_interval = flush_interval
+        self._flush_batch = flush_batch
+        self._refresh_after = refresh_after
+        self._pending: List[PendingOp] = []
+        self._pending_summaries: Dict[int, str] = {}
+        self._synced: Dict[int, float] = {}
+        self._loading: Dict[int, asyncio.Task] = {}
+        self._db: Optional[aiosqlite.Connection] = None
+        self._io_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = await aiosqlite.connect(self._path)
+        await self._db.execute("PRAGMA journal_mode = WAL")
+        await self._db.executescript(CREATE_TABLE_SQL)
+        await self._db.commit()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        loads = list(self._loading.values())
+        for task in loads:
+            task.cancel()
+        await asyncio.gather(*loads, return_exceptions=True)
+        await self.flush()
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    def add(self, chat_id: int, role: str, content: str) -> None:
+        self._schedule_sync(chat_id)
+        super().add(chat_id, role, content)
+        self._pending.append((chat_id, role, content.strip(), time.time()))
+        if len(self._pending) >= self._flush_batch:
+            self._wakeup.set()
+
+    def get_history(self, chat_id: int) -> List[MemoryRecord]:
+        self._schedule_sync(chat_id)
+        return super().get_history(chat_id)
+
+    def format_history(self, chat_id: int) -> str:
+        self._schedule_sync(chat_id)
+        return super().format_history(chat_id)
+
+    async def preload(self, chat_id: int) -> None:
+        self._schedule_sync(chat_id)
+        task = self._loading.get(chat_id)
+        # only a chat missing from memory waits; refreshes stay in the background
+        if task is not None and chat_id not in self._storage:
+            await asyncio.shield(task)
+
+    def clear(self, chat_id: int) -> None:
+        super().clear(chat_id)
+        self._synced[chat_id] = time.monotonic()
+        self._pending_summaries.pop(chat_id, None)
+        self._pending.append((chat_id, None, "", time.time()))
+
+    def set_summary(self, chat_id: int, summary: str) -> None:
+        super().set_summary(chat_id, summary)
+        self._pending_summaries[chat_id] = summary.strip()
+
+    async def flush(self) -> None:
+        """Write all queued records in one transaction."""
+
+        if self._db is None or not (self._pending or self._pending_summaries):
+            return
+        async with self._io_lock:
+            batch, self._pending = self._pending, []
+            summaries, self._pending_summaries = self._pending_summaries, {}
+            touched = set()
+            try:
+                for chat_id, role, content, created_at in batch:
+                    touched.add(chat_id)
+                    if role is None:
+                        await self._db.execute(
+                            "DELETE FROM memory_records WHERE chat_id = ?", (chat_id,)
+                        )
+                        await self._db.execute(
+                            "DELETE FROM memory_summaries WHERE chat_id = ?", (chat_id,)
+                        )
+                    else:
+                        await self._db.execute(
+                            """
+                            INSERT INTO memory_records (chat_id, role, content, created_at)
+                            VALUES (?, ?, ?, ?)
+                            """,
+                            (chat_id, role, content, created_at),
+                        )
+                # keep only the window that can ever be loaded back
+                await self._db.executemany(
+                    """
+                    DELETE FROM memory_records
+                    WHERE chat_id = ? AND id <= (
+                        SELECT id FROM memory_records WHERE chat_id = ?
+                        ORDER BY id DESC LIMIT 1 OFFSET ?
+                    )
+                    """,
+                    [(chat_id, chat_id, self._limit) for chat_id in touched],
+                )
+                await self._db.executemany(
+                    "INSERT OR REPLACE INTO memory_summaries (chat_id, summary) VALUES (?, ?)",
+                    summaries.items(),
+                )
+                await self._db.commit()
+            except (Exception, asyncio.CancelledError):
+                # also when close() cancels the flusher mid-flush: the final flush
+                # writes the batch then
+                await self._db.rollback()
+                self._pending[:0] = batch
+                self._pending_summaries = {**summaries, **self._pending_summaries}
+                raise
+
+        for chat_id in list(self._synced):
+            if chat_id not in self._storage and chat_id not in self._loading:
+                del self._synced[chat_id]
+
+    def _schedule_sync(self, chat_id: int) -> None:
+        if self._db is None or chat_id in self._loading:
+            return
+        synced = self._synced.get(chat_id)
+        if synced is not None and chat_id in self._storage:
+            if self._refresh_after is None or time.monotonic() - synced < self._refresh_after:
+                return
+        self._loading[chat_id] = asyncio.get_running_loop().create_task(self._load(chat_id))
+
+    async def _load(self, chat_id: int) -> None:
+        try:
+            async with self._io_lock:
+                cursor = await self._db.execute(
+                    """
+                    SELECT role, content FROM memory_records
+                    WHERE chat_id = ? ORDER BY id DESC LIMIT ?
+                    """,
+                    (chat_id, self._limit),
+                )
+                rows = list(reversed(await cursor.fetchall()))
+                cursor = await self._db.execute(
+                    "SELECT summary FROM memory_summaries WHERE chat_id = ?", (chat_id,)
+                )
+                stored = await cursor.fetchone()
+                summary = stored[0] if stored else ""
+                # still queued operations are newer than anything on disk
+                for pending_chat, role, content, _ in self._pending:
+                    if pending_chat != chat_id:
+                        continue
+                    if role is None:
+                        rows = []
+                        summary = ""
+                    else:
+                        rows.append((role, content))
+                ConversationMemory.clear(self, chat_id)
+                for role, content in rows[-self._limit :]:
+                    ConversationMemory.add(self, chat_id, role, content)
+                summary = self._pending_summaries.get(chat_id, summary)
+                if summary:
+                    ConversationMemory.set_summary(self, chat_id, summary)
+                self._synced[chat_id] = time.monotonic()
+        except Exception:  # pragma: no cover - disk failure must not break handlers
+            LOGGER.exception("Failed to load conversation memory for chat %s", chat_id)
+        finally:
+            self._loading.pop(chat_id, None)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:  # pragma: no cover - retried on the next tick
+                LOGGER.exception("Conversation memory flush failed")
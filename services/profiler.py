@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from types import FrameType
+from typing import Dict, List, Optional
+
+MAX_SECONDS = 60.0
+MIN_INTERVAL = 0.001
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile of this process is still running."""
+
+
+@dataclass(slots=True)
+class TaskInfo:
+    name: str
+    stack: List[str]
+
+
+@dataclass(slots=True)
+class Profile:
+    seconds: float
+    interval_ms: float
+    samples: int
+    # "thread;outer;...;inner" -> how many samples saw exactly this stack
+    stacks: Dict[str, int]
+    tasks: List[TaskInfo]
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format of flamegraph.pl, speedscope and co."""
+
+        lines = sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in lines)
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    # ";" separates frames and the last space the count in collapsed stacks
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{module}:{name}".replace(";", ":").replace(" ", "_")
+
+
+def _thread_stacks(frames: Dict[int, FrameType], names: Dict[int, str], skip: int) -> List[str]:
+    stacks = []
+    for ident, frame in frames.items():
+        if ident == skip:
+            continue
+        labels: List[str] = []
+        current: Optional[FrameType] = frame
+        while current is not None:
+            labels.append(_label(current))
+            current = current.f_back
+        labels.append(names.get(ident, f"thread-{ident}").replace(" ", "_"))
+        stacks.append(";".join(reversed(labels)))
+    return stacks
+
+
+def dump_tasks() -> List[TaskInfo]:
+    """Every task of the running loop with the chain of awaits it is suspended in."""
+
+    tasks = []
+    for task in asyncio.all_tasks():
+        stack: List[str] = []
+        awaitable = task.get_coro()
+        while awaitable is not None:
+            frame = (
+                getattr(awaitable, "cr_frame", None)
+                or getattr(awaitable, "gi_frame", None)
+                or getattr(awaitable, "ag_frame", None)
+            )
+            if frame is not None:
+                stack.append(f"{_label(frame)}:{frame.f_lineno}")
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(
+                awaitable, "gi_yieldfrom", None
+            )
+        tasks.append(TaskInfo(name=task.get_name(), stack=stack))
+    return sorted(tasks, key=lambda info: info.stack)
+
+
+class SamplingProfiler:
+    """Time-boxed sampling profiler of the whole process.
+
+    While a profile runs, a thread takes the stack of every other thread
+    from ``sys._current_frames()`` each ``interval`` seconds and counts
+    identical stacks. Nothing runs between profiles, so it costs nothing
+    when idle; while sampling, the cost is the GIL time of that thread.
+    """
+
+    def __init__(self) -> None:
+        self._running = False
+
+    async def profile(self, seconds: float, *, interval: float = 0.01) -> Profile:
+        if self._running:
+            raise ProfilerBusy("Профилирование уже идёт")
+        interval = max(interval, MIN_INTERVAL)
+        seconds = min(max(seconds, interval), MAX_SECONDS)
+        self._running = True
+        stacks: Counter = Counter()
+        samples = 0
+        stopping = threading.Event()
+
+        def sample() -> None:
+            nonlocal samples
+            me = threading.get_ident()
+            while not stopping.wait(interval):
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                frames = sys._current_frames()
+                stacks.update(_thread_stacks(frames, names, me))
+                del frames
+                samples += 1
+
+        sampler = threading.Thread(target=sample, name="profiler", daemon=True)
+        started = time.monotonic()
+        try:
+            sampler.start()
+            await asyncio.sleep(seconds)
+        finally:
+            stopping.set()
+            sampler.join()
+            self._running = False
+        return Profile(
+            seconds=round(time.monotonic() - started, 3),
+            interval_ms=interval * 1000,
+            samples=samples,
+            stacks=dict(stacks),
+            tasks=dump_tasks(),
+        )
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from services.recipe_generator import RecipeGenerator, is_card
+from services.recipes.schemas import RecipeData
+from services.storage import RecipeRepository
+
+CardKey = Tuple[str, str, Tuple[str, ...]]
+# (chat_id, recipe_id): only presses in the chat that owns the recipe share a call
+PendingKey = Tuple[int, int]
+
+
+class RecipeExpander:
+    """Turns stored recipe cards into full recipes on demand.
+
+    The expanded recipe replaces the card in the repository, so every later
+    read gets it from there. Expansions are also kept in an LRU keyed by
+    the card contents (identical cards in other chats reuse them) and
+    concurrent presses of the same button share one model call.
+    """
+
+    def __init__(
+        self,
+        generator: RecipeGenerator,
+        repository: RecipeRepository,
+        *,
+        cache_size: int = 1_000,
+    ) -> None:
+        self._generator = generator
+        self._repository = repository
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[CardKey, RecipeData]" = OrderedDict()
+        self._pending: Dict[PendingKey, asyncio.Task] = {}
+
+    async def expand(self, recipe_id: int, *, chat_id: int) -> Optional[Tuple[RecipeData, bool]]:
+        """Full recipe and favorite flag, or ``None`` if the recipe is unknown."""
+
+        key = (chat_id, recipe_id)
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._expand(recipe_id, chat_id))
+            self._pending[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # one caller giving up must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: PendingKey, task: asyncio.Task) -> None:
+        self._pending.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # the waiting handlers report failures themselves
+
+    async def _expand(self, recipe_id: int, chat_id: int) -> Optional[Tuple[RecipeData, bool]]:
+        entry = await self._repository.get_recipe_entry(recipe_id, chat_id=chat_id)
+        if entry is None:
+            return None
+        card, is_favorite = entry
+        if not is_card(card):
+            return entry
+
+        key = (card.title, card.cook_time, tuple(card.ingredients))
+        recipe = self._cache.get(key)
+        if recipe is None:
+            recipe = await self._generator.expand(card)
+            self._cache[key] = recipe
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        await self._repository.update_recipe(recipe_id, chat_id=chat_id, recipe=recipe)
+        return recipe, is_favorite
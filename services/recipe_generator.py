@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import List
+import json
+from typing import AsyncIterator, List
 
-from services.recipes.schemas import RecipeData, parse_recipes_payload
+from services.recipes.schemas import RecipeData, RecipeStreamParser, parse_recipes_payload
 
 from .openai_client import OpenAIClient, OpenAIClientError
 
@@ -69,34 +70,125 @@ DISH_PHOTO_PROMPT = """
 """.strip()
 
 
+CARD_JSON_INSTRUCTION = """
+Ответ строго в формате JSON без пояснений:
+{
+  "recipes": [
+    {
+      "title": "Название блюда",
+      "cook_time": "30 минут",
+      "ingredients": ["ключевой ингредиент 1", "ключевой ингредиент 2"]
+    }
+  ]
+}
+""".strip().replace("{", "{{").replace("}", "}}")
+
+
+TEXT_CARDS_PROMPT = """
+Ты — профессиональный шеф-повар.
+Пользователь ввёл список продуктов.
+Предложи 3 блюда. Для каждого укажи только название, время приготовления
+и 3–6 ключевых ингредиентов, без шагов.
+Массив `recipes` должен содержать ровно 3 объекта.
+
+Список пользователя:
+{user_input}
+
+{json_instruction}
+""".strip()
+
+
+INGREDIENT_PHOTO_CARDS_PROMPT = """
+Ты — компьютерное зрение + эксперт-повар.
+Пользователь прислал фото ингредиентов.
+Определи продукты на фото и предложи 3 блюда (массив `recipes` из 3 объектов).
+Для каждого укажи только название, время приготовления и 3–6 ключевых
+ингредиентов, без шагов.
+
+{json_instruction}
+""".strip()
+
+
+EXPAND_PROMPT = """
+Ты — профессиональный шеф-повар.
+Распиши полный рецепт по карточке блюда: ингредиенты с количеством,
+5–7 шагов, недостающие продукты, вариации и советы по подаче.
+Название и время приготовления сохрани.
+Массив `recipes` содержит один объект.
+
+Карточка:
+{card}
+
+{json_instruction}
+""".strip()
+
+
+def is_card(recipe: RecipeData) -> bool:
+    """A summary card from the lazy mode that has no steps yet."""
+
+    return not recipe.steps
+
+
 class RecipeGenerationError(RuntimeError):
     """Domain specific error for recipe generation failures."""
 
 
 class RecipeGenerator:
-    """Encapsulates all prompt engineering for GPT-4o."""
+    """Encapsulates all prompt engineering for GPT-4o.
 
-    def __init__(self, client: OpenAIClient) -> None:
+    In ``lazy`` mode text and ingredient-photo requests return short cards
+    (title, time, key ingredients); :meth:`expand` writes the full recipe
+    for one card on demand.
+    """
+
+    def __init__(self, client: OpenAIClient, *, lazy: bool = False) -> None:
         self._client = client
+        self._lazy = lazy
 
     async def from_text(self, user_text: str, history: str | None = None) -> List[RecipeData]:
-        prompt = TEXT_PROMPT.format(
+        prompt = (TEXT_CARDS_PROMPT if self._lazy else TEXT_PROMPT).format(
             user_input=user_text.strip(),
-            json_instruction=JSON_INSTRUCTION,
+            json_instruction=CARD_JSON_INSTRUCTION if self._lazy else JSON_INSTRUCTION,
         )
         prompt = self._with_history(prompt, history)
         raw = await self._call(self._client.generate_text, prompt)
         return self._parse(raw)
 
+    async def stream_from_text(
+        self,
+        user_text: str,
+        history: str | None = None,
+    ) -> AsyncIterator[RecipeData]:
+        """Like :meth:`from_text`, yielding every recipe as soon as the model finishes it."""
+
+        prompt = (TEXT_CARDS_PROMPT if self._lazy else TEXT_PROMPT).format(
+            user_input=user_text.strip(),
+            json_instruction=CARD_JSON_INSTRUCTION if self._lazy else JSON_INSTRUCTION,
+        )
+        parser = RecipeStreamParser()
+        found = 0
+        try:
+            async for chunk in self._client.stream_text(self._with_history(prompt, history)):
+                for recipe in parser.feed(chunk):
+                    found += 1
+                    yield recipe
+        except OpenAIClientError as exc:  # pragma: no cover - network failure
+            raise RecipeGenerationError(str(exc)) from exc
+        if not found:
+            # not the expected layout: the tolerant parser may still make sense of it
+            for recipe in self._parse(parser.text):
+                yield recipe
+
     async def from_ingredient_photo(
         self,
         image_base64_url: str,
         history: str | None = None,
     ) -> List[RecipeData]:
-        prompt = self._with_history(
-            INGREDIENT_PHOTO_PROMPT.format(json_instruction=JSON_INSTRUCTION),
-            history,
-        )
+        if self._lazy:
+            template = INGREDIENT_PHOTO_CARDS_PROMPT.format(json_instruction=CARD_JSON_INSTRUCTION)
+        else:
+            template = INGREDIENT_PHOTO_PROMPT.format(json_instruction=JSON_INSTRUCTION)
+        prompt = self._with_history(template, history)
         raw = await self._call(
             self._client.generate_vision,
             prompt,
@@ -120,6 +212,20 @@ class RecipeGenerator:
         )
         return self._parse(raw)
 
+    async def expand(self, card: RecipeData) -> RecipeData:
+        """Write the full recipe for a card; the card alone is the context."""
+
+        summary = json.dumps(
+            {"title": card.title, "cook_time": card.cook_time, "ingredients": card.ingredients},
+            ensure_ascii=False,
+        )
+        prompt = EXPAND_PROMPT.format(card=summary, json_instruction=JSON_INSTRUCTION)
+        raw = await self._call(self._client.generate_text, prompt)
+        recipe = self._parse(raw)[0]
+        recipe.title = recipe.title or card.title
+        recipe.cook_time = recipe.cook_time or card.cook_time
+        return recipe
+
     @staticmethod
     def _with_history(prompt: str, history: str | None) -> str:
         if history:
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+# canonical ingredient -> phrases users actually type
+SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "курица": (
+        "курица",
+        "курочка",
+        "куриное филе",
+        "куриная грудка",
+        "куриные бедра",
+        "куриные крылья",
+        "куриные голени",
+        "цыпленок",
+        "бройлер",
+        "филе курицы",
+        "грудка курицы",
+    ),
+    "индейка": ("индейка", "филе индейки", "грудка индейки"),
+    "говядина": ("говядина", "телятина", "говяжья вырезка", "говяжье филе"),
+    "свинина": ("свинина", "свиная шея", "свиная вырезка", "свиная корейка"),
+    "фарш": ("фарш", "мясной фарш", "домашний фарш"),
+    "бекон": ("бекон", "грудинка"),
+    "колбаса": ("колбаса", "сосиски", "сардельки", "ветчина"),
+    "лосось": ("лосось", "семга", "форель", "филе лосося"),
+    "рыба": ("рыба", "рыбное филе", "треска", "минтай", "хек"),
+    "креветки": ("креветки", "креветка"),
+    "яйцо": ("яйцо", "яйца", "яиц", "яичко", "куриное яйцо", "куриные яйца"),
+    "молоко": ("молоко",),
+    "сливки": ("сливки", "сливок"),
+    "сметана": ("сметана",),
+    "творог": ("творог",),
+    "кефир": ("кефир",),
+    "йогурт": ("йогурт",),
+    "сыр": ("сыр", "твердый сыр", "моцарелла", "сыр моцарелла", "чеддер"),
+    "пармезан": ("пармезан", "сыр пармезан"),
+    "масло сливочное": ("сливочное масло", "масло сливочное"),
+    "масло растительное": (
+        "масло",
+        "растительное масло",
+        "подсолнечное масло",
+        "оливковое масло",
+        "масло растительное",
+        "масло оливковое",
+    ),
+    "картофель": ("картофель", "картошка", "картофелина", "молодой картофель"),
+    "морковь": ("морковь", "морковка"),
+    "лук": ("лук", "репчатый лук", "лук репчатый", "луковица", "красный лук"),
+    "зеленый лук": ("зеленый лук", "лук зеленый", "перья лука"),
+    "чеснок": ("чеснок", "зубчик чеснока"),
+    "помидор": ("помидор", "помидоры", "томат", "томаты", "черри", "томаты черри"),
+    "огурец": ("огурец", "огурцы"),
+    "перец болгарский": ("болгарский перец", "перец болгарский", "сладкий перец"),
+    "перец черный": ("черный перец", "перец черный", "молотый перец"),
+    "капуста": ("капуста", "белокочанная капуста"),
+    "брокколи": ("брокколи",),
+    "цветная капуста": ("цветная капуста",),
+    "кабачок": ("кабачок", "кабачки", "цукини"),
+    "баклажан": ("баклажан", "баклажаны"),
+    "грибы": ("грибы", "шампиньоны", "вешенки", "белые грибы"),
+    "шпинат": ("шпинат",),
+    "зелень": ("зелень", "укроп", "петрушка", "кинза", "базилик"),
+    "лимон": ("лимон", "лимонный сок"),
+    "яблоко": ("яблоко", "яблоки"),
+    "банан": ("банан", "бананы"),
+    "рис": ("рис", "рис басмати", "рис жасмин"),
+    "гречка": ("гречка", "греча", "гречневая крупа"),
+    "овсянка": ("овсянка", "овсяные хлопья", "геркулес"),
+    "макароны": ("макароны", "паста", "спагетти", "феттучини", "пенне", "лапша"),
+    "мука": ("мука", "пшеничная мука"),
+    "сахар": ("сахар",),
+    "соль": ("соль",),
+    "хлеб": ("хлеб", "батон", "багет"),
+    "фасоль": ("фасоль",),
+    "нут": ("нут",),
+    "чечевица": ("чечевица",),
+    "кукуруза": ("кукуруза",),
+    "горошек": ("горошек", "зеленый горошек"),
+    "тофу": ("тофу",),
+    "авокадо": ("авокадо",),
+    "мед": ("мед",),
+}
+
+# Stems of units, counters and filler words that never name an ingredient.
+STOP_STEMS = frozenset(
+    {
+        "г",
+        "гр",
+        "грамм",
+        "кг",
+        "килограмм",
+        "мл",
+        "л",
+        "литр",
+        "шт",
+        "штук",
+        "ст",
+        "ч",
+        "стакан",
+        "ложк",
+        "щепотк",
+        "пучок",
+        "пучк",
+        "банк",
+        "упаковк",
+        "пачк",
+        "зубчик",
+        "зубчк",
+        "кусок",
+        "кусочек",
+        "кусочк",
+        "немн",
+        "немног",
+        "по",
+        "вкус",
+        "для",
+        "свеж",
+        "охлажденн",
+        "замороженн",
+        "мелк",
+        "крупн",
+        "больш",
+        "маленьк",
+        "средн",
+        "пар",
+        "нескольк",
+        "ест",
+        "у",
+        "мен",
+        "дом",
+    }
+)
+
+_ENDINGS = tuple(
+    sorted(
+        (
+            "ыми", "ими", "ого", "его", "ому", "ему", "ами", "ями",
+            "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ую", "юю",
+            "ых", "их", "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ей",
+            "а", "я", "ы", "и", "у", "ю", "е", "о", "ь",
+        ),
+        key=len,
+        reverse=True,
+    )
+)
+_MIN_STEM = 3
+
+_ITEM_SPLIT_RE = re.compile(r"[,;\n]+|\s+и\s+|\s+или\s+|\s+\+\s+")
+_QUANTITY_RE = re.compile(r"\d+(?:[.,/]\d+)?")
+_WORD_RE = re.compile(r"[a-zа-я]+")
+
+Trie = Dict[str, List[Tuple[Tuple[str, ...], str]]]
+
+
+@lru_cache(maxsize=8192)
+def stem(word: str) -> str:
+    """Strip the most common Russian inflection endings from a lowercased word."""
+
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+def _tokenize(text: str) -> List[str]:
+    lowered = text.lower().replace("ё", "е")
+    lowered = _QUANTITY_RE.sub(" ", lowered)
+    return [
+        stemmed
+        for stemmed in (stem(word) for word in _WORD_RE.findall(lowered))
+        if len(stemmed) > 1 and stemmed not in STOP_STEMS
+    ]
+
+
+@lru_cache(maxsize=1)
+def _synonym_trie() -> Trie:
+    """Compile SYNONYMS into a first-stem index, longest phrases first."""
+
+    trie: Trie = {}
+    for canonical, phrases in SYNONYMS.items():
+        for phrase in phrases:
+            stems = tuple(_tokenize(phrase))
+            if stems:
+                trie.setdefault(stems[0], []).append((stems, canonical))
+    for candidates in trie.values():
+        candidates.sort(key=lambda item: len(item[0]), reverse=True)
+    return trie
+
+
+@lru_cache(maxsize=4096)
+def _canonicalize_item(item: str) -> Tuple[str, ...]:
+    tokens = _tokenize(item)
+    trie = _synonym_trie()
+    result: List[str] = []
+    position = 0
+    while position < len(tokens):
+        for stems, canonical in trie.get(tokens[position], ()):
+            if tuple(tokens[position : position + len(stems)]) == stems:
+                result.append(canonical)
+                position += len(stems)
+                break
+        else:
+            result.append(tokens[position])
+            position += 1
+    return tuple(result)
+
+
+def canonical_ingredients(source: str | Iterable[str]) -> Tuple[str, ...]:
+    """Return a sorted, de-duplicated tuple of canonical ingredient tokens.
+
+    Accepts either raw user text ("Куриная грудка 500г, 2 яйца") or an
+    iterable of ingredient lines as stored in ``RecipeData.ingredients``.
+    """
+
+    items = _ITEM_SPLIT_RE.split(source) if isinstance(source, str) else source
+    tokens = set()
+    for item in items:
+        tokens.update(_canonicalize_item(item.strip()))
+    return tuple(sorted(tokens))
+
+
+def ingredient_key(source: str | Iterable[str]) -> str:
+    """Stable string form of :func:`canonical_ingredients` for keys and columns."""
+
+    return "|".join(canonical_ingredients(source))
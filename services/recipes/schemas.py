@@ -3,8 +3,9 @@ from __future__ import annotations
 import json
 import logging
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
+from services.tracing import span
 
 LOGGER = logging.getLogger(__name__)
 
@@ -21,6 +22,11 @@ class RecipeData:
 
 
 def parse_recipes_payload(raw: str) -> List[RecipeData]:
+    with span("recipes.parse", chars=len(raw)):
+        return _parse_recipes_payload(raw)
+
+
+def _parse_recipes_payload(raw: str) -> List[RecipeData]:
     normalized = _extract_json_block(raw)
     try:
         payload = json.loads(normalized)
@@ -37,17 +43,7 @@ def parse_recipes_payload(raw: str) -> List[RecipeData]:
         if not isinstance(entry, dict):
             continue
 
-        recipes.append(
-            RecipeData(
-                title=_get_text(entry, "title"),
-                cook_time=_get_text(entry, "cook_time"),
-                ingredients=_get_list(entry, "ingredients"),
-                steps=_get_list(entry, "steps"),
-                missing_items=_get_list(entry, "missing_items"),
-                variations=_get_list(entry, "variations"),
-                serving_tips=_get_list(entry, "serving_tips"),
-            )
-        )
+        recipes.append(_recipe_from_entry(entry))
 
     if not recipes:
         raise ValueError("Не удалось распарсить рецепты из JSON")
@@ -55,6 +51,83 @@ def parse_recipes_payload(raw: str) -> List[RecipeData]:
     return recipes
 
 
+class RecipeStreamParser:
+    """Picks complete recipe objects out of a JSON answer as it streams in.
+
+    The answer is expected to look like ``{"recipes": [{...}, {...}]}``;
+    every object of the array is returned by :meth:`feed` as soon as its
+    closing brace arrives. :attr:`text` keeps the whole answer so the caller
+    can fall back to :func:`parse_recipes_payload` when nothing was found.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._position = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[RecipeData]:
+        self.text += chunk
+        if not self._in_array:
+            key = self.text.find('"recipes"')
+            bracket = self.text.find("[", key) if key != -1 else -1
+            if bracket == -1:
+                return []
+            self._in_array = True
+            self._position = bracket + 1
+
+        recipes: List[RecipeData] = []
+        text = self.text
+        for index in range(self._position, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = index
+                self._depth += 1
+            elif char == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    recipe = self._decode(text[self._start : index + 1])
+                    if recipe is not None:
+                        recipes.append(recipe)
+                    self._start = None
+        self._position = len(text)
+        return recipes
+
+    @staticmethod
+    def _decode(raw: str) -> Optional[RecipeData]:
+        try:
+            entry = json.loads(raw)
+        except json.JSONDecodeError:
+            LOGGER.debug("Skipping a streamed recipe that is not valid JSON: %s", raw)
+            return None
+        return _recipe_from_entry(entry) if isinstance(entry, dict) else None
+
+
+def _recipe_from_entry(entry: dict) -> RecipeData:
+    return RecipeData(
+        title=_get_text(entry, "title"),
+        cook_time=_get_text(entry, "cook_time"),
+        ingredients=_get_list(entry, "ingredients"),
+        steps=_get_list(entry, "steps"),
+        missing_items=_get_list(entry, "missing_items"),
+        variations=_get_list(entry, "variations"),
+        serving_tips=_get_list(entry, "serving_tips"),
+    )
+
+
 def _extract_json_block(raw: str) -> str:
     """Try to recover JSON even if the model added extra text or fences."""
 
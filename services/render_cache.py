@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# (chat_id, recipe_id): a recipe is only ever shown in the chat that owns it
+CacheKey = Tuple[int, int]
+
+
+@dataclass(slots=True)
+class RenderedRecipe:
+    text: str
+    is_favorite: bool
+    expandable: bool = False
+
+
+class RenderCache:
+    """LRU of rendered recipe messages keyed by chat and recipe id.
+
+    Carousel pages and favorite toggles are served from here, so switching
+    pages does not touch the database while the recipe is cached.
+    """
+
+    def __init__(self, max_entries: int = 5_000) -> None:
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, RenderedRecipe]" = OrderedDict()
+
+    def get(self, chat_id: int, recipe_id: int) -> Optional[RenderedRecipe]:
+        entry = self._entries.get((chat_id, recipe_id))
+        if entry is not None:
+            self._entries.move_to_end((chat_id, recipe_id))
+        return entry
+
+    def put(
+        self,
+        chat_id: int,
+        recipe_id: int,
+        text: str,
+        is_favorite: bool = False,
+        expandable: bool = False,
+    ) -> RenderedRecipe:
+        entry = RenderedRecipe(text=text, is_favorite=is_favorite, expandable=expandable)
+        self._entries[(chat_id, recipe_id)] = entry
+        self._entries.move_to_end((chat_id, recipe_id))
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def set_favorite(self, chat_id: int, recipe_id: int, is_favorite: bool) -> None:
+        entry = self._entries.get((chat_id, recipe_id))
+        if entry is not None:
+            entry.is_favorite = is_favorite
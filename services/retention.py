@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .storage import RecipeRepository
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RetentionPolicy:
+    """Which recipes expire and what happens to them."""
+
+    max_age_days: int
+    archive_path: Optional[Path] = None
+    batch_size: int = 200
+    vacuum_pages: int = 128
+    batch_pause: float = 0.05
+
+
+class RetentionWorker:
+    """Background task that expires old non-favorite recipes in small batches."""
+
+    def __init__(self, repository: RecipeRepository, policy: RetentionPolicy) -> None:
+        self._repository = repository
+        self._policy = policy
+
+    async def run_once(self) -> int:
+        """Expire everything currently due and reclaim the freed pages."""
+
+        policy = self._policy
+        total = 0
+        while True:
+            removed = await self._repository.purge_expired(
+                policy.max_age_days,
+                batch_size=policy.batch_size,
+                archive_path=policy.archive_path,
+            )
+            if not removed:
+                break
+            total += removed
+            await self._repository.incremental_vacuum(policy.vacuum_pages)
+            # leave room for handler writes between batches
+            await asyncio.sleep(policy.batch_pause)
+
+        free_pages = await self._repository.incremental_vacuum(policy.vacuum_pages)
+        while free_pages:
+            await asyncio.sleep(policy.batch_pause)
+            remaining = await self._repository.incremental_vacuum(policy.vacuum_pages)
+            if remaining >= free_pages:
+                break
+            free_pages = remaining
+
+        if total:
+            LOGGER.info(
+                "Retention: %s recipes %s",
+                total,
+                "archived" if policy.archive_path else "deleted",
+            )
+        return total
+
+    async def run_forever(self, interval: float) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:  # pragma: no cover - keep the worker alive
+                LOGGER.exception("Retention pass failed")
+            await asyncio.sleep(interval)
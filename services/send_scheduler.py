@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendChatAction, TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+LOGGER = logging.getLogger(__name__)
+
+PRIORITY_EDIT = 0
+PRIORITY_SEND = 1
+PRIORITY_ACTION = 2
+
+# Telegram shows a chat action for about five seconds.
+CHAT_ACTION_TTL = 4.5
+
+_LIMITED_PREFIXES = ("Send", "Edit", "Copy", "Forward")
+
+
+@dataclass(slots=True)
+class SendStats:
+    queued: int
+    sent: int
+    retried: int
+    batched_actions: int
+    retry_after_seconds: float
+
+
+class _Bucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def ready_at(self, now: float) -> float:
+        """Moment a whole token is available (``now`` if it already is)."""
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        ready = now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+        return max(ready, self.paused_until)
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    @property
+    def idle(self) -> bool:
+        return self.tokens >= self.capacity and self.paused_until <= time.monotonic()
+
+
+# (priority, sequence, chat_id, future)
+_Item = Tuple[int, int, int, asyncio.Future]
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """Bot session middleware that paces outgoing messages to Telegram's limits.
+
+    Every send/edit/copy/forward call that targets a chat waits for a token
+    from a global bucket (``global_rate`` per second) and from its chat's
+    bucket (``chat_rate``, or ``group_rate`` for groups). Within a chat
+    calls go in the order they were made, one at a time; across chats the
+    next call of each chat is served by priority (edits, then messages,
+    then chat actions). A
+    ``TelegramRetryAfter`` pauses the chat's bucket and the call is retried
+    up to ``max_retries`` times. A chat action repeating the one still
+    shown in the chat is answered locally without a request.
+
+    Calls that do not target a chat (``getUpdates``, ``answerCallbackQuery``,
+    ``getFile`` ...) pass through untouched.
+    """
+
+    def __init__(
+        self,
+        *,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        group_rate: float = 20 / 60,
+        chat_burst: int = 3,
+        max_retries: int = 3,
+    ) -> None:
+        self._global = _Bucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._group_rate = group_rate
+        self._chat_burst = chat_burst
+        self._max_retries = max_retries
+        self._chats: Dict[int, _Bucket] = {}
+        self._in_flight: Set[int] = set()
+        # chat_id -> (action, shown until) of the last chat action sent there
+        self._actions: Dict[int, Tuple[str, float]] = {}
+        self._queue: List[_Item] = []
+        self._sequence = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._sent = 0
+        self._retried = 0
+        self._batched_actions = 0
+        self._retry_after_total = 0.0
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if not isinstance(chat_id, int) or not type(method).__name__.startswith(
+            _LIMITED_PREFIXES
+        ):
+            return await make_request(bot, method)
+
+        if isinstance(method, SendChatAction):
+            action, shown_until = self._actions.get(chat_id, ("", 0.0))
+            if action == method.action and shown_until > time.monotonic():
+                self._batched_actions += 1
+                return Response[bool](ok=True, result=True)
+            priority = PRIORITY_ACTION
+        elif type(method).__name__.startswith("Edit"):
+            priority = PRIORITY_EDIT
+        else:
+            priority = PRIORITY_SEND
+
+        self._sequence += 1
+        sequence = self._sequence
+        attempt = 0
+        while True:
+            await self._acquire(priority, sequence, chat_id)
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                attempt += 1
+                self._retried += 1
+                self._retry_after_total += exc.retry_after
+                self._chat_bucket(chat_id).paused_until = time.monotonic() + exc.retry_after
+                LOGGER.warning(
+                    "Flood control in chat %s: retry in %ss (attempt %s)",
+                    chat_id,
+                    exc.retry_after,
+                    attempt,
+                )
+                if attempt > self._max_retries:
+                    raise
+                continue
+            finally:
+                self._release(chat_id)
+            self._sent += 1
+            if priority == PRIORITY_ACTION:
+                self._actions[chat_id] = (method.action, time.monotonic() + CHAT_ACTION_TTL)
+            else:
+                # a new message hides the chat action
+                self._actions.pop(chat_id, None)
+            return response
+
+    def stats(self) -> SendStats:
+        return SendStats(
+            queued=len(self._queue),
+            sent=self._sent,
+            retried=self._retried,
+            batched_actions=self._batched_actions,
+            retry_after_seconds=self._retry_after_total,
+        )
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def _acquire(self, priority: int, sequence: int, chat_id: int) -> None:
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._dispatch_loop())
+        future = asyncio.get_running_loop().create_future()
+        item = (priority, sequence, chat_id, future)
+        bisect.insort(self._queue, item, key=lambda queued: queued[:2])
+        self._wakeup.set()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(chat_id)
+            elif item in self._queue:
+                self._queue.remove(item)
+            raise
+
+    def _release(self, chat_id: int) -> None:
+        self._in_flight.discard(chat_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _chat_bucket(self, chat_id: int) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            rate = self._group_rate if chat_id < 0 else self._chat_rate
+            bucket = self._chats[chat_id] = _Bucket(rate, self._chat_burst)
+        return bucket
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            delay = self._dispatch()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self) -> Optional[float]:
+        """Start every call that may go now; return how long to sleep otherwise."""
+
+        now = time.monotonic()
+        next_ready: Optional[float] = None
+        blocked: Set[int] = set()
+        # the oldest waiting call of each chat; only it may go
+        heads: Dict[int, int] = {}
+        for item in list(self._queue):
+            _, sequence, chat_id, future = item
+            if future.done():
+                self._queue.remove(item)
+            elif sequence < heads.get(chat_id, sequence + 1):
+                heads[chat_id] = sequence
+        for item in list(self._queue):
+            _, sequence, chat_id, future = item
+            if sequence != heads[chat_id]:
+                continue
+            if chat_id in blocked or chat_id in self._in_flight:
+                blocked.add(chat_id)
+                continue
+            global_ready = self._global.ready_at(now)
+            if global_ready > now:
+                next_ready = global_ready if next_ready is None else min(next_ready, global_ready)
+                break
+            bucket = self._chat_bucket(chat_id)
+            chat_ready = bucket.ready_at(now)
+            if chat_ready > now:
+                blocked.add(chat_id)
+                next_ready = chat_ready if next_ready is None else min(next_ready, chat_ready)
+                continue
+            self._global.take()
+            bucket.take()
+            self._in_flight.add(chat_id)
+            self._queue.remove(item)
+            future.set_result(None)
+
+        self._forget_idle(now)
+        return None if next_ready is None else max(0.0, next_ready - now)
+
+    def _forget_idle(self, now: float) -> None:
+        if len(self._chats) > 10_000:
+            for chat_id in [chat for chat, bucket in self._chats.items() if bucket.idle]:
+                del self._chats[chat_id]
+        if len(self._actions) > 10_000:
+            self._actions = {
+                chat_id: shown
+                for chat_id, shown in self._actions.items()
+                if shown[1] > now
+            }
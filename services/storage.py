@@ -1,51 +1,204 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
-from dataclasses import dataclass
+import logging
+import zlib
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import AsyncIterator, Callable, List, Optional, Tuple
 
 import aiosqlite
 
+from services.recipes.ingredients import ingredient_key
 from services.recipes.schemas import RecipeData
+from services.tracing import traced
+
+LOGGER = logging.getLogger(__name__)
+
+CREATE_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS recipe_bodies (
+    hash BLOB PRIMARY KEY,
+    body BLOB NOT NULL,
+    raw_size INTEGER NOT NULL
+) WITHOUT ROWID;
 
-CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS recipes (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     chat_id INTEGER NOT NULL,
     title TEXT NOT NULL,
-    cook_time TEXT,
-    ingredients TEXT NOT NULL,
-    steps TEXT NOT NULL,
-    missing_items TEXT,
-    variations TEXT,
-    serving_tips TEXT,
+    body_hash BLOB NOT NULL REFERENCES recipe_bodies(hash),
+    ingredient_key TEXT,
     source TEXT,
     is_favorite INTEGER DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+CREATE INDEX IF NOT EXISTS idx_recipes_body_hash ON recipes(body_hash);
+CREATE INDEX IF NOT EXISTS idx_recipes_expiry ON recipes(created_at) WHERE is_favorite = 0;
+CREATE INDEX IF NOT EXISTS idx_recipes_chat ON recipes(chat_id, id);
+CREATE INDEX IF NOT EXISTS idx_recipes_chat_favorites ON recipes(chat_id, id) WHERE is_favorite = 1;
+
+CREATE TABLE IF NOT EXISTS shard_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+CREATE_ARCHIVE_SQL = """
+CREATE TABLE IF NOT EXISTS archive.archived_recipes (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    body BLOB NOT NULL,
+    source TEXT,
+    created_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 """
 
+LEGACY_LIST_COLUMNS = ("ingredients", "steps", "missing_items", "variations", "serving_tips")
+MIGRATION_BATCH_SIZE = 500
+INCREMENTAL_AUTO_VACUUM = 2
+# Upper bound for the shard count; the low bits of every recipe id hold its origin shard.
+ID_STRIDE = 1024
+REBALANCE_BATCH_SIZE = 500
+
+# called with the chat whose recipes changed, or None when it may be any chat
+ChangeListener = Callable[[Optional[int]], None]
+
 
 @dataclass(slots=True)
 class RecipeRecord:
     id: int
     title: str
     is_favorite: bool
+    created_at: str
+
+
+@dataclass(slots=True)
+class StoredRow:
+    """A recipe row with its compressed body, as it is moved between shards."""
+
+    id: int
+    chat_id: int
+    title: str
+    body_hash: bytes
+    ingredient_key: Optional[str]
+    source: Optional[str]
+    is_favorite: int
+    created_at: str
+    body: bytes
+    raw_size: int
+
+
+@dataclass(slots=True)
+class StorageReport:
+    """Logical (one JSON copy per row) versus physical (deduplicated) size."""
+
+    rows: int
+    bodies: int
+    logical_bytes: int
+    stored_bytes: int
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.logical_bytes - self.stored_bytes
+
+
+class StorageLayoutError(RuntimeError):
+    """Configured shard count does not match the files on disk."""
+
+
+class _Shard:
+    """One SQLite file with a writer connection, serialized by ``lock``, and a reader.
+
+    In WAL mode the read-only ``reader`` sees the last committed state, so
+    reads neither wait for the lock nor see a write transaction halfway.
+    """
+
+    def __init__(self, index: int, path: Path) -> None:
+        self.index = index
+        self.path = path
+        self.lock = asyncio.Lock()
+        self._db: Optional[aiosqlite.Connection] = None
+        self._reader: Optional[aiosqlite.Connection] = None
+
+    @property
+    def db(self) -> aiosqlite.Connection:
+        if self._db is None:
+            raise RuntimeError("RecipeRepository.init() was not called")
+        return self._db
+
+    @property
+    def reader(self) -> aiosqlite.Connection:
+        if self._reader is None:
+            raise RuntimeError("RecipeRepository.init() was not called")
+        return self._reader
+
+    async def open(self) -> None:
+        self._db = await aiosqlite.connect(self.path)
+        # readers, ours and those of other worker processes, must not block on a writer
+        await self._db.execute("PRAGMA journal_mode = WAL")
+        self._reader = await aiosqlite.connect(
+            f"{self.path.resolve().as_uri()}?mode=ro", uri=True
+        )
+
+    async def close(self) -> None:
+        for connection in (self._reader, self._db):
+            if connection is not None:
+                await connection.close()
+        self._db = self._reader = None
 
 
 class RecipeRepository:
-    """SQLite storage for generated recipes and favorite flags."""
+    """SQLite storage for generated recipes and favorite flags.
+
+    Recipe contents live once per shard in ``recipe_bodies`` as a
+    zlib-compressed JSON blob addressed by the hash of the normalized
+    recipe; per-chat rows in ``recipes`` only reference it.
+
+    Chats are spread over ``shards`` files by a stable hash of ``chat_id``.
+    Shard 0 is ``database_path`` itself, so a single-shard setup keeps the
+    original file. Recipe ids are ``seq * ID_STRIDE + shard`` and stay
+    unique across shards; rows keep their id when rebalanced, so lookups
+    route by ``chat_id`` and old ``fav:<id>`` buttons keep working.
+    """
 
-    def __init__(self, database_path: Path) -> None:
+    def __init__(self, database_path: Path, *, shards: int = 1) -> None:
+        if not 1 <= shards <= ID_STRIDE:
+            raise ValueError(f"shards must be between 1 and {ID_STRIDE}")
         self._path = database_path
+        self._shards = [_Shard(index, shard_path(database_path, index)) for index in range(shards)]
+        self._listeners: List[ChangeListener] = []
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        """Call ``listener`` after every committed change of this process."""
+
+        self._listeners.append(listener)
 
     async def init(self) -> None:
-        self._path.parent.mkdir(parents=True, exist_ok=True)
-        async with aiosqlite.connect(self._path) as db:
-            await db.execute(CREATE_TABLE_SQL)
-            await db.commit()
+        await self.open()
+        stored = await self.stored_shard_count()
+        if stored is None:
+            await self.save_shard_count()
+        elif stored != self.shard_count:
+            await self.close()
+            raise StorageLayoutError(
+                f"База разбита на {stored} шардов, а в настройках указано {self.shard_count}. "
+                "Запусти tools/rebalance_shards.py, чтобы перераспределить данные."
+            )
+
+    async def close(self) -> None:
+        for shard in self._shards:
+            await shard.close()
 
+    @traced("db.add_recipe")
     async def add_recipe(
         self,
         chat_id: int,
@@ -53,41 +206,112 @@ class RecipeRepository:
         *,
         source: str,
     ) -> int:
-        async with aiosqlite.connect(self._path) as db:
+        body_hash, body, raw_size = self._pack(recipe)
+        shard = self._shard_for(chat_id)
+        async with shard.lock:
+            db = shard.db
             cursor = await db.execute(
+                "UPDATE shard_meta SET value = value + 1 WHERE key = 'next_seq' RETURNING value - 1"
+            )
+            recipe_id = (await cursor.fetchone())[0] * ID_STRIDE + shard.index
+            await db.execute(
+                "INSERT OR IGNORE INTO recipe_bodies (hash, body, raw_size) VALUES (?, ?, ?)",
+                (body_hash, body, raw_size),
+            )
+            await db.execute(
                 """
-                INSERT INTO recipes (
-                    chat_id,
-                    title,
-                    cook_time,
-                    ingredients,
-                    steps,
-                    missing_items,
-                    variations,
-                    serving_tips,
-                    source
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO recipes (id, chat_id, title, body_hash, ingredient_key, source)
+                VALUES (?, ?, ?, ?, ?, ?)
                 """,
                 (
+                    recipe_id,
                     chat_id,
                     recipe.title,
-                    recipe.cook_time,
-                    self._dump(recipe.ingredients),
-                    self._dump(recipe.steps),
-                    self._dump(recipe.missing_items),
-                    self._dump(recipe.variations),
-                    self._dump(recipe.serving_tips),
+                    body_hash,
+                    ingredient_key(recipe.ingredients),
                     source,
                 ),
             )
             await db.commit()
-            return cursor.lastrowid
+        self._changed(chat_id)
+        return recipe_id
+
+    @traced("db.get_recipe")
+    async def get_recipe(self, recipe_id: int, *, chat_id: int) -> Optional[RecipeData]:
+        async with self._shard_for(chat_id).reader.execute(
+            """
+            SELECT b.body FROM recipes r
+            JOIN recipe_bodies b ON b.hash = r.body_hash
+            WHERE r.id = ? AND r.chat_id = ?
+            """,
+            (recipe_id, chat_id),
+        ) as cursor:
+            row = await cursor.fetchone()
+        return self._unpack(row[0]) if row else None
+
+    @traced("db.update_recipe")
+    async def update_recipe(self, recipe_id: int, *, chat_id: int, recipe: RecipeData) -> bool:
+        """Replace the contents of a stored recipe; ``False`` if it does not exist."""
+
+        body_hash, body, raw_size = self._pack(recipe)
+        shard = self._shard_for(chat_id)
+        async with shard.lock:
+            db = shard.db
+            cursor = await db.execute(
+                "SELECT body_hash FROM recipes WHERE id = ? AND chat_id = ?",
+                (recipe_id, chat_id),
+            )
+            row = await cursor.fetchone()
+            if not row:
+                return False
+            await db.execute(
+                "INSERT OR IGNORE INTO recipe_bodies (hash, body, raw_size) VALUES (?, ?, ?)",
+                (body_hash, body, raw_size),
+            )
+            await db.execute(
+                "UPDATE recipes SET title = ?, body_hash = ?, ingredient_key = ? WHERE id = ?",
+                (recipe.title, body_hash, ingredient_key(recipe.ingredients), recipe_id),
+            )
+            await db.execute(
+                """
+                DELETE FROM recipe_bodies
+                WHERE hash = ?
+                  AND NOT EXISTS (SELECT 1 FROM recipes WHERE body_hash = recipe_bodies.hash)
+                """,
+                (row[0],),
+            )
+            await db.commit()
+        self._changed(chat_id)
+        return True
+
+    @traced("db.get_recipe_entry")
+    async def get_recipe_entry(
+        self,
+        recipe_id: int,
+        *,
+        chat_id: int,
+    ) -> Optional[Tuple[RecipeData, bool]]:
+        """Like :meth:`get_recipe`, together with the favorite flag."""
 
-    async def toggle_favorite(self, recipe_id: int) -> Optional[bool]:
-        async with aiosqlite.connect(self._path) as db:
+        async with self._shard_for(chat_id).reader.execute(
+            """
+            SELECT b.body, r.is_favorite FROM recipes r
+            JOIN recipe_bodies b ON b.hash = r.body_hash
+            WHERE r.id = ? AND r.chat_id = ?
+            """,
+            (recipe_id, chat_id),
+        ) as cursor:
+            row = await cursor.fetchone()
+        return (self._unpack(row[0]), row[1] == 1) if row else None
+
+    @traced("db.toggle_favorite")
+    async def toggle_favorite(self, recipe_id: int, *, chat_id: int) -> Optional[bool]:
+        shard = self._shard_for(chat_id)
+        async with shard.lock:
+            db = shard.db
             cursor = await db.execute(
-                "SELECT is_favorite FROM recipes WHERE id = ?", (recipe_id,)
+                "SELECT is_favorite FROM recipes WHERE id = ? AND chat_id = ?",
+                (recipe_id, chat_id),
             )
             row = await cursor.fetchone()
             if not row:
@@ -100,9 +324,482 @@ class RecipeRepository:
                 (new_value, recipe_id),
             )
             await db.commit()
-            return bool(new_value)
+        self._changed(chat_id)
+        return bool(new_value)
+
+    @traced("db.list_recipes")
+    async def list_recipes(
+        self,
+        chat_id: int,
+        *,
+        favorites_only: bool = False,
+        before: Optional[int] = None,
+        limit: int = 20,
+    ) -> List[RecipeRecord]:
+        """Newest first, starting below the recipe id ``before`` (keyset pagination)."""
+
+        conditions = ["chat_id = ?"]
+        params: List[object] = [chat_id]
+        if favorites_only:
+            conditions.append("is_favorite = 1")
+        if before is not None:
+            conditions.append("id < ?")
+            params.append(before)
+        params.append(limit)
+        async with self._shard_for(chat_id).reader.execute(
+            f"""
+            SELECT id, title, is_favorite, created_at FROM recipes
+            WHERE {" AND ".join(conditions)}
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            params,
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            RecipeRecord(id=row[0], title=row[1], is_favorite=row[2] == 1, created_at=row[3])
+            for row in rows
+        ]
+
+    async def purge_expired(
+        self,
+        max_age_days: int,
+        *,
+        batch_size: int,
+        archive_path: Optional[Path] = None,
+    ) -> int:
+        """Remove one batch per shard of non-favorite recipes older than ``max_age_days``.
+
+        When ``archive_path`` is given the rows (with their still compressed
+        bodies) are copied into that database in the same transaction.
+        Returns the number of rows removed; ``0`` means nothing is left.
+        """
+
+        removed = 0
+        for shard in self._shards:
+            async with shard.lock:
+                removed += await self._purge_shard(
+                    shard.db, max_age_days, batch_size, archive_path
+                )
+        if removed:
+            self._changed(None)
+        return removed
+
+    async def incremental_vacuum(self, pages: int) -> int:
+        """Return up to ``pages`` free pages per shard to the OS; report how many remain."""
+
+        remaining = 0
+        for shard in self._shards:
+            async with shard.lock:
+                cursor = await shard.db.execute(f"PRAGMA incremental_vacuum({int(pages)})")
+                await cursor.fetchall()  # pages are freed while the pragma is stepped
+                cursor = await shard.db.execute("PRAGMA freelist_count")
+                remaining += (await cursor.fetchone())[0]
+        return remaining
+
+    async def storage_report(self) -> StorageReport:
+        """Report how many bytes deduplication and compression currently save."""
+
+        report = StorageReport(rows=0, bodies=0, logical_bytes=0, stored_bytes=0)
+        for shard in self._shards:
+            async with shard.reader.execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(b.raw_size), 0)
+                FROM recipes r JOIN recipe_bodies b ON b.hash = r.body_hash
+                """
+            ) as cursor:
+                rows, logical = await cursor.fetchone()
+            async with shard.reader.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM recipe_bodies"
+            ) as cursor:
+                bodies, stored = await cursor.fetchone()
+            report.rows += rows
+            report.bodies += bodies
+            report.logical_bytes += logical
+            report.stored_bytes += stored
+        return report
+
+    async def open(self) -> None:
+        """Open and prepare every shard without checking the stored layout.
+
+        :meth:`init` does this and then the check; maintenance tools that
+        change the layout, like :func:`rebalance_shards`, call it directly.
+        """
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        for shard in self._shards:
+            await shard.open()
+            await self._prepare(shard.db)
+
+        # Every shard continues above every id handed out so far, in any shard:
+        # rebalanced rows may bring higher ids than the shard's own counter.
+        max_id = 0
+        for shard in self._shards:
+            cursor = await shard.db.execute("SELECT COALESCE(MAX(id), 0) FROM recipes")
+            max_id = max(max_id, (await cursor.fetchone())[0])
+        for shard in self._shards:
+            await shard.db.execute(
+                """
+                INSERT INTO shard_meta (key, value) VALUES ('next_seq', ?)
+                ON CONFLICT (key) DO UPDATE SET value = MAX(value, excluded.value)
+                """,
+                (max_id // ID_STRIDE + 1,),
+            )
+            await shard.db.commit()
+
+    async def stored_shard_count(self) -> Optional[int]:
+        """The shard count the files on disk were laid out for, if recorded."""
+
+        cursor = await self._shards[0].db.execute(
+            "SELECT value FROM shard_meta WHERE key = 'shard_count'"
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def save_shard_count(self) -> None:
+        """Record :attr:`shard_count` as the layout of the files on disk."""
+
+        db = self._shards[0].db
+        async with self._shards[0].lock:
+            await db.execute(
+                "INSERT OR REPLACE INTO shard_meta (key, value) VALUES ('shard_count', ?)",
+                (self.shard_count,),
+            )
+            await db.commit()
+
+    def shard_of(self, chat_id: int) -> int:
+        """Index of the shard that holds the recipes of ``chat_id``."""
+
+        return shard_index(chat_id, len(self._shards))
+
+    async def iter_rows(
+        self, shard: int, *, batch_size: int = REBALANCE_BATCH_SIZE
+    ) -> AsyncIterator[List[StoredRow]]:
+        """Every row stored in shard ``shard`` with its body, in batches by id."""
+
+        last_id = 0
+        while True:
+            async with self._shards[shard].reader.execute(
+                """
+                SELECT r.id, r.chat_id, r.title, r.body_hash, r.ingredient_key,
+                       r.source, r.is_favorite, r.created_at, b.body, b.raw_size
+                FROM recipes r JOIN recipe_bodies b ON b.hash = r.body_hash
+                WHERE r.id > ? ORDER BY r.id LIMIT ?
+                """,
+                (last_id, batch_size),
+            ) as cursor:
+                batch = [StoredRow(*row) for row in await cursor.fetchall()]
+            if not batch:
+                return
+            last_id = batch[-1].id
+            yield batch
+
+    async def move_rows(self, source: int, rows: List[StoredRow]) -> None:
+        """Move ``rows`` out of shard ``source`` into the shard of their chat.
+
+        The copies are committed before the originals are deleted, so an
+        interrupted move loses nothing and can be repeated.
+        """
+
+        if not rows:
+            return
+        targets = {self.shard_of(row.chat_id) for row in rows}
+        for index in targets:
+            shard = self._shards[index]
+            async with shard.lock:
+                for row in rows:
+                    if self.shard_of(row.chat_id) != index:
+                        continue
+                    await shard.db.execute(
+                        "INSERT OR IGNORE INTO recipe_bodies (hash, body, raw_size) VALUES (?, ?, ?)",
+                        (row.body_hash, row.body, row.raw_size),
+                    )
+                    await shard.db.execute(
+                        """
+                        INSERT OR IGNORE INTO recipes (
+                            id, chat_id, title, body_hash, ingredient_key, source,
+                            is_favorite, created_at
+                        )
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            row.id,
+                            row.chat_id,
+                            row.title,
+                            row.body_hash,
+                            row.ingredient_key,
+                            row.source,
+                            row.is_favorite,
+                            row.created_at,
+                        ),
+                    )
+                await shard.db.commit()
+
+        ids = [row.id for row in rows if self.shard_of(row.chat_id) != source]
+        if not ids:
+            return
+        shard = self._shards[source]
+        async with shard.lock:
+            await shard.db.execute(
+                f"DELETE FROM recipes WHERE id IN ({', '.join('?' * len(ids))})", ids
+            )
+            await shard.db.commit()
+        self._changed(None)
+
+    async def drop_unused_bodies(self, shard: int) -> None:
+        """Delete the bodies of shard ``shard`` that no recipe references any more."""
+
+        target = self._shards[shard]
+        async with target.lock:
+            await target.db.execute(
+                """
+                DELETE FROM recipe_bodies
+                WHERE NOT EXISTS (SELECT 1 FROM recipes WHERE body_hash = recipe_bodies.hash)
+                """
+            )
+            await target.db.commit()
+
+    def _changed(self, chat_id: Optional[int]) -> None:
+        for listener in self._listeners:
+            listener(chat_id)
+
+    def _shard_for(self, chat_id: int) -> _Shard:
+        return self._shards[shard_index(chat_id, len(self._shards))]
+
+    async def _prepare(self, db: aiosqlite.Connection) -> None:
+        cursor = await db.execute("PRAGMA auto_vacuum")
+        needs_vacuum = (await cursor.fetchone())[0] != INCREMENTAL_AUTO_VACUUM
+        if needs_vacuum:
+            # takes effect for existing files only after the VACUUM below
+            await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if await self._has_legacy_layout(db):
+            await db.execute("ALTER TABLE recipes RENAME TO recipes_legacy")
+        await db.executescript(CREATE_TABLES_SQL)
+        # the legacy table also survives an interrupted migration
+        legacy = await self._table_exists(db, "recipes_legacy")
+        if legacy:
+            report = await self._migrate_legacy(db)
+            LOGGER.info(
+                "Migrated %s recipes into %s bodies: %s -> %s bytes (saved %s)",
+                report.rows,
+                report.bodies,
+                report.logical_bytes,
+                report.stored_bytes,
+                report.saved_bytes,
+            )
+        await db.commit()
+        if legacy or needs_vacuum:
+            await db.execute("VACUUM")
+
+    @staticmethod
+    async def _purge_shard(
+        db: aiosqlite.Connection,
+        max_age_days: int,
+        batch_size: int,
+        archive_path: Optional[Path],
+    ) -> int:
+        if archive_path is not None:
+            await db.execute("ATTACH DATABASE ? AS archive", (str(archive_path),))
+        try:
+            cursor = await db.execute(
+                """
+                SELECT id, body_hash FROM recipes
+                WHERE is_favorite = 0 AND created_at < datetime('now', ?)
+                ORDER BY created_at
+                LIMIT ?
+                """,
+                (f"-{max_age_days} days", batch_size),
+            )
+            expired = await cursor.fetchall()
+            if not expired:
+                return 0
+
+            ids = [row[0] for row in expired]
+            hashes = list({row[1] for row in expired})
+            id_marks = ", ".join("?" * len(ids))
+            hash_marks = ", ".join("?" * len(hashes))
+
+            if archive_path is not None:
+                await db.execute(CREATE_ARCHIVE_SQL)
+                await db.execute(
+                    f"""
+                    INSERT OR REPLACE INTO archive.archived_recipes (
+                        id, chat_id, title, body, source, created_at
+                    )
+                    SELECT r.id, r.chat_id, r.title, b.body, r.source, r.created_at
+                    FROM recipes r JOIN recipe_bodies b ON b.hash = r.body_hash
+                    WHERE r.id IN ({id_marks})
+                    """,
+                    ids,
+                )
+            await db.execute(f"DELETE FROM recipes WHERE id IN ({id_marks})", ids)
+            await db.execute(
+                f"""
+                DELETE FROM recipe_bodies
+                WHERE hash IN ({hash_marks})
+                  AND NOT EXISTS (SELECT 1 FROM recipes WHERE body_hash = recipe_bodies.hash)
+                """,
+                hashes,
+            )
+            await db.commit()
+        finally:
+            if db.in_transaction:
+                await db.rollback()
+            if archive_path is not None:
+                await db.execute("DETACH DATABASE archive")
+        return len(ids)
+
+    @staticmethod
+    async def _has_legacy_layout(db: aiosqlite.Connection) -> bool:
+        cursor = await db.execute("PRAGMA table_info(recipes)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        return "steps" in columns
+
+    @staticmethod
+    async def _table_exists(db: aiosqlite.Connection, name: str) -> bool:
+        cursor = await db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        )
+        return await cursor.fetchone() is not None
+
+    async def _migrate_legacy(self, db: aiosqlite.Connection) -> StorageReport:
+        """Move rows from the five-JSON-column layout into ``recipe_bodies``."""
+
+        cursor = await db.execute("PRAGMA table_info(recipes_legacy)")
+        has_key = "ingredient_key" in {row[1] for row in await cursor.fetchall()}
+        key_column = "ingredient_key" if has_key else "NULL"
+
+        rows = 0
+        logical = 0
+        last_id = 0
+        while True:
+            cursor = await db.execute(
+                f"""
+                SELECT id, chat_id, title, cook_time, ingredients, steps, missing_items,
+                       variations, serving_tips, {key_column}, source, is_favorite, created_at
+                FROM recipes_legacy WHERE id > ? ORDER BY id LIMIT ?
+                """,
+                (last_id, MIGRATION_BATCH_SIZE),
+            )
+            batch = await cursor.fetchall()
+            if not batch:
+                break
+
+            for row in batch:
+                recipe_id, chat_id, title, cook_time = row[:4]
+                lists = row[4:9]
+                key, source, is_favorite, created_at = row[9:]
+                recipe = RecipeData(
+                    title=title or "",
+                    cook_time=cook_time or "",
+                    **{
+                        name: self._load(value)
+                        for name, value in zip(LEGACY_LIST_COLUMNS, lists)
+                    },
+                )
+                body_hash, body, raw_size = self._pack(recipe)
+                await db.execute(
+                    "INSERT OR IGNORE INTO recipe_bodies (hash, body, raw_size) VALUES (?, ?, ?)",
+                    (body_hash, body, raw_size),
+                )
+                await db.execute(
+                    """
+                    INSERT OR IGNORE INTO recipes (
+                        id, chat_id, title, body_hash, ingredient_key, source,
+                        is_favorite, created_at
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        recipe_id,
+                        chat_id,
+                        title or "",
+                        body_hash,
+                        key or ingredient_key(recipe.ingredients),
+                        source,
+                        is_favorite,
+                        created_at,
+                    ),
+                )
+                logical += sum(len((value or "").encode("utf-8")) for value in row[2:9])
+                rows += 1
+            last_id = batch[-1][0]
+
+        await db.execute("DROP TABLE recipes_legacy")
+        cursor = await db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM recipe_bodies"
+        )
+        bodies, stored = await cursor.fetchone()
+        return StorageReport(rows=rows, bodies=bodies, logical_bytes=logical, stored_bytes=stored)
+
+    @staticmethod
+    def _pack(recipe: RecipeData) -> Tuple[bytes, bytes, int]:
+        """Serialize a normalized recipe; return ``(hash, compressed body, raw size)``."""
+
+        normalized = {
+            key: value.strip() if isinstance(value, str) else [item.strip() for item in value]
+            for key, value in asdict(recipe).items()
+        }
+        raw = json.dumps(
+            normalized,
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        body_hash = hashlib.blake2b(raw, digest_size=16).digest()
+        return body_hash, zlib.compress(raw, 9), len(raw)
+
+    @staticmethod
+    def _unpack(body: bytes) -> RecipeData:
+        return RecipeData(**json.loads(zlib.decompress(body)))
 
     @staticmethod
-    def _dump(items: Iterable[str] | None) -> str:
-        return json.dumps(list(items or []), ensure_ascii=False)
+    def _load(value: Optional[str]) -> List[str]:
+        if not value:
+            return []
+        try:
+            items = json.loads(value)
+        except json.JSONDecodeError:
+            return [value]
+        return [str(item) for item in items] if isinstance(items, list) else [str(items)]
+
+
+def shard_path(database_path: Path, index: int) -> Path:
+    if index == 0:
+        return database_path
+    return database_path.with_name(f"{database_path.stem}.shard{index}{database_path.suffix}")
+
+
+def shard_index(chat_id: int, shards: int) -> int:
+    return zlib.crc32(str(chat_id).encode("ascii")) % shards
+
+
+async def rebalance_shards(database_path: Path, shards: int) -> int:
+    """Spread existing recipes over ``shards`` files; return the number moved.
+
+    Must run while the bot is stopped. Rows are copied before they are
+    deleted from their old shard, so an interrupted run can simply be
+    repeated.
+    """
+
+    repository = RecipeRepository(database_path, shards=shards)
+    try:
+        await repository.open()
+        current = await repository.stored_shard_count() or 1
+        if shards < current:
+            raise StorageLayoutError(
+                f"Нельзя уменьшить число шардов с {current} до {shards}"
+            )
+
+        moved = 0
+        for source in range(current):
+            async for batch in repository.iter_rows(source):
+                leaving = [row for row in batch if repository.shard_of(row.chat_id) != source]
+                await repository.move_rows(source, leaving)
+                moved += len(leaving)
+            await repository.drop_unused_bodies(source)
 
+        await repository.save_shard_count()
+        return moved
+    finally:
+        await repository.close()
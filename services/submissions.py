@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+SubmissionKey = Tuple[int, str, str]
+
+
+@dataclass(slots=True)
+class Submission:
+    recipe_ids: List[int] = field(default_factory=list)
+    done: bool = False
+    created: float = field(default_factory=time.monotonic)
+
+
+@dataclass(slots=True)
+class SubmissionStats:
+    tracked: int
+    claimed: int
+    duplicates: int
+
+
+def submission_key(chat_id: int, payload: dict) -> SubmissionKey:
+    """``(chat_id, payload hash, submitted_at)`` of a Mini App form."""
+
+    content = {key: value for key, value in payload.items() if key != "submitted_at"}
+    digest = hashlib.sha256(
+        json.dumps(content, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return chat_id, digest, str(payload.get("submitted_at", ""))
+
+
+class SubmissionLedger:
+    """Remembers recent Mini App submissions so each one is generated once.
+
+    A double tap or a re-delivered update carries the same form and the same
+    ``submitted_at``; :meth:`claim` hands such a duplicate the submission
+    already on record instead of letting it start another generation.
+    Holds at most ``max_entries`` keys, each for up to ``ttl`` seconds.
+    """
+
+    def __init__(self, *, max_entries: int = 10_000, ttl: float = 86_400) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: "OrderedDict[SubmissionKey, Submission]" = OrderedDict()
+        self._claimed = 0
+        self._duplicates = 0
+
+    def claim(self, key: SubmissionKey) -> Optional[Submission]:
+        """Return the earlier submission with this key, or record this one and return None."""
+
+        existing = self._entries.get(key)
+        if existing is not None and time.monotonic() - existing.created <= self._ttl:
+            self._duplicates += 1
+            return existing
+        self._entries[key] = Submission()
+        self._entries.move_to_end(key)
+        self._claimed += 1
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return None
+
+    def complete(self, key: SubmissionKey, recipe_ids: List[int]) -> None:
+        submission = self._entries.get(key)
+        if submission is not None:
+            submission.recipe_ids = list(recipe_ids)
+            submission.done = True
+
+    def release(self, key: SubmissionKey) -> None:
+        """Forget a submission that did not complete, so sending the form again retries it."""
+
+        submission = self._entries.get(key)
+        if submission is not None and not submission.done:
+            del self._entries[key]
+
+    def stats(self) -> SubmissionStats:
+        return SubmissionStats(
+            tracked=len(self._entries),
+            claimed=self._claimed,
+            duplicates=self._duplicates,
+        )
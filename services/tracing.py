@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import functools
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, TypeVar
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+# a trace never grows past this many spans; the rest are only counted
+MAX_SPANS = 200
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    start_ms: float
+    duration_ms: float
+    error: Optional[str]
+    attrs: Dict[str, Any]
+
+
+@dataclass(slots=True)
+class TraceStats:
+    traces: int
+    slow: int
+    buffered: int
+    slow_threshold_seconds: float
+
+
+class Trace:
+    """Spans recorded while one update was handled."""
+
+    __slots__ = (
+        "id",
+        "name",
+        "chat_id",
+        "started_at",
+        "duration_ms",
+        "error",
+        "spans",
+        "dropped_spans",
+        "_t0",
+    )
+
+    def __init__(self, trace_id: int, name: str, chat_id: Optional[int]) -> None:
+        self.id = trace_id
+        self.name = name
+        self.chat_id = chat_id
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.error: Optional[str] = None
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self._t0 = time.perf_counter()
+
+    def offset_ms(self, moment: float) -> float:
+        return (moment - self._t0) * 1000
+
+    def add(self, span: Span) -> None:
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped_spans += 1
+
+    def finish(self, error: Optional[BaseException]) -> None:
+        self.duration_ms = self.offset_ms(time.perf_counter())
+        if error is not None:
+            self.error = type(error).__name__
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "chat_id": self.chat_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 1),
+            "error": self.error,
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                {
+                    "name": span.name,
+                    "start_ms": round(span.start_ms, 1),
+                    "duration_ms": round(span.duration_ms, 1),
+                    "error": span.error,
+                    **span.attrs,
+                }
+                for span in sorted(self.spans, key=lambda span: span.start_ms)
+            ],
+        }
+
+    def to_text(self) -> str:
+        """A waterfall: one line per span with its start offset and duration."""
+
+        header = (
+            f"#{self.id} {self.name} chat={self.chat_id} "
+            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at))} "
+            f"{self.duration_ms:.0f} ms" + (f" error={self.error}" if self.error else "")
+        )
+        lines = [header]
+        for span in sorted(self.spans, key=lambda span: span.start_ms):
+            details = [f"{key}={value}" for key, value in span.attrs.items()]
+            if span.error:
+                details.append(f"error={span.error}")
+            lines.append(
+                f"  +{span.start_ms:>8.0f} ms {span.duration_ms:>8.0f} ms  "
+                + " ".join([span.name, *details])
+            )
+        if self.dropped_spans:
+            lines.append(f"  … ещё {self.dropped_spans} spans не сохранены")
+        return "\n".join(lines)
+
+
+_CURRENT: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """Record the enclosed block in the current trace; a no-op outside of one."""
+
+    trace = _CURRENT.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        trace.add(
+            Span(
+                name=name,
+                start_ms=trace.offset_ms(started),
+                duration_ms=(time.perf_counter() - started) * 1000,
+                error=error,
+                attrs=attrs,
+            )
+        )
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorate a coroutine function so every call is recorded as a span."""
+
+    def decorate(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _CURRENT.get() is None:
+                return await func(*args, **kwargs)
+            with span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+class Tracer:
+    """Starts a trace per update and keeps the slow ones.
+
+    Traces that took at least ``slow_threshold`` seconds go to a ring
+    buffer of the last ``capacity`` ones; the others are dropped as soon as
+    they finish. The buffer belongs to the process, so with several web
+    workers every worker shows only the updates it handled.
+    """
+
+    def __init__(self, *, slow_threshold: float = 10.0, capacity: int = 100) -> None:
+        self._slow_threshold = slow_threshold
+        self._slow: Deque[Trace] = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._traces = 0
+        self._slow_count = 0
+
+    @contextmanager
+    def trace(self, name: str, *, chat_id: Optional[int] = None) -> Iterator[Trace]:
+        trace = Trace(next(self._ids), name, chat_id)
+        token = _CURRENT.set(trace)
+        error: Optional[BaseException] = None
+        try:
+            yield trace
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            _CURRENT.reset(token)
+            trace.finish(error)
+            self._traces += 1
+            if trace.duration_ms >= self._slow_threshold * 1000:
+                self._slow_count += 1
+                self._slow.append(trace)
+
+    def slow_traces(self) -> List[Trace]:
+        """Buffered slow traces, newest first."""
+
+        return list(reversed(self._slow))
+
+    def stats(self) -> TraceStats:
+        return TraceStats(
+            traces=self._traces,
+            slow=self._slow_count,
+            buffered=len(self._slow),
+            slow_threshold_seconds=self._slow_threshold,
+        )
+
+
+class TracedRequests(BaseRequestMiddleware):
+    """Bot session middleware recording every Bot API call as a span.
+
+    Register it before :class:`SendScheduler` so the span includes the time
+    a message waited for its turn to be sent.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        if _CURRENT.get() is None:
+            return await make_request(bot, method)
+        with span(f"telegram.{method.__api_method__}"):
+            return await make_request(bot, method)
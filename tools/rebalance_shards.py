@@ -0,0 +1,42 @@
+"""Redistribute stored recipes over a larger number of SQLite shards.
+
+Stop the bot first, then run for example::
+
+    python -m tools.rebalance_shards --shards 4
+
+and set ``DATABASE_SHARDS=4`` before starting the bot again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from config import BASE_DIR
+from services.storage import rebalance_shards
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Rebalance recipe shards")
+    parser.add_argument("--shards", type=int, required=True, help="new shard count")
+    parser.add_argument(
+        "--database",
+        type=Path,
+        default=Path(os.getenv("DATABASE_PATH", BASE_DIR / "recipes.db")),
+        help="path of shard 0 (DATABASE_PATH)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    moved = asyncio.run(rebalance_shards(args.database.resolve(), args.shards))
+    print(f"Moved {moved} recipes; set DATABASE_SHARDS={args.shards}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
+from typing import List, Optional, Sequence, Tuple
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from services.recipes.schemas import RecipeData
 
+# Telegram rejects callback_data longer than 64 bytes.
+CALLBACK_DATA_LIMIT = 64
+
 
 def render_recipe(recipe: RecipeData) -> str:
     parts: list[str] = [f"🍽️ <b>{recipe.title}</b>"]
@@ -37,11 +42,88 @@ def render_recipe(recipe: RecipeData) -> str:
     return "\n".join(part for part in parts if part)
 
 
-def build_favorite_keyboard(recipe_id: int, is_favorite: bool) -> InlineKeyboardMarkup:
+EXPAND_LABEL = "📖 Показать рецепт"
+
+
+def build_favorite_keyboard(
+    recipe_id: int,
+    is_favorite: bool,
+    *,
+    expandable: bool = False,
+) -> InlineKeyboardMarkup:
     label = "★ В избранном" if is_favorite else "☆ В избранное"
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text=label, callback_data=f"fav:{recipe_id}")]
-        ]
+    rows = [[InlineKeyboardButton(text=label, callback_data=f"fav:{recipe_id}")]]
+    if expandable:
+        rows.insert(
+            0, [InlineKeyboardButton(text=EXPAND_LABEL, callback_data=f"exp:{recipe_id}")]
+        )
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def has_expand_button(markup: Optional[InlineKeyboardMarkup]) -> bool:
+    if markup is None:
+        return False
+    return any(
+        (button.callback_data or "").startswith("exp:")
+        for row in markup.inline_keyboard
+        for button in row
     )
 
+
+def _carousel_state(recipe_ids: Sequence[int], index: int) -> str:
+    return f"{','.join(map(str, recipe_ids))}:{index}"
+
+
+def parse_carousel_state(state: str) -> Tuple[List[int], int]:
+    """Inverse of the ``<ids>:<index>`` part of carousel callback data."""
+
+    ids_part, index_part = state.rsplit(":", maxsplit=1)
+    recipe_ids = [int(item) for item in ids_part.split(",")]
+    index = int(index_part)
+    if not 0 <= index < len(recipe_ids):
+        raise ValueError(f"index {index} is out of range")
+    return recipe_ids, index
+
+
+def carousel_fits(recipe_ids: Sequence[int]) -> bool:
+    """Whether the longest carousel button still fits into callback_data."""
+
+    longest = f"fav:{max(recipe_ids)}:{_carousel_state(recipe_ids, len(recipe_ids) - 1)}"
+    return len(longest.encode()) <= CALLBACK_DATA_LIMIT
+
+
+def build_carousel_keyboard(
+    recipe_ids: Sequence[int],
+    index: int,
+    is_favorite: bool,
+    *,
+    expandable: bool = False,
+) -> InlineKeyboardMarkup:
+    count = len(recipe_ids)
+    state = _carousel_state(recipe_ids, index)
+    label = "★ В избранном" if is_favorite else "☆ В избранное"
+    rows = [
+        [
+            InlineKeyboardButton(
+                text="◀",
+                callback_data=f"car:{_carousel_state(recipe_ids, (index - 1) % count)}",
+            ),
+            InlineKeyboardButton(text=f"{index + 1}/{count}", callback_data="car:-"),
+            InlineKeyboardButton(
+                text="▶",
+                callback_data=f"car:{_carousel_state(recipe_ids, (index + 1) % count)}",
+            ),
+        ],
+        [InlineKeyboardButton(text=label, callback_data=f"fav:{recipe_ids[index]}:{state}")],
+    ]
+    if expandable:
+        rows.insert(
+            0,
+            [
+                InlineKeyboardButton(
+                    text=EXPAND_LABEL,
+                    callback_data=f"exp:{recipe_ids[index]}:{state}",
+                )
+            ],
+        )
+    return InlineKeyboardMarkup(inline_keyboard=rows)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+
+MAX_PAYLOAD_BYTES = 4096
+MAX_INGREDIENTS_LENGTH = 1000
+MAX_DIET_LENGTH = 100
+MAX_GOAL_LENGTH = 300
+MAX_EXTRAS = 10
+MAX_EXTRA_LENGTH = 60
+MAX_SUBMITTED_AT_LENGTH = 40
+
+
+class MiniAppPayloadError(ValueError):
+    """The Mini App form is malformed or too large; the message is shown to the user."""
+
+
+def parse_payload(raw: str) -> dict:
+    """Decode and validate the form sent with ``Telegram.WebApp.sendData``."""
+
+    if len(raw.encode("utf-8")) > MAX_PAYLOAD_BYTES:
+        raise MiniAppPayloadError("Слишком большая форма")
+    try:
+        payload = json.loads(raw)
+    except (TypeError, json.JSONDecodeError) as exc:
+        raise MiniAppPayloadError("Не удалось прочитать данные из мини-приложения") from exc
+    return validate_payload(payload)
+
+
+def validate_payload(payload: object) -> dict:
+    """Return the known form fields, stripped; raise MiniAppPayloadError otherwise."""
+
+    if not isinstance(payload, dict):
+        raise MiniAppPayloadError("Не удалось прочитать данные из мини-приложения")
+
+    ingredients = _text(payload, "ingredients", MAX_INGREDIENTS_LENGTH, "Список продуктов")
+    if not ingredients:
+        raise MiniAppPayloadError("Мини-приложение не прислало список продуктов")
+
+    extras = payload.get("extras") or []
+    if not isinstance(extras, list) or not all(isinstance(extra, str) for extra in extras):
+        raise MiniAppPayloadError("Поле «Дополнительно» заполнено неверно")
+    extras = [extra.strip() for extra in extras if extra.strip()]
+    if len(extras) > MAX_EXTRAS or any(len(extra) > MAX_EXTRA_LENGTH for extra in extras):
+        raise MiniAppPayloadError("Слишком много дополнительных пожеланий")
+
+    return {
+        "ingredients": ingredients,
+        "diet": _text(payload, "diet", MAX_DIET_LENGTH, "Тип питания"),
+        "goal": _text(payload, "goal", MAX_GOAL_LENGTH, "Цель"),
+        "extras": extras,
+        "submitted_at": _text(payload, "submitted_at", MAX_SUBMITTED_AT_LENGTH, "Время отправки"),
+    }
+
+
+def compose_prompt(payload: dict) -> str:
+    """Turn the Mini App form into the user's request text."""
+
+    ingredients = payload.get("ingredients", "").strip()
+    diet = payload.get("diet", "").strip()
+    goal = payload.get("goal", "").strip()
+    extras = payload.get("extras", [])
+
+    details = []
+    if diet:
+        details.append(f"Предпочтения: {diet}")
+    if goal:
+        details.append(f"Цель/контекст: {goal}")
+    if extras:
+        details.append("Дополнительно: " + ", ".join(extras))
+
+    if details:
+        return f"{ingredients}\n" + "\n".join(details)
+    return ingredients
+
+
+def _text(payload: dict, key: str, limit: int, label: str) -> str:
+    value = payload.get(key) or ""
+    if not isinstance(value, str):
+        raise MiniAppPayloadError(f"Поле «{label}» заполнено неверно")
+    value = value.strip()
+    if len(value) > limit:
+        raise MiniAppPayloadError(f"Поле «{label}» длиннее {limit} символов")
+    return value
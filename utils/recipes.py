@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-from typing import Awaitable, Callable, List
+from typing import Awaitable, Callable, List, Optional
 
 from services.memory import ConversationMemory
+from services.recipe_generator import is_card
 from services.recipes.schemas import RecipeData
+from services.render_cache import RenderCache
 from services.storage import RecipeRepository
-from utils.messages import build_favorite_keyboard, render_recipe
+from utils.messages import (
+    build_carousel_keyboard,
+    build_favorite_keyboard,
+    carousel_fits,
+    render_recipe,
+)
 
 SendFunc = Callable[..., Awaitable[object]]
 
@@ -18,22 +25,56 @@ async def publish_recipes(
     source: str,
     recipe_repository: RecipeRepository,
     conversation_memory: ConversationMemory,
-) -> None:
+    render_cache: Optional[RenderCache] = None,
+) -> List[int]:
+    """Store ``recipes``, send them to the chat and return their ids.
+
+    With a ``render_cache`` (carousel mode) several recipes go out as one
+    message with ◀ ▶ buttons; otherwise each recipe is a message of its own.
+    Summary cards get a button that expands them into the full recipe.
+    """
+
     titles: list[str] = []
+    recipe_ids: list[int] = []
     for recipe in recipes:
-        recipe_id = await recipe_repository.add_recipe(
-            chat_id,
-            recipe,
-            source=source,
+        recipe_ids.append(
+            await recipe_repository.add_recipe(
+                chat_id,
+                recipe,
+                source=source,
+            )
         )
-        markup = build_favorite_keyboard(recipe_id, False)
-        await reply_func(render_recipe(recipe), reply_markup=markup)
         titles.append(recipe.title)
 
+    await send_recipes(reply_func, chat_id, recipe_ids, recipes, render_cache=render_cache)
+
     if titles:
         conversation_memory.add(
             chat_id,
             "assistant",
             f"{source}: {', '.join(titles)}",
         )
+    return recipe_ids
+
+
+async def send_recipes(
+    reply_func: SendFunc,
+    chat_id: int,
+    recipe_ids: List[int],
+    recipes: List[RecipeData],
+    *,
+    render_cache: Optional[RenderCache] = None,
+) -> None:
+    """Send already stored ``recipes`` to the chat (see :func:`publish_recipes`)."""
+
+    if render_cache is not None and len(recipe_ids) > 1 and carousel_fits(recipe_ids):
+        texts = [render_recipe(recipe) for recipe in recipes]
+        for recipe_id, text, recipe in zip(recipe_ids, texts, recipes):
+            render_cache.put(chat_id, recipe_id, text, expandable=is_card(recipe))
+        markup = build_carousel_keyboard(recipe_ids, 0, False, expandable=is_card(recipes[0]))
+        await reply_func(texts[0], reply_markup=markup)
+    else:
+        for recipe_id, recipe in zip(recipe_ids, recipes):
+            markup = build_favorite_keyboard(recipe_id, False, expandable=is_card(recipe))
+            await reply_func(render_recipe(recipe), reply_markup=markup)
 
@@ -0,0 +1 @@
+"""aiohttp application serving the Mini App and the Telegram webhook."""
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from aiohttp import web
+
+from services.render_cache import RenderCache
+from services.storage import RecipeRepository
+from web.init_data import InitDataError, InitDataVerifier, WebAppUser
+
+LOGGER = logging.getLogger(__name__)
+
+API_PREFIX = "/api"
+AUTH_SCHEME = "tma "
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+Handler = Callable[[web.Request, WebAppUser], Awaitable[web.StreamResponse]]
+
+
+@dataclass(slots=True)
+class _CachedResponse:
+    etag: str
+    body: bytes
+    stored_at: float
+
+
+class ResponseCache:
+    """LRU of serialized API responses per chat.
+
+    Writes made by this process drop the chat's entries right away (see
+    :meth:`RecipeRepository.add_listener`); ``ttl`` bounds how long a change
+    made by another worker process can go unnoticed.
+    """
+
+    def __init__(self, *, max_entries: int = 5_000, ttl: float = 30.0) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: "OrderedDict[Tuple[int, str], _CachedResponse]" = OrderedDict()
+        self._by_chat: Dict[int, Set[Tuple[int, str]]] = {}
+
+    def get(self, chat_id: int, key: str) -> Optional[_CachedResponse]:
+        entry = self._entries.get((chat_id, key))
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self._ttl:
+            self._drop((chat_id, key))
+            return None
+        self._entries.move_to_end((chat_id, key))
+        return entry
+
+    def put(self, chat_id: int, key: str, payload: object) -> _CachedResponse:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = _CachedResponse(
+            etag=f'"{hashlib.sha256(body).hexdigest()[:16]}"',
+            body=body,
+            stored_at=time.monotonic(),
+        )
+        self._entries[(chat_id, key)] = entry
+        self._entries.move_to_end((chat_id, key))
+        self._by_chat.setdefault(chat_id, set()).add((chat_id, key))
+        while len(self._entries) > self._max_entries:
+            self._drop(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, chat_id: Optional[int]) -> None:
+        if chat_id is None:
+            self._entries.clear()
+            self._by_chat.clear()
+            return
+        for cache_key in self._by_chat.pop(chat_id, ()):
+            self._entries.pop(cache_key, None)
+
+    def _drop(self, cache_key: Tuple[int, str]) -> None:
+        self._entries.pop(cache_key, None)
+        keys = self._by_chat.get(cache_key[0])
+        if keys is not None:
+            keys.discard(cache_key)
+            if not keys:
+                del self._by_chat[cache_key[0]]
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+
+def _respond(request: web.Request, entry: _CachedResponse) -> web.Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    tags = {tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")}
+    if entry.etag in tags:
+        return web.Response(status=304, headers=headers)
+    return web.Response(
+        body=entry.body,
+        headers=headers,
+        content_type="application/json",
+        charset="utf-8",
+    )
+
+
+def _int_param(request: web.Request, name: str) -> Optional[int]:
+    value = request.query.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise web.HTTPBadRequest(
+            text=json.dumps({"error": f"{name} must be an integer"}),
+            content_type="application/json",
+        ) from None
+
+
+def authorized(
+    verifier: InitDataVerifier,
+    handler: Handler,
+) -> Callable[[web.Request], Awaitable[web.StreamResponse]]:
+    """Wrap ``handler`` so it runs only for requests with valid ``initData``."""
+
+    async def wrapper(request: web.Request) -> web.StreamResponse:
+        header = request.headers.get("Authorization", "")
+        if not header.startswith(AUTH_SCHEME):
+            return _error(401, "Нет данных авторизации Telegram")
+        try:
+            user = verifier.verify(header[len(AUTH_SCHEME):])
+        except InitDataError as exc:
+            LOGGER.info("Rejected Mini App request: %s", exc)
+            return _error(401, "Данные авторизации Telegram недействительны")
+        return await handler(request, user)
+
+    return wrapper
+
+
+class MiniAppApi:
+    """JSON API the Mini App uses to browse recipes and favorites.
+
+    Every request carries the Mini App ``initData`` in an
+    ``Authorization: tma <initData>`` header; the Telegram user it names
+    is the chat whose recipes are served (the Mini App is opened from a
+    private chat). Lists are paged newest first by recipe id: a page
+    returns ``next_cursor`` to pass as ``?cursor=`` for the next one.
+    """
+
+    def __init__(
+        self,
+        repository: RecipeRepository,
+        verifier: InitDataVerifier,
+        *,
+        cache: Optional[ResponseCache] = None,
+        render_cache: Optional[RenderCache] = None,
+    ) -> None:
+        self._repository = repository
+        self._verifier = verifier
+        self._cache = cache or ResponseCache()
+        self._render_cache = render_cache
+        repository.add_listener(self._cache.invalidate)
+
+    def register(self, app: web.Application) -> None:
+        verifier = self._verifier
+        app.router.add_get(f"{API_PREFIX}/recipes", authorized(verifier, self.list_recipes))
+        app.router.add_get(f"{API_PREFIX}/favorites", authorized(verifier, self.list_favorites))
+        app.router.add_get(
+            f"{API_PREFIX}/recipes/{{recipe_id:\\d+}}", authorized(verifier, self.get_recipe)
+        )
+        app.router.add_post(
+            f"{API_PREFIX}/recipes/{{recipe_id:\\d+}}/favorite",
+            authorized(verifier, self.toggle_favorite),
+        )
+
+    async def list_recipes(self, request: web.Request, user: WebAppUser) -> web.Response:
+        return await self._page(request, user, favorites_only=False)
+
+    async def list_favorites(self, request: web.Request, user: WebAppUser) -> web.Response:
+        return await self._page(request, user, favorites_only=True)
+
+    async def get_recipe(self, request: web.Request, user: WebAppUser) -> web.Response:
+        recipe_id = int(request.match_info["recipe_id"])
+        key = f"recipe:{recipe_id}"
+        entry = self._cache.get(user.id, key)
+        if entry is None:
+            found = await self._repository.get_recipe_entry(recipe_id, chat_id=user.id)
+            if found is None:
+                return _error(404, "Рецепт не найден")
+            recipe, is_favorite = found
+            entry = self._cache.put(
+                user.id,
+                key,
+                {"id": recipe_id, "is_favorite": is_favorite, **asdict(recipe)},
+            )
+        return _respond(request, entry)
+
+    async def toggle_favorite(self, request: web.Request, user: WebAppUser) -> web.Response:
+        recipe_id = int(request.match_info["recipe_id"])
+        is_favorite = await self._repository.toggle_favorite(recipe_id, chat_id=user.id)
+        if is_favorite is None:
+            return _error(404, "Рецепт не найден")
+        if self._render_cache is not None:
+            self._render_cache.set_favorite(user.id, recipe_id, is_favorite)
+        return web.json_response({"id": recipe_id, "is_favorite": is_favorite})
+
+    async def _page(
+        self,
+        request: web.Request,
+        user: WebAppUser,
+        *,
+        favorites_only: bool,
+    ) -> web.Response:
+        cursor = _int_param(request, "cursor")
+        limit = min(max(_int_param(request, "limit") or PAGE_SIZE, 1), MAX_PAGE_SIZE)
+        key = f"{'favorites' if favorites_only else 'recipes'}:{cursor}:{limit}"
+        entry = self._cache.get(user.id, key)
+        if entry is None:
+            # one extra row tells whether there is a next page
+            records = await self._repository.list_recipes(
+                user.id,
+                favorites_only=favorites_only,
+                before=cursor,
+                limit=limit + 1,
+            )
+            page = records[:limit]
+            entry = self._cache.put(
+                user.id,
+                key,
+                {
+                    "items": [asdict(record) for record in page],
+                    "next_cursor": page[-1].id if len(records) > limit else None,
+                },
+            )
+        return _respond(request, entry)
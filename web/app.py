@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from services.loop_monitor import LoopMonitor
+from services.render_cache import RenderCache
+from services.storage import RecipeRepository
+from services.tracing import Tracer
+from web.api import MiniAppApi
+from web.assets import AssetCache
+from web.debug import DebugApi, admin_only
+from web.init_data import InitDataVerifier
+
+LOGGER = logging.getLogger(__name__)
+
+
+def create_app(miniapp_dir: Path, *, dev: bool = False) -> web.Application:
+    app = web.Application()
+    if not miniapp_dir.exists():
+        LOGGER.warning("Miniapp directory %s не найден, статика не раздаётся", miniapp_dir)
+        return app
+
+    assets = AssetCache(miniapp_dir, dev=dev)
+    assets.load()
+    app.router.add_get("/", assets.index)
+    app.router.add_get("/static/{name:.+}", assets.static, name="miniapp-static")
+    return app
+
+
+def mount_metrics(
+    app: web.Application, *, admin_token: str, **providers: Callable[[], Any]
+) -> None:
+    """Serve admin-only ``GET /metrics`` with the current value of every stats provider."""
+
+    async def metrics(_: web.Request):
+        return web.json_response({name: asdict(provide()) for name, provide in providers.items()})
+
+    app.router.add_get("/metrics", admin_only(admin_token, metrics))
+
+
+def mount_api(
+    app: web.Application,
+    repository: RecipeRepository,
+    *,
+    verifier: InitDataVerifier,
+    render_cache: Optional[RenderCache] = None,
+) -> None:
+    """Serve the Mini App JSON API under ``/api``."""
+
+    MiniAppApi(repository, verifier, render_cache=render_cache).register(app)
+
+
+def mount_debug(
+    app: web.Application,
+    *,
+    admin_token: str,
+    tracer: Tracer,
+    loop_monitor: LoopMonitor,
+) -> None:
+    """Serve the admin-only diagnostics under ``/debug``."""
+
+    DebugApi(admin_token, tracer=tracer, loop_monitor=loop_monitor).register(app)
+
+
+def mount_webhook(
+    app: web.Application,
+    dispatcher: Dispatcher,
+    bot: Bot,
+    *,
+    path: str,
+    secret_token: str,
+    **workflow_data,
+) -> None:
+    """Serve Telegram updates at ``path``; requests without the secret get 401."""
+
+    SimpleRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=secret_token,
+    ).register(app, path=path)
+    setup_application(app, dispatcher, bot=bot, **workflow_data)
+
+
+async def start_server(
+    app: web.Application,
+    host: str,
+    port: int,
+    *,
+    reuse_port: bool = False,
+) -> web.AppRunner:
+    """Start ``app``; with ``reuse_port`` several processes share the port."""
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port, reuse_port=reuse_port or None)
+    await site.start()
+    LOGGER.info("Веб-сервер доступен по адресу http://%s:%s", host, port)
+    return runner
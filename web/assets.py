@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+try:  # optional: brotli beats gzip by ~15% on text assets
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+LOGGER = logging.getLogger(__name__)
+
+STATIC_PREFIX = "/static/"
+INDEX_NAME = "index.html"
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+MIN_COMPRESS_SIZE = 256
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+_STATIC_REF_RE = re.compile(r"""(["'])/static/([\w./-]+)\1""")
+
+
+@dataclass(slots=True)
+class Asset:
+    content_type: str
+    digest: str
+    # encoding ("identity", "gzip", "br") -> body
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or any(self.etag(encoding) in tags for encoding in self.variants)
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    """``Accept-Encoding`` as coding -> q-value, e.g. ``{"gzip": 1.0, "br": 0.0}``."""
+
+    accepted: Dict[str, float] = {}
+    for token in header.split(","):
+        coding, *params = (part.strip() for part in token.split(";"))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    return accepted
+
+
+def _content_type(path: Path) -> str:
+    content_type, _ = mimetypes.guess_type(path.name)
+    if content_type is None:
+        return "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        return f"{content_type}; charset=utf-8"
+    return content_type
+
+
+def _mtime(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return -1
+
+
+def _build_asset(body: bytes, content_type: str) -> Asset:
+    asset = Asset(content_type=content_type, digest=hashlib.sha256(body).hexdigest()[:16])
+    asset.variants["identity"] = body
+    if len(body) >= MIN_COMPRESS_SIZE and content_type.startswith(_COMPRESSIBLE):
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            asset.variants["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                asset.variants["br"] = compressed
+    return asset
+
+
+def hashed_name(name: str, digest: str) -> str:
+    """``main.js`` -> ``main.<digest8>.js``."""
+
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{digest[:8]}.{suffix}" if dot else f"{name}.{digest[:8]}"
+
+
+class AssetCache:
+    """Mini App files held in memory with precompressed variants.
+
+    Assets are addressed both by name and by a content-hashed name; the
+    hashed URLs are written into ``index.html`` and served as immutable,
+    while the index itself is revalidated with its strong ETag. In ``dev``
+    mode the directory is re-read whenever a file changes.
+    """
+
+    def __init__(self, directory: Path, *, dev: bool = False) -> None:
+        self._directory = directory
+        self._dev = dev
+        self._assets: Dict[str, Tuple[Asset, bool]] = {}
+        self._index: Optional[Asset] = None
+        self._fingerprint: Tuple[Tuple[str, int, int], ...] = ()
+        # the last directory walk and the mtimes of the directories it saw
+        self._files: List[Path] = []
+        self._dir_mtimes: Dict[Path, int] = {}
+
+    def load(self) -> None:
+        assets: Dict[str, Tuple[Asset, bool]] = {}
+        urls: Dict[str, str] = {}
+        for path in sorted(self._directory.rglob("*")):
+            if not path.is_file() or path.name == INDEX_NAME:
+                continue
+            name = path.relative_to(self._directory).as_posix()
+            asset = _build_asset(path.read_bytes(), _content_type(path))
+            hashed = hashed_name(name, asset.digest)
+            assets[name] = (asset, False)
+            assets[hashed] = (asset, True)
+            urls[name] = hashed
+
+        index_path = self._directory / INDEX_NAME
+        index = None
+        if index_path.exists():
+            html = _STATIC_REF_RE.sub(
+                lambda match: (
+                    f"{match[1]}{STATIC_PREFIX}{urls.get(match[2], match[2])}{match[1]}"
+                ),
+                index_path.read_text(encoding="utf-8"),
+            )
+            index = _build_asset(html.encode("utf-8"), "text/html; charset=utf-8")
+
+        self._assets = assets
+        self._index = index
+        self._fingerprint = self._scan()
+        LOGGER.info("Loaded %s miniapp assets from %s", len(urls), self._directory)
+
+    async def index(self, request: web.Request) -> web.StreamResponse:
+        self._reload_if_changed()
+        if self._index is None:
+            raise web.HTTPNotFound()
+        return self._respond(request, self._index, REVALIDATE)
+
+    async def static(self, request: web.Request) -> web.StreamResponse:
+        self._reload_if_changed()
+        found = self._assets.get(request.match_info["name"])
+        if found is None:
+            raise web.HTTPNotFound()
+        asset, hashed = found
+        return self._respond(request, asset, IMMUTABLE if hashed and not self._dev else REVALIDATE)
+
+    @staticmethod
+    def _respond(request: web.Request, asset: Asset, cache_control: str) -> web.StreamResponse:
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        encoding = "identity"
+        best = 0.0
+        # br wins a tie with gzip; "*" covers the codings the header does not name
+        for candidate in ("br", "gzip"):
+            quality = accepted.get(candidate, accepted.get("*", 0.0))
+            if candidate in asset.variants and quality > best:
+                encoding, best = candidate, quality
+        headers = {
+            "ETag": asset.etag(encoding),
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if asset.matches(request.headers.get("If-None-Match", "")):
+            return web.Response(status=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        headers["Content-Type"] = asset.content_type
+        return web.Response(body=asset.variants[encoding], headers=headers)
+
+    def _scan(self) -> Tuple[Tuple[str, int, int], ...]:
+        # adding, removing or renaming a file changes its directory's mtime,
+        # so the tree is walked again only then; edits show in the file stats
+        if not self._dir_mtimes or any(
+            _mtime(directory) != mtime for directory, mtime in self._dir_mtimes.items()
+        ):
+            self._walk()
+        fingerprint = []
+        for path in self._files:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            fingerprint.append((str(path), stat.st_mtime_ns, stat.st_size))
+        return tuple(fingerprint)
+
+    def _walk(self) -> None:
+        directories = [self._directory]
+        files = []
+        for path in sorted(self._directory.rglob("*")):
+            if path.is_dir():
+                directories.append(path)
+            elif path.is_file():
+                files.append(path)
+        self._files = files
+        self._dir_mtimes = {directory: _mtime(directory) for directory in directories}
+
+    def _reload_if_changed(self) -> None:
+        if self._dev and self._scan() != self._fingerprint:
+            LOGGER.info("Miniapp files changed, reloading")
+            self.load()
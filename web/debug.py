@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hmac
+import logging
+import math
+import time
+from dataclasses import asdict
+from typing import Awaitable, Callable, Optional
+
+from aiohttp import web
+
+from services.loop_monitor import LoopMonitor
+from services.profiler import ProfilerBusy, SamplingProfiler
+from services.tracing import Tracer
+
+LOGGER = logging.getLogger(__name__)
+
+DEBUG_PREFIX = "/debug"
+ADMIN_SCHEME = "Bearer "
+
+RequestHandler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+def admin_only(token: str, handler: RequestHandler) -> RequestHandler:
+    """Wrap ``handler`` so it runs only with ``Authorization: Bearer <token>``."""
+
+    expected = token.encode("utf-8")
+
+    async def wrapper(request: web.Request) -> web.StreamResponse:
+        header = request.headers.get("Authorization", "")
+        given = header[len(ADMIN_SCHEME):].encode("utf-8")
+        if not header.startswith(ADMIN_SCHEME) or not hmac.compare_digest(given, expected):
+            LOGGER.warning("Rejected admin request to %s from %s", request.path, request.remote)
+            return web.json_response({"error": "Нужен токен администратора"}, status=401)
+        return await handler(request)
+
+    return wrapper
+
+
+class DebugApi:
+    """Admin-only diagnostics of the running process.
+
+    ``GET /debug/traces`` returns the buffered slow traces, newest first, as
+    JSON; ``?format=text`` renders them as waterfalls for reading in a
+    terminal and ``?download=1`` serves the JSON as a file.
+    ``GET /debug/loop`` returns the event loop lag and the recorded stalls
+    with the stack that blocked the loop (``?format=text`` as well).
+    ``POST /debug/profile?seconds=10&interval_ms=10`` samples the live
+    process for that long and returns the collapsed stacks and a dump of
+    the asyncio tasks; ``?format=collapsed`` returns only the stacks, ready
+    for flamegraph.pl or speedscope.
+    """
+
+    def __init__(
+        self,
+        admin_token: str,
+        *,
+        tracer: Tracer,
+        loop_monitor: LoopMonitor,
+        profiler: Optional[SamplingProfiler] = None,
+    ) -> None:
+        self._admin_token = admin_token
+        self._tracer = tracer
+        self._loop_monitor = loop_monitor
+        self._profiler = profiler or SamplingProfiler()
+
+    def register(self, app: web.Application) -> None:
+        token = self._admin_token
+        app.router.add_get(f"{DEBUG_PREFIX}/traces", admin_only(token, self.traces))
+        app.router.add_get(f"{DEBUG_PREFIX}/loop", admin_only(token, self.loop))
+        app.router.add_post(f"{DEBUG_PREFIX}/profile", admin_only(token, self.profile))
+
+    async def traces(self, request: web.Request) -> web.Response:
+        traces = self._tracer.slow_traces()
+        if request.query.get("format") == "text":
+            return web.Response(text="\n\n".join(trace.to_text() for trace in traces) + "\n")
+        response = web.json_response(
+            {
+                "stats": asdict(self._tracer.stats()),
+                "traces": [trace.to_dict() for trace in traces],
+            }
+        )
+        if request.query.get("download"):
+            response.headers["Content-Disposition"] = 'attachment; filename="traces.json"'
+        return response
+
+    async def loop(self, request: web.Request) -> web.Response:
+        stats = self._loop_monitor.stats()
+        stalls = self._loop_monitor.stalls()
+        if request.query.get("format") == "text":
+            lines = [
+                f"lag p50 {stats.p50_ms} ms, p95 {stats.p95_ms} ms, p99 {stats.p99_ms} ms, "
+                f"max {stats.max_ms} ms; stalls {stats.stalls}, captured {stats.captured}"
+            ]
+            for stall in stalls:
+                started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stall.started_at))
+                lines.append(f"\n{started} blocked {stall.blocked_ms:.0f} ms\n{stall.stack}")
+            return web.Response(text="\n".join(lines) + "\n")
+        return web.json_response(
+            {"stats": asdict(stats), "stalls": [asdict(stall) for stall in stalls]}
+        )
+
+    async def profile(self, request: web.Request) -> web.Response:
+        try:
+            seconds = float(request.query.get("seconds", "10"))
+            interval = float(request.query.get("interval_ms", "10")) / 1000
+        except ValueError:
+            seconds = interval = math.nan
+        # nan slips through the min/max clamps of the profiler
+        if not (math.isfinite(seconds) and math.isfinite(interval)):
+            return web.json_response({"error": "seconds и interval_ms — числа"}, status=400)
+        LOGGER.info("Profiling for %.1f s requested from %s", seconds, request.remote)
+        try:
+            profile = await self._profiler.profile(seconds, interval=interval)
+        except ProfilerBusy as exc:
+            return web.json_response({"error": str(exc)}, status=409)
+        if request.query.get("format") == "collapsed":
+            return web.Response(text=profile.collapsed())
+        return web.json_response(
+            {
+                "seconds": profile.seconds,
+                "interval_ms": profile.interval_ms,
+                "samples": profile.samples,
+                "collapsed": profile.collapsed(),
+                "tasks": [asdict(task) for task in profile.tasks],
+            }
+        )
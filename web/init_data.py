@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import parse_qsl
+
+
+class InitDataError(RuntimeError):
+    """Mini App ``initData`` is malformed, forged or expired."""
+
+
+@dataclass(slots=True)
+class WebAppUser:
+    id: int
+    first_name: str
+    auth_date: int
+
+
+def _secret_key(bot_token: str) -> bytes:
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+def parse_init_data(init_data: str, secret_key: bytes) -> WebAppUser:
+    """Check the Telegram signature of ``initData`` and return its user."""
+
+    try:
+        fields = dict(parse_qsl(init_data, keep_blank_values=True, strict_parsing=True))
+    except ValueError as exc:
+        raise InitDataError("initData is not a query string") from exc
+    received = fields.pop("hash", "")
+    check_string = "\n".join(f"{key}={fields[key]}" for key in sorted(fields))
+    expected = hmac.new(secret_key, check_string.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, received):
+        raise InitDataError("initData signature mismatch")
+    try:
+        user = json.loads(fields["user"])
+        return WebAppUser(
+            id=int(user["id"]),
+            first_name=str(user.get("first_name", "")),
+            auth_date=int(fields["auth_date"]),
+        )
+    except (KeyError, TypeError, ValueError) as exc:
+        raise InitDataError("initData has no valid user") from exc
+
+
+class InitDataVerifier:
+    """Verifies ``initData`` strings, remembering the ones already checked.
+
+    A Mini App session sends the same ``initData`` with every request, so
+    the HMAC is computed once per session; later requests only look up the
+    digest of the string and re-check its age against ``max_age``.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        *,
+        max_age: float = 86_400,
+        max_entries: int = 10_000,
+    ) -> None:
+        self._secret_key = _secret_key(bot_token)
+        self._max_age = max_age
+        self._max_entries = max_entries
+        self._verified: "OrderedDict[bytes, WebAppUser]" = OrderedDict()
+
+    def verify(self, init_data: str, *, now: Optional[float] = None) -> WebAppUser:
+        digest = hashlib.sha256(init_data.encode()).digest()
+        user = self._verified.get(digest)
+        if user is None:
+            user = parse_init_data(init_data, self._secret_key)
+        if (now if now is not None else time.time()) - user.auth_date > self._max_age:
+            self._verified.pop(digest, None)
+            raise InitDataError("initData has expired")
+        self._verified[digest] = user
+        self._verified.move_to_end(digest)
+        while len(self._verified) > self._max_entries:
+            self._verified.popitem(last=False)
+        return user
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import secrets
+import time
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiohttp import web
+
+from services.admission import AdmissionController, AdmissionRejected, AdmissionShed
+from services.memory import ConversationMemory
+from services.recipe_generator import RecipeGenerationError, RecipeGenerator
+from services.recipes.schemas import RecipeData
+from services.render_cache import RenderCache
+from services.storage import RecipeRepository
+from services.submissions import SubmissionKey, SubmissionLedger, submission_key
+from utils.miniapp import MiniAppPayloadError, compose_prompt, validate_payload
+from utils.recipes import send_recipes
+from web.api import API_PREFIX, authorized
+from web.init_data import InitDataVerifier, WebAppUser
+
+LOGGER = logging.getLogger(__name__)
+
+SOURCE = "Mini App"
+HEARTBEAT_SECONDS = 15.0
+# finished streams stay resumable this long
+RETENTION_SECONDS = 300.0
+
+
+@dataclass(slots=True)
+class _Event:
+    id: int
+    name: str
+    data: str
+
+    def encode(self) -> bytes:
+        return f"id: {self.id}\nevent: {self.name}\ndata: {self.data}\n\n".encode("utf-8")
+
+
+class _Stream:
+    """Events of one generation; kept after it ends so clients can resume."""
+
+    def __init__(self, stream_id: str, chat_id: int, key: SubmissionKey) -> None:
+        self.id = stream_id
+        self.chat_id = chat_id
+        self.key = key
+        self.events: List[_Event] = []
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.changed = asyncio.Event()
+
+    def emit(self, name: str, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        self.events.append(_Event(id=len(self.events) + 1, name=name, data=data))
+        # readers hold on to the previous event object, so swap it for the next wait
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def finish(self, name: str, payload: dict) -> None:
+        self.finished_at = time.monotonic()
+        self.emit(name, payload)
+
+
+class RecipeStreamApi:
+    """Mini App recipe generation streamed over server-sent events.
+
+    ``POST /api/generations`` takes the Mini App form and starts a
+    generation that runs on its own, through the same admission control as
+    chat requests; every recipe is stored as soon as the model finishes it.
+    ``GET /api/generations/<id>/events`` streams ``queued``, ``recipe`` and
+    finally ``done`` or ``error`` events with a comment heartbeat. A client
+    that reconnects with ``Last-Event-ID`` gets only the events it missed.
+    With ``"mirror_to_chat": true`` the recipes are also sent to the chat.
+
+    A form sent again with the same ``submitted_at`` (see
+    :class:`SubmissionLedger`) gets the id of the stream already running
+    for it; once that one is gone, the ``recipe_ids`` it produced, or 409
+    while the form is still being answered in the chat. Streams live in
+    this process only, so the API is mounted with a single web worker;
+    with several, ``POST`` is not routed and the Mini App sends the form
+    to the chat.
+    """
+
+    def __init__(
+        self,
+        verifier: InitDataVerifier,
+        *,
+        bot: Bot,
+        recipe_generator: RecipeGenerator,
+        recipe_repository: RecipeRepository,
+        conversation_memory: ConversationMemory,
+        admission: AdmissionController,
+        render_cache: Optional[RenderCache] = None,
+        submission_ledger: Optional[SubmissionLedger] = None,
+        heartbeat: float = HEARTBEAT_SECONDS,
+    ) -> None:
+        self._verifier = verifier
+        self._bot = bot
+        self._generator = recipe_generator
+        self._repository = recipe_repository
+        self._memory = conversation_memory
+        self._admission = admission
+        self._render_cache = render_cache
+        self._ledger = submission_ledger
+        self._heartbeat = heartbeat
+        self._streams: Dict[str, _Stream] = {}
+        self._by_key: Dict[SubmissionKey, _Stream] = {}
+
+    def register(self, app: web.Application) -> None:
+        app.router.add_post(f"{API_PREFIX}/generations", authorized(self._verifier, self.start))
+        app.router.add_get(
+            f"{API_PREFIX}/generations/{{stream_id}}/events",
+            authorized(self._verifier, self.events),
+        )
+        app.on_shutdown.append(self._cancel_all)
+
+    async def start(self, request: web.Request, user: WebAppUser) -> web.Response:
+        try:
+            body = await request.json()
+            payload = validate_payload(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.json_response({"error": "Тело запроса должно быть JSON"}, status=400)
+        except MiniAppPayloadError as exc:
+            return web.json_response({"error": str(exc)}, status=400)
+
+        self._forget_finished()
+        key = submission_key(user.id, payload)
+        running = self._by_key.get(key)
+        if running is not None:
+            return web.json_response({"id": running.id})
+        earlier = self._ledger.claim(key) if self._ledger is not None else None
+        if earlier is not None:
+            if not earlier.recipe_ids:
+                # the same form is being answered in the chat right now
+                return web.json_response(
+                    {"error": "Эту форму я уже обрабатываю, рецепты скоро будут"}, status=409
+                )
+            return web.json_response({"recipe_ids": earlier.recipe_ids})
+        stream = _Stream(secrets.token_urlsafe(12), user.id, key)
+        self._streams[stream.id] = stream
+        self._by_key[key] = stream
+        stream.task = asyncio.create_task(
+            self._generate(stream, payload, body.get("mirror_to_chat") is True)
+        )
+        return web.json_response({"id": stream.id}, status=201)
+
+    async def events(self, request: web.Request, user: WebAppUser) -> web.StreamResponse:
+        stream = self._streams.get(request.match_info["stream_id"])
+        if stream is None or stream.chat_id != user.id:
+            return web.json_response({"error": "Генерация не найдена"}, status=404)
+        try:
+            sent = int(request.headers.get("Last-Event-ID", "0"))
+        except ValueError:
+            sent = 0
+
+        response = web.StreamResponse(
+            headers={
+                "Content-Type": "text/event-stream",
+                "Cache-Control": "no-cache",
+                # keep reverse proxies from buffering the stream
+                "X-Accel-Buffering": "no",
+            }
+        )
+        await response.prepare(request)
+        while True:
+            changed = stream.changed
+            for event in stream.events[sent:]:
+                await response.write(event.encode())
+                sent = event.id
+            if stream.finished_at is not None:
+                break
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=self._heartbeat)
+            except asyncio.TimeoutError:
+                await response.write(b": ping\n\n")
+        await response.write_eof()
+        return response
+
+    async def _generate(self, stream: _Stream, payload: dict, mirror: bool) -> None:
+        recipe_ids: List[int] = []
+        try:
+            await self._run(stream, payload, mirror, recipe_ids)
+        finally:
+            if recipe_ids:
+                if self._ledger is not None:
+                    self._ledger.complete(stream.key, recipe_ids)
+            else:
+                # a failed form may be sent again
+                self._by_key.pop(stream.key, None)
+                if self._ledger is not None:
+                    self._ledger.release(stream.key)
+
+    async def _run(
+        self,
+        stream: _Stream,
+        payload: dict,
+        mirror: bool,
+        recipe_ids: List[int],
+    ) -> None:
+        chat_id = stream.chat_id
+        user_prompt = compose_prompt(payload)
+        await self._memory.preload(chat_id)
+        history = self._memory.format_history(chat_id)
+
+        async def on_queued(position: int) -> None:
+            stream.emit("queued", {"position": position})
+
+        recipes: List[RecipeData] = []
+        try:
+            async with self._admission.slot(chat_id, on_queued):
+                async for recipe in self._generator.stream_from_text(user_prompt, history or None):
+                    recipe_id = await self._repository.add_recipe(chat_id, recipe, source=SOURCE)
+                    recipe_ids.append(recipe_id)
+                    recipes.append(recipe)
+                    stream.emit(
+                        "recipe",
+                        {"id": recipe_id, "is_favorite": False, **asdict(recipe)},
+                    )
+        except AdmissionRejected as exc:
+            LOGGER.info("Mini App generation in chat %s not admitted: %s", chat_id, exc)
+            message = (
+                "Сейчас слишком много запросов, попробуй через минуту"
+                if isinstance(exc, AdmissionShed)
+                else "Не дождались очереди, попробуй ещё раз"
+            )
+            stream.finish("error", {"message": message})
+            return
+        except RecipeGenerationError:
+            LOGGER.exception("Failed to stream Mini App recipes")
+            if not recipes:
+                stream.finish(
+                    "error", {"message": "Не получилось придумать рецепты, повтори попытку"}
+                )
+                return
+        except asyncio.CancelledError:
+            stream.finish("error", {"message": "Сервер перезапускается, повтори попытку"})
+            raise
+        except Exception:
+            LOGGER.exception("Mini App generation in chat %s failed", chat_id)
+            stream.finish("error", {"message": "Что-то пошло не так, повтори попытку"})
+            return
+
+        self._memory.add(chat_id, "user", f"[MiniApp] {user_prompt}")
+        if recipes:
+            self._memory.add(
+                chat_id,
+                "assistant",
+                f"{SOURCE}: {', '.join(recipe.title for recipe in recipes)}",
+            )
+        stream.finish("done", {"recipe_ids": recipe_ids})
+        if mirror and recipes:
+            try:
+                await send_recipes(
+                    partial(self._bot.send_message, chat_id),
+                    chat_id,
+                    recipe_ids,
+                    recipes,
+                    render_cache=self._render_cache,
+                )
+            except Exception:  # pragma: no cover - Telegram failure
+                LOGGER.exception("Failed to mirror Mini App recipes to chat %s", chat_id)
+
+    def _forget_finished(self) -> None:
+        now = time.monotonic()
+        for stream in [
+            stream
+            for stream in self._streams.values()
+            if stream.finished_at is not None and now - stream.finished_at > RETENTION_SECONDS
+        ]:
+            del self._streams[stream.id]
+            self._by_key.pop(stream.key, None)
+
+    async def _cancel_all(self, _: web.Application) -> None:
+        tasks = [stream.task for stream in self._streams.values() if stream.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import signal
+import time
+from typing import Callable, Dict
+
+LOGGER = logging.getLogger(__name__)
+
+RESTART_DELAY = 1.0
+
+
+def run_workers(target: Callable[[int], None], count: int) -> None:
+    """Pre-fork supervisor: keep ``count`` processes running ``target(index)``.
+
+    The workers bind the same port with ``SO_REUSEPORT`` and the kernel
+    spreads incoming connections between them. A worker that dies is
+    restarted; SIGTERM or Ctrl+C stops them all.
+    """
+
+    def _stop(signum, frame):  # pragma: no cover - signal handler
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, _stop)
+    workers: Dict[int, multiprocessing.Process] = {}
+
+    def _spawn(index: int) -> None:
+        process = multiprocessing.Process(target=target, args=(index,), name=f"worker-{index}")
+        process.start()
+        workers[index] = process
+        LOGGER.info("Worker %s started (pid %s)", index, process.pid)
+
+    try:
+        for index in range(count):
+            _spawn(index)
+        while True:
+            time.sleep(RESTART_DELAY)
+            for index, process in list(workers.items()):
+                if not process.is_alive():
+                    LOGGER.warning(
+                        "Worker %s exited with code %s, restarting", index, process.exitcode
+                    )
+                    _spawn(index)
+    except (KeyboardInterrupt, SystemExit):
+        LOGGER.info("Stopping %s workers...", len(workers))
+    finally:
+        for process in workers.values():
+            if process.is_alive():
+                process.terminate()
+        for process in workers.values():
+            process.join()